@@ -1,7 +1,6 @@
 import streamlit as st
 from streamlit_lottie import st_lottie
-import json
-import os
+from animations_lottie import charger_animation
 
 st.set_page_config(page_title="Mon Compagnon Immobilier", layout="wide")
 
@@ -10,25 +9,26 @@ st.subheader("Projet DataScientest – Data Scientist | Soutenance Finale")
 
 st.markdown("___")
 
-# --- Animation Loader depuis fichiers locaux ---
-def load_lottiefile(filepath):
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return None
+# --- Animations : emplacements réservés maintenant, remplis en fin de page (le texte s'affiche d'abord) ---
+animations_differees = []
 
-def safe_lottie_path(filepath, height=200):
-    anim = load_lottiefile(filepath)
-    if anim:
-        st_lottie(anim, height=height)
-    else:
-        st.warning(f"❌ Animation '{filepath}' introuvable.")
 
-ANIM_DIR = "animations"
+def safe_lottie_path(nom, height=200):
+    animations_differees.append((st.empty(), nom, height))
+
+
+def afficher_animations():
+    for emplacement, nom, height in animations_differees:
+        anim = charger_animation(nom)  # version minifiée, analysée une fois par processus
+        with emplacement.container():
+            if anim:
+                st_lottie(anim, height=height, key=nom)
+            else:
+                st.warning(f"❌ Animation '{nom}' introuvable.")
+
 
 # --- Animation d'en-tête principale ---
-safe_lottie_path(os.path.join(ANIM_DIR, "Smart City.json"), height=500)
+safe_lottie_path("Smart City.json", height=500)
 
 st.header("🧭 Navigation interactive")
 
@@ -36,26 +36,26 @@ st.header("🧭 Navigation interactive")
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    safe_lottie_path(os.path.join(ANIM_DIR, "Software development Scene.json"))
+    safe_lottie_path("Software development Scene.json")
     st.markdown("### 📚 Exploration des données")
     st.page_link("pages/1_Exploration_des_donnees.py", label="🔍 Exploration")
     st.page_link("pages/2_Preprocessing_Feature_Engineering.py", label="🛠️ Préprocessing & Feature Engineering")
     st.page_link("pages/3_Cartographie.py", label="🗺️ Cartographie")
 
 with col2:
-    safe_lottie_path(os.path.join(ANIM_DIR, "Ai-powered marketing tools abstract.json"))
+    safe_lottie_path("Ai-powered marketing tools abstract.json")
     st.markdown("### 🛠️ Modélisation & Interprétation")
     st.page_link("pages/4_Modélisation.py", label="📊 Modélisation")
     st.page_link("pages/5_Evaluation.py", label="📈 Évaluation")
     st.page_link("pages/6_Interprétabilité_SHAP.py", label="🧠 Interprétabilité SHAP")
 
 with col3:
-    safe_lottie_path(os.path.join(ANIM_DIR, "teaching or instructing.json"))
+    safe_lottie_path("teaching or instructing.json")
     st.markdown("### ⏳ Série Temporelle")
     st.page_link("pages/7_Serie_Temporelle.py", label="📆 Série Temporelle")
 
 with col4:
-    safe_lottie_path(os.path.join(ANIM_DIR, "Web Development.json"))
+    safe_lottie_path("Web Development.json")
     st.markdown("### 🤖 Simulateur & Ouverture")
     st.page_link("pages/8_Simulateur_Prix.py", label="💰 Simulateur de Prix")
     st.page_link("pages/9_Ouvertures.py", label="🚀 Ouvertures IA")
@@ -186,3 +186,4 @@ st.markdown("""
 - Interprétabilité des modèles multimodaux (SHAP, LIME)
 """)
 
+afficher_animations()
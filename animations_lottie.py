@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+
+import streamlit as st
+
+# === Animations Lottie minifiées (précision réduite, propriétés constantes figées, calques inutiles retirés) ===
+DOSSIER_ANIMATIONS = "animations"
+DOSSIER_MINIFIEES = os.path.join(DOSSIER_ANIMATIONS, "min")
+PRECISION = 3
+CLES_NOMS = ("nm", "mn")  # libellés d'édition, inutiles au rendu sauf si une expression les référence
+
+
+def _arrondir(objet, precision, sans_noms):
+    if isinstance(objet, float):
+        valeur = round(objet, precision)
+        return int(valeur) if valeur.is_integer() else valeur
+    if isinstance(objet, list):
+        return [_arrondir(v, precision, sans_noms) for v in objet]
+    if isinstance(objet, dict):
+        return {k: _arrondir(v, precision, sans_noms) for k, v in objet.items()
+                if not (sans_noms and k in CLES_NOMS)}
+    return objet
+
+
+def _figer(objet):
+    """Propriété « animée » dont toutes les clés ont la même valeur → propriété statique (a = 0)"""
+    if isinstance(objet, list):
+        return [_figer(v) for v in objet]
+    if not isinstance(objet, dict):
+        return objet
+    objet = {k: _figer(v) for k, v in objet.items()}
+    cles = objet.get("k")
+    if objet.get("a") == 1 and "x" not in objet and isinstance(cles, list) and cles and \
+            all(isinstance(c, dict) and "s" in c for c in cles):
+        valeur = cles[0]["s"]
+        if all(c["s"] == valeur and c.get("e", valeur) == valeur for c in cles):
+            valeur = valeur[0] if isinstance(valeur, list) and len(valeur) == 1 else valeur
+            objet = {**{k: v for k, v in objet.items() if k not in ("a", "k")}, "a": 0, "k": valeur}
+    return objet
+
+
+def _a_des_expressions(objet):
+    """Vrai si une propriété animée porte une expression (clé « x » textuelle)"""
+    if isinstance(objet, dict):
+        return isinstance(objet.get("x"), str) or any(_a_des_expressions(v) for v in objet.values())
+    if isinstance(objet, list):
+        return any(_a_des_expressions(v) for v in objet)
+    return False
+
+
+def _calques_utiles(calques, ip, op):
+    """Retire les calques masqués ou hors de la fenêtre [ip, op[ ; parents et caches (mattes) sont conservés"""
+    parents = {c["parent"] for c in calques if "parent" in c}
+    gardes = []
+    for calque in calques:
+        indispensable = calque.get("ind") in parents or calque.get("td")
+        hors_fenetre = calque.get("ip", ip) >= op or calque.get("op", op) <= ip
+        if indispensable or not (calque.get("hd") or hors_fenetre):
+            gardes.append(calque)
+    return gardes
+
+
+def _references(calques, assets_par_id, vues):
+    for calque in calques:
+        ref = calque.get("refId")
+        if ref is not None and ref not in vues:
+            vues.add(ref)
+            _references(assets_par_id.get(ref, {}).get("layers", []), assets_par_id, vues)
+    return vues
+
+
+def minifier(animation, precision=PRECISION):
+    """Animation allégée et statistiques (calques et ressources retirés)"""
+    calques = _calques_utiles(animation.get("layers", []), animation.get("ip", 0), animation.get("op", float("inf")))
+    assets = animation.get("assets", [])
+    utilises = _references(calques, {a.get("id"): a for a in assets}, set())
+    assets_gardes = [a for a in assets if a.get("id") in utilises]
+
+    allegee = {k: v for k, v in animation.items() if k != "meta"}
+    allegee["layers"], allegee["assets"] = calques, assets_gardes
+    sans_noms = not _a_des_expressions(animation)
+    stats = {"calques_retires": len(animation.get("layers", [])) - len(calques),
+             "assets_retires": len(assets) - len(assets_gardes), "noms_retires": sans_noms}
+    allegee = _arrondir(allegee, precision, sans_noms)
+    return _figer(allegee), stats
+
+
+def chemin_minifie(nom, dossier=DOSSIER_MINIFIEES):
+    return os.path.join(dossier, nom)
+
+
+def minifier_fichier(nom, source=DOSSIER_ANIMATIONS, cible=DOSSIER_MINIFIEES, precision=PRECISION):
+    os.makedirs(cible, exist_ok=True)
+    with open(os.path.join(source, nom), encoding="utf-8") as f:
+        animation, stats = minifier(json.load(f), precision)
+    # Nom temporaire unique (les sessions Streamlit sont des threads d'un même processus)
+    descripteur, temporaire = tempfile.mkstemp(dir=cible, suffix=".tmp")
+    with os.fdopen(descripteur, "w", encoding="utf-8") as f:
+        json.dump(animation, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(temporaire, chemin_minifie(nom, cible))
+    stats.update(nom=nom, octets_source=os.path.getsize(os.path.join(source, nom)),
+                 octets_minifies=os.path.getsize(chemin_minifie(nom, cible)))
+    return stats
+
+
+def _chemins_servis(nom):
+    """Version minifiée versionnée telle quelle, puis la source en repli ; la minification ne se fait
+    qu'en ligne de commande (l'application peut tourner sur un disque en lecture seule)"""
+    return [c for c in (chemin_minifie(nom), os.path.join(DOSSIER_ANIMATIONS, nom)) if os.path.exists(c)]
+
+
+@st.cache_resource(max_entries=16)
+def _animation(chemin, date_modif):
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def charger_animation(nom):
+    """Animation analysée une fois par processus (None si aucune version n'est lisible)"""
+    for chemin in _chemins_servis(nom):
+        try:
+            return _animation(chemin, os.path.getmtime(chemin))
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def mesurer(noms):
+    """Temps de chargement à froid (source vs minifié) et à chaud (cache), taille envoyée au navigateur"""
+    lignes = []
+    for nom in noms:
+        debut = time.perf_counter()
+        with open(os.path.join(DOSSIER_ANIMATIONS, nom), encoding="utf-8") as f:
+            source = json.load(f)
+        froid_source = time.perf_counter() - debut
+        _animation.clear()
+        debut = time.perf_counter()
+        animation = charger_animation(nom)
+        froid_minifie = time.perf_counter() - debut
+        debut = time.perf_counter()
+        charger_animation(nom)
+        chaud = time.perf_counter() - debut
+        lignes.append({"nom": nom, "froid_source_ms": froid_source * 1000, "froid_minifie_ms": froid_minifie * 1000,
+                       "chaud_ms": chaud * 1000, "envoye_source_ko": len(json.dumps(source)) / 1024,
+                       "envoye_minifie_ko": len(json.dumps(animation)) / 1024})
+    return lignes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minification des animations Lottie de la page d'accueil")
+    parser.add_argument("--precision", type=int, default=PRECISION)
+    parser.add_argument("--mesurer", action="store_true", help="temps de chargement à froid / à chaud")
+    args = parser.parse_args()
+
+    noms = sorted(f for f in os.listdir(DOSSIER_ANIMATIONS) if f.endswith(".json"))
+    for nom in noms:
+        s = minifier_fichier(nom, precision=args.precision)
+        print(f"✅ {nom} : {s['octets_source'] / 1024:.0f} Ko → {s['octets_minifies'] / 1024:.0f} Ko "
+              f"({s['calques_retires']} calques, {s['assets_retires']} ressources retirés)")
+    if args.mesurer:
+        mesures = mesurer(noms)
+        for m in mesures:
+            print(f"   {m['nom']:<42} froid {m['froid_source_ms']:.1f} → {m['froid_minifie_ms']:.1f} ms, "
+                  f"chaud {m['chaud_ms']:.3f} ms, envoyé {m['envoye_source_ko']:.0f} → {m['envoye_minifie_ko']:.0f} Ko")
+        print(f"✅ Accueil : {sum(m['froid_source_ms'] for m in mesures):.0f} ms (json.load à chaque rendu) → "
+              f"{sum(m['froid_minifie_ms'] for m in mesures):.0f} ms à froid, "
+              f"{sum(m['chaud_ms'] for m in mesures):.2f} ms à chaud")
@@ -0,0 +1,169 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from prevision_prophet import HORIZON_MOIS, CLES_SERIE, _ajuster_une_serie, charger_agregats
+from prevision_baseline import METHODES, aligner_a_droite, combler, dernier_observe, mape, matrice_series
+
+# === Résultats et figures régénérées ===
+CHEMIN_RESULTATS = "data/dvf/backtest_resultats.csv"
+DOSSIER_GRAPHES = "data/graphes"
+NB_PLIS = 4
+PAS_ORIGINE = 3
+
+
+def origines(nb_mois, horizon=HORIZON_MOIS, nb_plis=NB_PLIS, pas=PAS_ORIGINE):
+    """Origines glissantes (indices de mois), de la plus ancienne à la plus récente"""
+    return [nb_mois - horizon - k * pas for k in reversed(range(nb_plis)) if nb_mois - horizon - k * pas >= 24]
+
+
+def backtest_baselines(Y, liste_origines, horizon=HORIZON_MOIS):
+    """Erreurs de toutes les baselines, pour toutes les séries et tous les plis (vectorisé)
+
+    Les origines sont relatives à la fin de chaque série (colonnes alignées à droite) : une série arrêtée
+    avant la fin du calendrier est backtestée sur ses propres derniers mois, pas sur des mois vides.
+    """
+    Y = aligner_a_droite(Y)
+    resultats = []
+    for pli, o in enumerate(liste_origines):
+        apprentissage = combler(Y[:, :o])
+        test = Y[:, o:o + horizon]
+        for nom, f in METHODES.items():
+            resultats.append((nom, pli, o, mape(test, f(apprentissage, horizon))))
+    return resultats
+
+
+def _backtest_prophet_serie(nom, mois, y, mois_origines, horizon):
+    """Tous les plis Prophet d'une série (exécuté dans un processus de travail)"""
+    mois = np.asarray(mois)
+    erreurs = []
+    for pli, mois_origine in mois_origines:
+        apprentissage = mois < mois_origine
+        if apprentissage.sum() < 24:
+            continue
+        _, _, prevision, _ = _ajuster_une_serie(nom, mois[apprentissage].tolist(), y[apprentissage], horizon)
+        prevision = prevision[~prevision["historique"]].set_index("ds")["yhat"]
+        test = ~apprentissage & np.isin(mois, prevision.index)
+        if not test.any():
+            continue
+        reel = np.exp(y[test])
+        erreurs.append((pli, float(np.mean(np.abs(prevision.loc[mois[test]].to_numpy() - reel) / reel) * 100)))
+    return nom, erreurs
+
+
+def mois_origine(mois, fin, o):
+    """Mois calendaire de l'origine `o` (colonne alignée à droite) d'une série finissant à l'indice `fin`"""
+    k = fin - (len(mois) - 1 - o)
+    return mois[k] if k >= 0 else None
+
+
+def backtester(agregats, horizon=HORIZON_MOIS, nb_plis=NB_PLIS, n_workers=None, avec_prophet=True):
+    """Validation croisée à origine glissante : une ligne par (série, méthode, pli)"""
+    debut = time.perf_counter()
+    noms, mois, Y, series = matrice_series(agregats)
+    liste_origines = origines(len(mois), horizon, nb_plis)
+    # Origine de chaque pli, par série, en mois calendaire (mêmes fenêtres pour les baselines et Prophet)
+    fins = dict(zip(noms, dernier_observe(Y)))
+    mois_origines = {nom: [(pli, mois_origine(mois, fins[nom], o)) for pli, o in enumerate(liste_origines)]
+                     for nom in noms}
+
+    lignes = []
+    for methode, pli, o, erreurs in backtest_baselines(Y, liste_origines, horizon):
+        for nom, erreur in zip(noms, erreurs):
+            lignes.append((nom, methode, pli, mois_origines[nom][pli][1], erreur))
+
+    if avec_prophet:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_backtest_prophet_serie, nom, s["mois"], s["y"],
+                                   [(pli, m) for pli, m in mois_origines[nom] if m is not None], horizon)
+                       for nom, s in series.items()]
+            for future in futures:
+                nom, erreurs = future.result()
+                lignes.extend((nom, "prophet", pli, mois_origines[nom][pli][1], e) for pli, e in erreurs)
+
+    resultats = pd.DataFrame(lignes, columns=["serie", "methode", "pli", "origine", "mape"])
+
+    # Contexte des séries : clés, région, volume de transactions
+    volumes = agregats.groupby(CLES_SERIE, as_index=False).agg(
+        nb_transactions=("nb_transactions", "sum"), code_region=("code_region", "first"),
+        nom_region=("nom_region", "first"))
+    contexte = pd.DataFrame([s["cle"] for s in series.values()], columns=CLES_SERIE, index=list(series)) \
+        .rename_axis("serie").reset_index().merge(volumes, on=CLES_SERIE, how="left")
+    resultats = resultats.merge(contexte, on="serie", how="left")
+    return resultats, time.perf_counter() - debut
+
+
+def synthese_series(resultats, methode="prophet"):
+    """MAPE moyen par série (moyenne des plis) pour une méthode"""
+    df = resultats[resultats["methode"] == methode]
+    if df.empty:
+        df = resultats[resultats["methode"] == resultats.groupby("methode")["mape"].mean().idxmin()]
+    colonnes = ["serie"] + CLES_SERIE + ["code_region", "nom_region", "nb_transactions"]
+    return df.groupby(colonnes, as_index=False, dropna=False)["mape"].mean()
+
+
+def generer_figures(resultats, dossier=DOSSIER_GRAPHES, methode="prophet"):
+    """Régénère tableau.png, barplot_par_region.png et transactions_vs_mape.png depuis les résultats stockés"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    os.makedirs(dossier, exist_ok=True)
+    par_serie = synthese_series(resultats, methode)
+
+    # Tableau : MAPE moyen par statut urbain et type de bien
+    tableau = par_serie.pivot_table(index="statut_uu", columns="type_bien", values="mape", aggfunc="mean").round(2)
+    fig, ax = plt.subplots(figsize=(8, 0.6 + 0.4 * len(tableau)))
+    ax.axis("off")
+    table = ax.table(cellText=tableau.values, rowLabels=tableau.index, colLabels=tableau.columns, loc="center")
+    table.scale(1, 1.4)
+    ax.set_title("MAPE moyen (%) par statut urbain et type de bien")
+    fig.savefig(os.path.join(dossier, "tableau.png"), dpi=150, bbox_inches="tight")
+    plt.close(fig)
+
+    # Barplot : MAPE par région et type de bien
+    fig, ax = plt.subplots(figsize=(12, 6))
+    sns.barplot(data=par_serie, x="nom_region", y="mape", hue="type_bien", ax=ax, errorbar=None)
+    ax.set_xlabel("Région")
+    ax.set_ylabel("MAPE (%)")
+    ax.set_title("MAPE par région et type de bien")
+    ax.tick_params(axis="x", rotation=60)
+    fig.savefig(os.path.join(dossier, "barplot_par_region.png"), dpi=150, bbox_inches="tight")
+    plt.close(fig)
+
+    # Nuage : volume de transactions vs MAPE
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.scatterplot(data=par_serie, x="nb_transactions", y="mape", hue="type_bien", style="statut_uu", ax=ax, alpha=0.7)
+    ax.set_xscale("log")
+    ax.set_xlabel("Nombre de transactions (échelle log)")
+    ax.set_ylabel("MAPE (%)")
+    ax.set_title("Volume de transactions vs précision des prévisions")
+    ax.grid(True, linestyle="--", linewidth=0.5)
+    fig.savefig(os.path.join(dossier, "transactions_vs_mape.png"), dpi=150, bbox_inches="tight")
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest à origine glissante des modèles de séries temporelles")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--plis", type=int, default=NB_PLIS)
+    parser.add_argument("--sans-prophet", action="store_true")
+    parser.add_argument("--figures-seulement", action="store_true", help="régénérer les figures depuis les résultats stockés")
+    args = parser.parse_args()
+
+    if args.figures_seulement:
+        resultats = pd.read_csv(CHEMIN_RESULTATS, sep=";", dtype={"code_departement": str, "code_region": str})
+    else:
+        resultats, duree = backtester(charger_agregats(), nb_plis=args.plis, n_workers=args.workers,
+                                      avec_prophet=not args.sans_prophet)
+        os.makedirs(os.path.dirname(CHEMIN_RESULTATS), exist_ok=True)
+        resultats.to_csv(CHEMIN_RESULTATS, sep=";", index=False)
+        print(f"✅ {resultats['serie'].nunique()} séries × {resultats['pli'].nunique()} plis évalués en {duree:.1f} s")
+        print(resultats.groupby("methode")["mape"].mean().round(2).to_string())
+    generer_figures(resultats, methode="prophet" if not args.sans_prophet else "holt_winters")
+    print(f"✅ Figures régénérées dans {DOSSIER_GRAPHES}")
@@ -0,0 +1,148 @@
+import os
+import io
+import json
+import hashlib
+import threading
+import functools
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import streamlit as st
+
+# === Cache des figures rendues (octets PNG / SVG) ===
+VERSION = 1  # à incrémenter si un graphique change sans que sa fonction de dessin change (style, helper appelé)
+# Niveau disque facultatif : activé seulement si la variable d'environnement donne un dossier
+DOSSIER_CACHE_FIGURES = os.environ.get("CACHE_FIGURES_DOSSIER")
+TAILLE_MAX_MO = 64
+TAILLE_MAX_DISQUE_MO = 256
+DPI = 200  # même résolution que st.pyplot
+
+
+def _empreinte_code(code, h):
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for constante in code.co_consts:  # fonctions imbriquées : leur code, pas leur adresse mémoire
+        if hasattr(constante, "co_code"):
+            _empreinte_code(constante, h)
+        elif isinstance(constante, frozenset):  # ordre d'itération dépendant du hachage aléatoire des chaînes
+            h.update(repr(sorted(map(repr, constante))).encode())
+        else:
+            h.update(repr(constante).encode())
+
+
+def identite_dessin(dessiner):
+    """Nom qualifié et empreinte du code de la fonction de dessin : modifier le graphique change la clé"""
+    while isinstance(dessiner, functools.partial):
+        dessiner = dessiner.func
+    h = hashlib.sha256()
+    if hasattr(dessiner, "__code__"):
+        _empreinte_code(dessiner.__code__, h)
+    return f"{getattr(dessiner, '__module__', '')}.{getattr(dessiner, '__qualname__', repr(dessiner))}:" \
+           f"{h.hexdigest()[:16]}"
+
+
+class CacheFigures:
+    """Figures déjà rastérisées, indexées par (empreinte des données, nom du graphique, paramètres,
+    fonction de dessin, `VERSION`)
+
+    Mémoire : LRU bornée en octets, partagée entre sessions. Disque (optionnel) : un fichier par clé,
+    ce qui conserve les rendus d'un redémarrage de l'application à l'autre ; les fichiers les moins
+    récemment utilisés sont supprimés au-delà de `taille_max_disque_mo`.
+    """
+
+    def __init__(self, taille_max_mo=TAILLE_MAX_MO, dossier=None, taille_max_disque_mo=TAILLE_MAX_DISQUE_MO):
+        self.taille_max = taille_max_mo * 1024 ** 2
+        self.taille_max_disque = taille_max_disque_mo * 1024 ** 2
+        self.dossier = dossier
+        self.memoire = OrderedDict()
+        self.octets = 0
+        self.octets_disque = 0
+        self.verrou = threading.Lock()
+        self.stats = {"memoire": 0, "disque": 0, "rendus": 0}
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+            self._elaguer_disque()
+
+    @staticmethod
+    def cle(empreinte, nom, params, format="png", dessin=""):
+        texte = json.dumps([empreinte, nom, params, format, dessin, VERSION], sort_keys=True, default=str)
+        return hashlib.sha256(texte.encode("utf-8")).hexdigest()
+
+    def _memoriser(self, cle, octets):
+        with self.verrou:
+            if cle in self.memoire:
+                return
+            self.memoire[cle] = octets
+            self.octets += len(octets)
+            while self.octets > self.taille_max and len(self.memoire) > 1:
+                _, ancien = self.memoire.popitem(last=False)
+                self.octets -= len(ancien)
+
+    def _chemin(self, cle, format):
+        return os.path.join(self.dossier, f"{cle}.{format}")
+
+    def _elaguer_disque(self):
+        """Supprime les fichiers les moins récemment utilisés jusqu'à repasser sous la taille maximale"""
+        fichiers = []
+        for entree in os.scandir(self.dossier):
+            if entree.is_file() and not entree.name.endswith(".tmp"):
+                infos = entree.stat()
+                fichiers.append((infos.st_mtime, infos.st_size, entree.path))
+        total = sum(taille for _, taille, _ in fichiers)
+        for _, taille, chemin in sorted(fichiers):
+            if total <= self.taille_max_disque:
+                break
+            try:
+                os.remove(chemin)
+            except FileNotFoundError:  # déjà supprimé par un autre processus
+                pass
+            total -= taille
+        self.octets_disque = total
+
+    def obtenir(self, empreinte, nom, params, dessiner, *args, format="png"):
+        """Octets de la figure ; `dessiner(*args)` (qui renvoie une figure matplotlib) n'est appelé qu'en cas
+        d'absence"""
+        cle = self.cle(empreinte, nom, params, format, identite_dessin(dessiner))
+        with self.verrou:
+            if cle in self.memoire:
+                self.memoire.move_to_end(cle)
+                self.stats["memoire"] += 1
+                return self.memoire[cle]
+
+        if self.dossier and os.path.exists(self._chemin(cle, format)):
+            with open(self._chemin(cle, format), "rb") as f:
+                octets = f.read()
+            os.utime(self._chemin(cle, format))  # date de dernier usage, pour l'élagage
+            self.stats["disque"] += 1
+            self._memoriser(cle, octets)
+            return octets
+
+        fig = dessiner(*args)
+        tampon = io.BytesIO()
+        fig.savefig(tampon, format=format, dpi=DPI, bbox_inches="tight")
+        plt.close(fig)
+        octets = tampon.getvalue()
+        self.stats["rendus"] += 1
+        self._memoriser(cle, octets)
+        if self.dossier:
+            # Écriture atomique : une autre session ne lit jamais un fichier partiel
+            temporaire = self._chemin(cle, format) + f".{os.getpid()}.tmp"
+            with open(temporaire, "wb") as f:
+                f.write(octets)
+            os.replace(temporaire, self._chemin(cle, format))
+            with self.verrou:
+                self.octets_disque += len(octets)
+                if self.octets_disque > self.taille_max_disque:
+                    self._elaguer_disque()
+        return octets
+
+
+@st.cache_resource
+def cache_figures():
+    """Instance unique par processus Streamlit (donc commune à toutes les sessions)"""
+    return CacheFigures(dossier=DOSSIER_CACHE_FIGURES)
+
+
+def afficher_figure(empreinte, nom, params, dessiner, *args):
+    """Remplace `st.pyplot(fig)` : `dessiner(*args)` n'est appelé que si la figure n'a jamais été rendue"""
+    st.image(cache_figures().obtenir(empreinte, nom, params, dessiner, *args), use_container_width=True)
@@ -0,0 +1,108 @@
+import os
+import time
+import hashlib
+
+import pandas as pd
+import streamlit as st
+
+# === Jeu d'annonces enrichi (annonces + INSEE + BPE + revenu fiscal) ===
+CHEMIN_ANNONCES = "data/annonces_ventes_enrichies_rvf_bpe.csv"
+SEP = ";"
+ENCODAGE = "latin1"
+
+# === Schéma de types explicite ===
+ORDRE_DPE = ["A", "B", "C", "D", "E", "F", "G", "NS", "VI", "0"]
+COLONNES_CATEGORIES = [
+    "ges_class", "exposition", "chauffage_energie", "chauffage_systeme", "chauffage_mode",
+    "categorie_annonceur", "typedebien", "typedebien_lite", "TYP_IRIS_y",
+    "commune", "CODE_IRIS", "UU2020", "INSEE_COM", "codePostal",
+]
+SCHEMA_ANNONCES = {
+    "dpeL": pd.CategoricalDtype(ORDRE_DPE, ordered=True),
+    **{col: "category" for col in COLONNES_CATEGORIES},
+}
+
+
+def empreinte_fichier(chemin, taille_bloc=1 << 20):
+    """Empreinte SHA-256 du contenu d'un fichier (lu par blocs)"""
+    h = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def memoire_mo(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def _codes_texte(serie):
+    """Codes en chaînes ; un code entier lu comme flottant (68100.0, à cause des manquants) reste « 68100 »"""
+    if pd.api.types.is_float_dtype(serie) and (serie.dropna() % 1 == 0).all():
+        serie = serie.astype("Int64")
+    return serie.astype(str).where(serie.notna())
+
+
+def optimiser_types(df, schema=SCHEMA_ANNONCES):
+    """Catégories pour les colonnes de codes, flottants en float32, entiers réduits au plus petit type"""
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col in df.columns:
+            df[col] = _codes_texte(df[col]).astype(dtype)
+    for col in df.select_dtypes(include="float").columns:
+        df[col] = df[col].astype("float32")
+    for col in df.select_dtypes(include="integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+def lire_annonces(chemin=CHEMIN_ANNONCES):
+    """Lecture typée du jeu enrichi + rapport mémoire avant / après optimisation des types"""
+    debut = time.perf_counter()
+    brut = pd.read_csv(chemin, sep=SEP, encoding=ENCODAGE)
+    memoire_avant = memoire_mo(brut)
+    df = optimiser_types(brut)
+    rapport = {
+        "lignes": df.shape[0],
+        "colonnes": df.shape[1],
+        "memoire_avant_mo": memoire_avant,
+        "memoire_apres_mo": memoire_mo(df),
+        "duree_s": time.perf_counter() - debut,
+    }
+    return df, rapport
+
+
+@st.cache_resource(show_spinner="Chargement des annonces enrichies…", max_entries=1)
+def _charger_annonces_cache(chemin, date_modif):
+    return lire_annonces(chemin)
+
+
+def charger_annonces(chemin=CHEMIN_ANNONCES):
+    """Jeu enrichi chargé une fois par processus et partagé par toutes les sessions (lecture seule :
+    copier avant toute modification) ; le cache est invalidé si le fichier change"""
+    return _charger_annonces_cache(chemin, os.path.getmtime(chemin))
+
+
+@st.cache_data(show_spinner=False)
+def _empreinte_cache(chemin, date_modif):
+    return empreinte_fichier(chemin)
+
+
+def empreinte_annonces(chemin=CHEMIN_ANNONCES):
+    """Empreinte du jeu enrichi, recalculée seulement si le fichier a été modifié"""
+    return _empreinte_cache(chemin, os.path.getmtime(chemin))
+
+
+def afficher_rapport_memoire(rapport):
+    gain = 1 - rapport["memoire_apres_mo"] / max(rapport["memoire_avant_mo"], 1e-9)
+    st.caption(
+        f"💾 Mémoire : {rapport['memoire_avant_mo']:.1f} Mo → {rapport['memoire_apres_mo']:.1f} Mo "
+        f"(-{gain:.0%}) après optimisation des types · lecture en {rapport['duree_s']:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    df, rapport = lire_annonces()
+    print(f"✅ {rapport['lignes']} annonces × {rapport['colonnes']} colonnes : "
+          f"{rapport['memoire_avant_mo']:.1f} Mo → {rapport['memoire_apres_mo']:.1f} Mo")
+    print(df.dtypes.value_counts().to_string())
@@ -0,0 +1,122 @@
+import os
+import time
+import pickle
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from optimisation_optuna import GRAINE, MODELES_RETENUS, charger_jeu
+from validation_croisee import _PARTAGE, MatricePartagee, _attacher
+
+# === Résultats du comparatif (lus par la page Modélisation) ===
+CHEMIN_CLASSEMENT = "data/classement_modeles.csv"
+PART_TEST = 0.2
+NB_APPELS_LATENCE = 200
+NB_REPETITIONS_LOT = 3
+
+
+def construire(nom):
+    """Les 16 familles comparées, hyperparamètres par défaut (mono-cœur : le parallélisme est entre modèles)"""
+    from sklearn import dummy, ensemble, gaussian_process, linear_model, neighbors, neural_network, svm, tree
+    if nom == "XGBoost":
+        from xgboost import XGBRegressor
+        return XGBRegressor(n_jobs=1, random_state=GRAINE)
+    if nom == "LightGBM":
+        from lightgbm import LGBMRegressor
+        return LGBMRegressor(n_jobs=1, random_state=GRAINE, verbose=-1)
+    return {
+        "ExtraTrees": lambda: ensemble.ExtraTreesRegressor(n_jobs=1, random_state=GRAINE),
+        "RandomForest": lambda: ensemble.RandomForestRegressor(n_jobs=1, random_state=GRAINE),
+        "GradientBoosting": lambda: ensemble.GradientBoostingRegressor(random_state=GRAINE),
+        "MLP": lambda: neural_network.MLPRegressor(hidden_layer_sizes=(100, 50), max_iter=500, early_stopping=True,
+                                                   random_state=GRAINE),
+        "LinearRegression": lambda: linear_model.LinearRegression(),
+        "Ridge": lambda: linear_model.Ridge(),
+        "Lasso": lambda: linear_model.Lasso(max_iter=5000),
+        "ElasticNet": lambda: linear_model.ElasticNet(max_iter=5000),
+        "DecisionTree": lambda: tree.DecisionTreeRegressor(random_state=GRAINE),
+        "AdaBoost": lambda: ensemble.AdaBoostRegressor(random_state=GRAINE),
+        "SVR": lambda: svm.SVR(),
+        "Dummy": lambda: dummy.DummyRegressor(),
+        "KNN": lambda: neighbors.KNeighborsRegressor(),
+        "GaussianProcess": lambda: gaussian_process.GaussianProcessRegressor(random_state=GRAINE),
+    }[nom]()
+
+
+MODELES = ["ExtraTrees", "XGBoost", "LightGBM", "RandomForest", "GradientBoosting", "MLP", "LinearRegression",
+           "Ridge", "Lasso", "ElasticNet", "DecisionTree", "AdaBoost", "SVR", "Dummy", "KNN", "GaussianProcess"]
+
+
+def _meilleur_temps(f, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        f()
+        durees.append(time.perf_counter() - debut)
+    return min(durees)
+
+
+def _evaluer_modele(nom, apprentissage, test):
+    """Un modèle : précision sur le test commun, coût d'ajustement, latence unitaire, débit par lot, taille"""
+    X, y = _PARTAGE["X"][1], _PARTAGE["y"][1]
+    X_app, X_test, y_test = X[apprentissage], X[test], y[test]
+    modele = construire(nom)
+    debut = time.perf_counter()
+    modele.fit(X_app, y[apprentissage])
+    duree_fit = time.perf_counter() - debut
+
+    residus = modele.predict(X_test) - y_test
+    ligne = X_test[:1]
+    latences = []
+    for _ in range(NB_APPELS_LATENCE):
+        debut = time.perf_counter()
+        modele.predict(ligne)
+        latences.append(time.perf_counter() - debut)
+    duree_lot = _meilleur_temps(lambda: modele.predict(X_test), NB_REPETITIONS_LOT)
+    return {"Modèle": nom,
+            "RMSE": float(np.sqrt(np.mean(residus ** 2))), "MAE": float(np.mean(np.abs(residus))),
+            "R²": float(1 - np.sum(residus ** 2) / np.sum((y_test - y_test.mean()) ** 2)),
+            "fit_s": duree_fit, "latence_ms": float(np.median(latences)) * 1000,
+            "debit_lignes_s": len(X_test) / duree_lot, "taille_ko": len(pickle.dumps(modele)) / 1024}
+
+
+def classer(type_bien, modeles=MODELES, n_workers=None, part_test=PART_TEST):
+    """Tous les modèles sur le même découpage, entraînés en parallèle (une tâche par modèle)"""
+    X, y = charger_jeu(type_bien)
+    apprentissage, test = train_test_split(np.arange(len(y)), test_size=part_test, random_state=GRAINE)
+    debut = time.perf_counter()
+    with MatricePartagee(X=X.to_numpy(dtype="float32"), y=y) as partage:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_attacher,
+                                 initargs=(partage.descripteurs,)) as pool:
+            futures = [pool.submit(_evaluer_modele, nom, apprentissage, test) for nom in modeles]
+            resultats = pd.DataFrame([future.result() for future in futures])
+    resultats.insert(0, "type_bien", type_bien)
+    return resultats.sort_values("RMSE").reset_index(drop=True), time.perf_counter() - debut
+
+
+def charger_classement(chemin=CHEMIN_CLASSEMENT):
+    return pd.read_csv(chemin, sep=";") if os.path.exists(chemin) else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparatif des 16 modèles (précision, coût, latence, taille)")
+    parser.add_argument("--types", nargs="+", default=list(MODELES_RETENUS), choices=list(MODELES_RETENUS))
+    parser.add_argument("--modeles", nargs="+", default=MODELES, choices=MODELES)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    tableaux = []
+    for type_bien in args.types:
+        resultats, duree = classer(type_bien, args.modeles, args.workers)
+        tableaux.append(resultats)
+        print(f"✅ {type_bien} : {len(resultats)} modèles évalués en {duree:.1f} s")
+        print(resultats.drop(columns="type_bien").round(3).to_string(index=False))
+    # Les types non recalculés conservent leurs résultats précédents
+    precedent = charger_classement()
+    if precedent is not None:
+        tableaux.append(precedent[~precedent["type_bien"].isin(args.types)])
+    pd.concat(tableaux, ignore_index=True).to_csv(CHEMIN_CLASSEMENT, sep=";", index=False)
+    print(f"✅ Classement → {CHEMIN_CLASSEMENT}")
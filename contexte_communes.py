@@ -0,0 +1,97 @@
+import json
+import time
+import argparse
+
+import pandas as pd
+
+from transformation_annonces import FICHIERS_REFERENCE, lire_reference
+
+# === Magasin de variables de contexte (INSEE, BPE, revenu fiscal, géolocalisation) ===
+CHEMIN_CONTEXTE = "data/contexte_iris.csv"
+CHEMIN_COMMUNES = "data/communes_haut_rhin.geojson"
+COLONNES_COORDONNEES = ["mapCoordonneesLatitude", "mapCoordonneesLongitude"]
+COLONNES_CONTEXTE = [
+    "TYP_IRIS_y", "Revenu_fiscal_de_r__f__rence_par_habitant",
+    "score_education_brut", "score_education_ratio_1000", "score_commerce_brut", "score_commerce_ratio_1000",
+    "score_sant__brut", "score_sant__ratio_1000", "score_transport_brut", "score_transport_ratio_1000",
+    "score_s_curit__brut", "score_s_curit__ratio_1000", "score_culture_loisir_brut", "score_culture_loisir_ratio_1000",
+    "score__conomie_brut", "score__conomie_ratio_1000", "UU2020",
+    "STATUT_COM_UU_Banlieue", "STATUT_COM_UU_Campagne", "STATUT_COM_UU_Ville isolée", "STATUT_COM_UU_Ville-centre",
+]
+
+
+def noms_communes(chemin=CHEMIN_COMMUNES):
+    """Code INSEE → nom de la commune (référentiel géographique, pas le libellé libre des annonces)"""
+    with open(chemin, encoding="utf-8") as f:
+        return {c["properties"]["code"]: c["properties"]["nom"] for c in json.load(f)["features"]}
+
+
+def construire_contexte(annonces, noms=None):
+    """Une ligne par IRIS : variables d'enrichissement (constantes dans l'IRIS) et centre des annonces géolocalisées
+
+    La commune est celle du code IRIS (ses 5 premiers chiffres = code INSEE) : la colonne `commune` des
+    annonces, saisie librement, contredit l'IRIS pour environ un tiers d'entre elles.
+    """
+    noms = noms_communes() if noms is None else noms
+    annonces = annonces.dropna(subset=["CODE_IRIS"])
+    groupes = annonces.groupby("CODE_IRIS")
+    contexte = groupes[COLONNES_CONTEXTE].first()
+    contexte[COLONNES_COORDONNEES] = groupes[COLONNES_COORDONNEES].mean()
+    contexte["nb_annonces"] = groupes.size()
+    contexte = contexte.reset_index()
+    contexte.insert(1, "INSEE_COM", contexte["CODE_IRIS"].astype("int64").astype(str).str.zfill(9).str[:5])
+    contexte.insert(2, "commune", contexte["INSEE_COM"].map(noms).fillna(contexte["INSEE_COM"]))
+    return contexte.sort_values(["commune", "nb_annonces"], ascending=[True, False])
+
+
+class MagasinContexte:
+    """Contexte d'une commune ou d'un IRIS en O(1) : tables de hachage vers des lignes pré-calculées"""
+
+    def __init__(self, contexte):
+        self.contexte = contexte.reset_index(drop=True)
+        colonnes = ["CODE_IRIS"] + COLONNES_CONTEXTE + COLONNES_COORDONNEES
+        self.lignes = self.contexte[colonnes].to_dict("records")
+        self.index_iris = {code: i for i, code in enumerate(self.contexte["CODE_IRIS"])}
+        # IRIS d'une commune, le plus représenté (nombre d'annonces) en premier
+        self.index_commune = {commune: list(lignes) for commune, lignes in
+                              self.contexte.groupby("commune", sort=True).indices.items()}
+
+    @classmethod
+    def charger(cls, chemin=CHEMIN_CONTEXTE):
+        contexte = pd.read_csv(chemin, sep=";")
+        return cls(contexte.sort_values(["commune", "nb_annonces"], ascending=[True, False]))
+
+    @property
+    def communes(self):
+        return list(self.index_commune)
+
+    def iris_de(self, commune):
+        return [self.lignes[i]["CODE_IRIS"] for i in self.index_commune.get(commune, [])]
+
+    def contexte_iris(self, code_iris):
+        i = self.index_iris.get(code_iris)
+        return None if i is None else dict(self.lignes[i])
+
+    def contexte_commune(self, commune):
+        """Contexte de l'IRIS le plus représenté de la commune (None si la commune est inconnue)"""
+        lignes = self.index_commune.get(commune)
+        return None if not lignes else dict(self.lignes[lignes[0]])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Matérialisation du contexte par IRIS / commune")
+    parser.parse_args()
+
+    debut = time.perf_counter()
+    annonces = pd.concat([lire_reference(t)[0] for t in FICHIERS_REFERENCE], ignore_index=True)
+    contexte = construire_contexte(annonces)
+    contexte.to_csv(CHEMIN_CONTEXTE, sep=";", index=False)
+    print(f"✅ {len(contexte)} IRIS / {contexte['INSEE_COM'].nunique()} communes en {time.perf_counter() - debut:.2f} s "
+          f"→ {CHEMIN_CONTEXTE}")
+
+    magasin = MagasinContexte.charger()
+    commune = magasin.communes[0]
+    debut = time.perf_counter()
+    for _ in range(100_000):
+        magasin.contexte_commune(commune)
+    print(f"   recherche : {(time.perf_counter() - debut) * 10:.2f} µs par commune")
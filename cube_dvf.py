@@ -0,0 +1,178 @@
+import os
+import time
+import argparse
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from ingestion_dvf import (DOSSIER_DVF, TAILLE_BLOC, BORNES_LOG, NB_CLASSES, charger_referentiels,
+                           lire_transactions, quantile_histogramme)
+
+# === Stockage du cube ===
+DOSSIER_CUBE = os.path.join(DOSSIER_DVF, "cube")
+NOM_CELLULES = "cellules.csv.gz"
+NOM_HISTOGRAMMES = "histogrammes.npz"
+
+# === Dimensions et niveaux de hiérarchie ===
+NIVEAUX_TEMPS = ["mois", "trimestre", "annee"]
+NIVEAUX_GEO = ["commune", "departement", "region", "france"]
+PARENT_GEO = {"commune": "departement", "departement": "region", "region": "france", "france": None}
+TOUS = "Tous"
+CLES_FINES = ["mois", "code_commune", "statut_uu", "type_bien"]
+CLES_CELLULE = ["niveau_temps", "temps", "niveau_geo", "geo", "statut_uu", "type_bien"]
+QUANTILES = {"p10": 0.1, "p25": 0.25, "prix_m2_median": 0.5, "p75": 0.75, "p90": 0.9}
+
+
+class AccumulateurFin:
+    """Cellules au niveau le plus fin (mois × commune × statut × type) avec histogramme creux mergeable"""
+
+    def __init__(self):
+        self.index = {}
+        self.nb = np.zeros(0, dtype="int64")
+        self.somme_prix = np.zeros(0)
+        self.histo = sparse.csr_matrix((0, NB_CLASSES), dtype="int64")
+
+    def ajouter(self, bloc):
+        if bloc.empty:
+            return
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(bloc[CLES_FINES]))
+        lignes = np.array([self.index.setdefault(cle, len(self.index)) for cle in uniques], dtype="int64")[codes]
+        n = len(self.index)
+        if n > len(self.nb):
+            self.nb = np.concatenate([self.nb, np.zeros(n - len(self.nb), dtype="int64")])
+            self.somme_prix = np.concatenate([self.somme_prix, np.zeros(n - len(self.somme_prix))])
+            self.histo.resize((n, NB_CLASSES))
+
+        prix = bloc["prix_m2"].to_numpy(dtype="float64")
+        classes = np.clip(np.searchsorted(BORNES_LOG, np.log(prix), side="right") - 1, 0, NB_CLASSES - 1)
+        self.nb += np.bincount(lignes, minlength=n)
+        self.somme_prix += np.bincount(lignes, weights=prix, minlength=n)
+        self.histo = self.histo + sparse.csr_matrix((np.ones(len(lignes), dtype="int64"), (lignes, classes)),
+                                                    shape=(n, NB_CLASSES))
+
+    def table(self, referentiels):
+        df = pd.DataFrame(list(self.index.keys()), columns=CLES_FINES)
+        periode = pd.PeriodIndex(df["mois"], freq="M")
+        df["trimestre"] = periode.year.astype(str) + "-T" + periode.quarter.astype(str)
+        df["annee"] = periode.year.astype(str)
+        df["commune"] = df["code_commune"]
+        df["departement"] = df["code_commune"].map(referentiels["departement"])
+        df["region"] = df["code_commune"].map(referentiels["region"])
+        df["france"] = "FR"
+        return df
+
+
+def statistiques(nb, somme_prix, histo, taille_lot=200_000):
+    """Compte, moyenne et quantiles de chaque cellule (les histogrammes sont densifiés par lots)"""
+    stats = pd.DataFrame({"nb_transactions": nb, "prix_m2_moyen": somme_prix / np.maximum(nb, 1)})
+    for nom in QUANTILES:
+        stats[nom] = np.nan
+    for debut in range(0, histo.shape[0], taille_lot):
+        dense = histo[debut:debut + taille_lot].toarray()
+        for nom, q in QUANTILES.items():
+            stats.loc[debut:debut + len(dense) - 1, nom] = quantile_histogramme(dense, q, BORNES_LOG)
+    return stats
+
+
+def construire_cube(chemins_dvf, referentiels, taille_bloc=TAILLE_BLOC):
+    """Matérialise tous les cuboïdes (temps × géographie × statut × type) par agrégation du niveau fin
+
+    Chaque niveau agrégé est obtenu par un produit creux A @ H_fin (A : appartenance des cellules fines),
+    les sommes et histogrammes étant additifs le résultat est identique à un calcul direct.
+    """
+    accumulateur = AccumulateurFin()
+    for chemin in chemins_dvf:
+        for bloc in lire_transactions(chemin, referentiels, taille_bloc):
+            accumulateur.ajouter(bloc)
+    fines = accumulateur.table(referentiels)
+    n_fines = len(fines)
+
+    cellules, histos = [], []
+    for niveau_temps, niveau_geo, par_statut, par_type in product(NIVEAUX_TEMPS, NIVEAUX_GEO, (True, False), (True, False)):
+        cles = pd.DataFrame({
+            "niveau_temps": niveau_temps,
+            "temps": fines[niveau_temps],
+            "niveau_geo": niveau_geo,
+            "geo": fines[niveau_geo],
+            "statut_uu": fines["statut_uu"] if par_statut else TOUS,
+            "type_bien": fines["type_bien"] if par_type else TOUS,
+        })
+        parent = PARENT_GEO[niveau_geo]
+        cles["geo_parent"] = fines[parent] if parent else ""
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(cles))
+        appartenance = sparse.csr_matrix((np.ones(n_fines), (codes, np.arange(n_fines))), shape=(len(uniques), n_fines))
+        histo = (appartenance @ accumulateur.histo).astype("int64")
+        bloc = pd.DataFrame(list(uniques), columns=CLES_CELLULE + ["geo_parent"])
+        bloc = pd.concat([bloc, statistiques(appartenance @ accumulateur.nb, appartenance @ accumulateur.somme_prix,
+                                             histo)], axis=1)
+        cellules.append(bloc)
+        histos.append(histo)
+
+    cellules = pd.concat(cellules, ignore_index=True)
+    cellules["nb_transactions"] = cellules["nb_transactions"].astype("int64")
+    return cellules, sparse.vstack(histos, format="csr")
+
+
+def sauver_cube(cellules, histos, dossier=DOSSIER_CUBE):
+    os.makedirs(dossier, exist_ok=True)
+    cellules.to_csv(os.path.join(dossier, NOM_CELLULES), sep=";", index=False)
+    sparse.save_npz(os.path.join(dossier, NOM_HISTOGRAMMES), histos)
+
+
+class CubeDVF:
+    """Cube chargé en mémoire : toute consultation est une recherche dans une table de hachage"""
+
+    def __init__(self, cellules, histos):
+        self.cellules = cellules.reset_index(drop=True)
+        self.histos = histos
+        valeurs = self.cellules[CLES_CELLULE].itertuples(index=False, name=None)
+        self.index = {cle: i for i, cle in enumerate(valeurs)}
+        # Séries temporelles et enfants géographiques pré-indexés
+        self.series = {cle: np.sort(lignes) for cle, lignes in
+                       self.cellules.groupby(["niveau_temps", "niveau_geo", "geo", "statut_uu", "type_bien"]).indices.items()}
+        self.enfants_geo = self.cellules.groupby(["niveau_temps", "temps", "niveau_geo", "geo_parent", "statut_uu",
+                                                  "type_bien"]).indices
+
+    @classmethod
+    def charger(cls, dossier=DOSSIER_CUBE):
+        cellules = pd.read_csv(os.path.join(dossier, NOM_CELLULES), sep=";", dtype=str, keep_default_na=False)
+        for col in ["nb_transactions", "prix_m2_moyen"] + list(QUANTILES):
+            cellules[col] = pd.to_numeric(cellules[col])
+        return cls(cellules, sparse.load_npz(os.path.join(dossier, NOM_HISTOGRAMMES)))
+
+    def cellule(self, niveau_temps, temps, niveau_geo, geo, statut_uu=TOUS, type_bien=TOUS):
+        ligne = self.index.get((niveau_temps, temps, niveau_geo, geo, statut_uu, type_bien))
+        return None if ligne is None else self.cellules.iloc[ligne]
+
+    def serie(self, niveau_temps, niveau_geo, geo, statut_uu=TOUS, type_bien=TOUS):
+        lignes = self.series.get((niveau_temps, niveau_geo, geo, statut_uu, type_bien), [])
+        return self.cellules.iloc[lignes].sort_values("temps")
+
+    def enfants(self, niveau_temps, temps, niveau_geo, geo, statut_uu=TOUS, type_bien=TOUS):
+        """Descente d'un niveau géographique (ex. région → départements)"""
+        niveaux_enfants = [n for n, p in PARENT_GEO.items() if p == niveau_geo]
+        if not niveaux_enfants:
+            return self.cellules.iloc[:0]
+        lignes = self.enfants_geo.get((niveau_temps, temps, niveaux_enfants[0], geo, statut_uu, type_bien), [])
+        return self.cellules.iloc[lignes].sort_values("nb_transactions", ascending=False)
+
+    def fusionner(self, cles):
+        """Statistiques d'une union de cellules (histogrammes additionnés : quantiles exacts au pas de l'histogramme)"""
+        lignes = [self.index[cle] for cle in cles if cle in self.index]
+        nb = self.cellules["nb_transactions"].to_numpy()[lignes]
+        somme = (self.cellules["prix_m2_moyen"].to_numpy()[lignes] * nb).sum()
+        histo = np.asarray(self.histos[lignes].sum(axis=0))
+        return statistiques(np.array([nb.sum()]), np.array([somme]), sparse.csr_matrix(histo)).iloc[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construction du cube de statistiques DVF")
+    parser.add_argument("fichiers", nargs="+", help="fichiers DVF géolocalisées")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    cellules, histos = construire_cube(args.fichiers, charger_referentiels())
+    sauver_cube(cellules, histos)
+    print(f"✅ Cube DVF : {len(cellules):,} cellules matérialisées en {time.perf_counter() - debut:.1f} s → {DOSSIER_CUBE}")
@@ -0,0 +1,164 @@
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from chargement_donnees import ENCODAGE, SEP
+from contexte_communes import CHEMIN_CONTEXTE, COLONNES_CONTEXTE
+
+# === Référentiels (INSEE IRIS, BPE, revenu fiscal, unités urbaines) ===
+DOSSIER_REFERENTIELS = "data/referentiels"
+COLONNES_BPE = [c for c in COLONNES_CONTEXTE if c.startswith("score_")]
+COLONNES_REVENU = ["Revenu_fiscal_de_r__f__rence_par_habitant"]
+COLONNES_UU = ["UU2020", "STATUT_COM_UU_Banlieue", "STATUT_COM_UU_Campagne", "STATUT_COM_UU_Ville isolée",
+               "STATUT_COM_UU_Ville-centre"]
+# Jointures dans l'ordre : une clé peut provenir d'une jointure précédente (IRIS → commune → unité urbaine)
+JOINTURES = [
+    {"nom": "insee_iris", "fichier": "iris_insee.csv", "cle": "CODE_IRIS", "colonnes": ["INSEE_COM", "TYP_IRIS_y"]},
+    {"nom": "bpe", "fichier": "bpe_iris.csv", "cle": "CODE_IRIS", "colonnes": COLONNES_BPE},
+    {"nom": "revenu_fiscal", "fichier": "revenu_fiscal_iris.csv", "cle": "CODE_IRIS", "colonnes": COLONNES_REVENU},
+    {"nom": "unites_urbaines", "fichier": "unites_urbaines.csv", "cle": "INSEE_COM", "colonnes": COLONNES_UU},
+]
+TAILLE_BLOC = 200_000
+CODES_GEO = {"CODE_IRIS": str, "INSEE_COM": str}  # lus comme chaînes (codes corses 2A / 2B, zéros initiaux)
+
+
+def normaliser_cles(valeurs):
+    """Clés sous forme de chaînes, codes numériques sans décimale parasite (683310000.0 → « 683310000 »)"""
+    serie = pd.Series(valeurs)
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype("Int64").astype(str).where(serie.notna()).to_numpy(dtype=object, na_value=None)
+    return serie.astype(str).str.strip().where(serie.notna()).to_numpy(dtype=object, na_value=None)
+
+
+class IndexReference:
+    """Table de référence chargée une fois : index de hachage sur la clé + colonnes en tableaux numpy"""
+
+    def __init__(self, nom, table, cle, colonnes):
+        table = table.drop_duplicates(cle)
+        self.nom, self.cle, self.colonnes = nom, cle, list(colonnes)
+        self.index = pd.Index(normaliser_cles(table[cle]), dtype=object)
+        # Une ligne sentinelle en fin de tableau : la position -1 (clé absente) renvoie une valeur manquante
+        self.valeurs = {}
+        for col in self.colonnes:
+            if pd.api.types.is_numeric_dtype(table[col]):
+                self.valeurs[col] = np.append(table[col].to_numpy(dtype="float64", na_value=np.nan), np.nan)
+            else:
+                self.valeurs[col] = np.append(table[col].to_numpy(dtype=object, na_value=None), None)
+
+    @classmethod
+    def charger(cls, nom, chemin, cle, colonnes):
+        table = pd.read_csv(chemin, sep=";", dtype={cle: str, **CODES_GEO}, usecols=[cle] + list(colonnes))
+        return cls(nom, table, cle, colonnes)
+
+    def rechercher(self, cles):
+        """Position de chaque clé dans la table (-1 si absente) ; seules les clés distinctes sont hachées"""
+        positions, uniques = pd.factorize(pd.Series(cles))
+        trouvees = self.index.get_indexer(normaliser_cles(uniques))
+        return np.append(trouvees, -1)[positions]
+
+    def colonnes_pour(self, lignes):
+        return {col: valeurs[lignes] for col, valeurs in self.valeurs.items()}
+
+
+class MoteurEnrichissement:
+    """Enrichit des lots d'annonces par recherche vectorisée dans les index (aucun `merge`)"""
+
+    def __init__(self, index_references):
+        self.references = index_references
+        self.stats = {ref.nom: {"trouvees": 0, "total": 0} for ref in self.references}
+        self.nb_lignes, self.duree = 0, 0.0
+
+    @classmethod
+    def charger(cls, dossier=DOSSIER_REFERENTIELS, jointures=JOINTURES):
+        return cls([IndexReference.charger(j["nom"], os.path.join(dossier, j["fichier"]), j["cle"], j["colonnes"])
+                    for j in jointures])
+
+    def enrichir(self, bloc):
+        debut = time.perf_counter()
+        nouvelles = {}
+        for ref in self.references:
+            cles = nouvelles[ref.cle] if ref.cle in nouvelles else bloc[ref.cle] if ref.cle in bloc else None
+            if cles is None:
+                continue
+            lignes = ref.rechercher(cles)
+            self.stats[ref.nom]["trouvees"] += int((lignes >= 0).sum())
+            self.stats[ref.nom]["total"] += len(lignes)
+            nouvelles.update(ref.colonnes_pour(lignes))
+        # Colonnes déjà présentes remplacées par les valeurs du référentiel
+        enrichi = bloc.drop(columns=[c for c in nouvelles if c in bloc.columns])
+        enrichi = pd.concat([enrichi, pd.DataFrame(nouvelles, index=bloc.index)], axis=1)
+        self.nb_lignes += len(bloc)
+        self.duree += time.perf_counter() - debut
+        return enrichi
+
+    def taux_correspondance(self):
+        return {nom: s["trouvees"] / s["total"] if s["total"] else np.nan for nom, s in self.stats.items()}
+
+    def rapport(self):
+        return {"lignes": self.nb_lignes, "duree_s": self.duree,
+                "lignes_par_s": self.nb_lignes / self.duree if self.duree else np.nan,
+                "taux_correspondance": self.taux_correspondance()}
+
+
+def enrichir_fichier(moteur, entree, sortie, taille_bloc=TAILLE_BLOC):
+    """Enrichissement en flux : le fichier d'annonces n'est jamais chargé en entier"""
+    premier = True
+    for bloc in pd.read_csv(entree, sep=SEP, encoding=ENCODAGE, chunksize=taille_bloc, low_memory=False):
+        moteur.enrichir(bloc).to_csv(sortie, sep=SEP, encoding=ENCODAGE, index=False,
+                                     mode="w" if premier else "a", header=premier)
+        premier = False
+    return moteur.rapport()
+
+
+def initialiser_referentiels(chemin_contexte=CHEMIN_CONTEXTE, dossier=DOSSIER_REFERENTIELS):
+    """Tables de référence reconstituées depuis le contexte par IRIS (les fichiers INSEE d'origine ne sont pas versionnés)"""
+    os.makedirs(dossier, exist_ok=True)
+    contexte = pd.read_csv(chemin_contexte, sep=";", dtype=CODES_GEO)
+    contexte["INSEE_COM"] = contexte["CODE_IRIS"].str.zfill(9).str[:5]
+    for jointure in JOINTURES:
+        table = contexte[[jointure["cle"]] + jointure["colonnes"]].drop_duplicates(jointure["cle"])
+        table.to_csv(os.path.join(dossier, jointure["fichier"]), sep=";", index=False)
+
+
+def mesurer_debit(moteur, nb_annonces=1_000_000, taille_bloc=TAILLE_BLOC, part_inconnues=0.02, graine=0):
+    """Débit et taux de correspondance sur un flux synthétique d'annonces (codes IRIS tirés du référentiel)"""
+    rng = np.random.default_rng(graine)
+    codes = moteur.references[0].index.to_numpy()
+    cles = rng.choice(codes, nb_annonces).astype(object)
+    inconnues = rng.random(nb_annonces) < part_inconnues
+    cles[inconnues] = "999999999"
+    annonces = pd.DataFrame({"CODE_IRIS": cles, "surface": rng.uniform(15, 200, nb_annonces).round(1)})
+    with tempfile.TemporaryDirectory() as dossier:
+        entree, sortie = os.path.join(dossier, "annonces.csv"), os.path.join(dossier, "enrichies.csv")
+        annonces.to_csv(entree, sep=SEP, encoding=ENCODAGE, index=False)
+        debut = time.perf_counter()
+        rapport = enrichir_fichier(moteur, entree, sortie, taille_bloc)
+        rapport["duree_totale_s"] = time.perf_counter() - debut
+    return rapport
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enrichissement INSEE / BPE / revenu fiscal des annonces")
+    parser.add_argument("entree", nargs="?", help="fichier d'annonces (sep=';') ; absent : mesure de débit")
+    parser.add_argument("sortie", nargs="?")
+    parser.add_argument("--initialiser", action="store_true", help="reconstituer les référentiels depuis le contexte IRIS")
+    parser.add_argument("--nb-annonces", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if args.initialiser or not os.path.exists(os.path.join(DOSSIER_REFERENTIELS, JOINTURES[0]["fichier"])):
+        initialiser_referentiels()
+    debut = time.perf_counter()
+    moteur = MoteurEnrichissement.charger()
+    print(f"✅ Référentiels indexés en {(time.perf_counter() - debut) * 1000:.0f} ms")
+
+    if args.entree:
+        rapport = enrichir_fichier(moteur, args.entree, args.sortie or args.entree.replace(".csv", "_enrichi.csv"))
+    else:
+        rapport = mesurer_debit(moteur, args.nb_annonces)
+    print(f"✅ {rapport['lignes']:,} annonces enrichies ({rapport['lignes_par_s']:,.0f} lignes/s hors lecture/écriture)")
+    for nom, taux in rapport["taux_correspondance"].items():
+        print(f"   {nom:<16} : {taux:.1%} de correspondance")
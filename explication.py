@@ -0,0 +1,206 @@
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as DelaiDepasse
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# === Contributions par variable : voie native des boosters, `shap` en repli ===
+NB_LIGNES_LOT = 10_000
+NB_REPETITIONS = 20
+BUDGET_MS = 300
+NB_EXPLICATIONS_GARDEES = 256
+
+
+class Explicateur:
+    """TreeSHAP exact d'un modèle d'arbres
+
+    XGBoost (`pred_contribs`) et LightGBM (`pred_contrib`) calculent les contributions en C++ multithreadé,
+    sans construire de `shap.TreeExplainer` ; les autres modèles (forêts scikit-learn) passent par `shap`.
+    """
+
+    def __init__(self, modele, forcer_shap=False):
+        self.modele = modele
+        nom = type(modele).__name__
+        self.moteur = "shap" if forcer_shap or nom not in ("XGBRegressor", "LGBMRegressor") else \
+            "xgboost" if nom == "XGBRegressor" else "lightgbm"
+        self._explainer = None
+
+    @property
+    def natif(self):
+        return self.moteur != "shap"
+
+    @property
+    def explainer(self):
+        if self._explainer is None:
+            import shap
+            self._explainer = shap.TreeExplainer(self.modele)
+        return self._explainer
+
+    def _matrice(self, X):
+        if self.moteur == "xgboost":
+            from xgboost import DMatrix
+            noms = None if isinstance(X, pd.DataFrame) else self.modele.get_booster().feature_names
+            return DMatrix(X, feature_names=noms)
+        return X if hasattr(self.modele, "feature_names_in_") else np.asarray(X, dtype="float32")
+
+    def expliquer(self, X):
+        """(contributions n × p, valeur de base par ligne) ; base + somme des contributions = prédiction"""
+        if self.moteur == "xgboost":
+            sortie = self.modele.get_booster().predict(self._matrice(X), pred_contribs=True)
+        elif self.moteur == "lightgbm":
+            sortie = np.asarray(self.modele.predict(self._matrice(X), pred_contrib=True))
+        else:
+            valeurs = self.explainer.shap_values(self._matrice(X), check_additivity=False)
+            base = np.ravel(self.explainer.expected_value)[0]
+            return np.asarray(valeurs), np.full(len(valeurs), base)
+        return sortie[:, :-1], sortie[:, -1]
+
+    def approximer(self, X):
+        """Attribution rapide (Saabas) : les gains le long du chemin de décision, sans moyenne sur les ordres
+
+        Même valeur de base et même somme (la prédiction) que TreeSHAP, mais la répartition entre variables
+        est approchée. LightGBM natif étant déjà rapide, il renvoie les valeurs exactes.
+        """
+        if self.moteur == "xgboost":
+            sortie = self.modele.get_booster().predict(self._matrice(X), pred_contribs=True, approx_contribs=True)
+            return sortie[:, :-1], sortie[:, -1]
+        if self.moteur == "shap" and hasattr(self.modele, "estimators_"):
+            return saabas_foret(self.modele, self._matrice(X))
+        return self.expliquer(X)
+
+    def interactions(self, X):
+        """Valeurs d'interaction n × p × p (natives pour XGBoost uniquement)"""
+        if self.moteur == "xgboost":
+            return self.modele.get_booster().predict(self._matrice(X), pred_interactions=True)[:, :-1, :-1]
+        return np.asarray(self.explainer.shap_interaction_values(self._matrice(X)))
+
+    def tableau(self, X):
+        return tableau_contributions(X, *self.expliquer(X))
+
+
+def tableau_contributions(X, valeurs, base):
+    """Contributions de la première ligne, triées par importance absolue"""
+    donnees = X.iloc[0] if isinstance(X, pd.DataFrame) else pd.Series(np.asarray(X)[0])
+    df = pd.DataFrame({"Feature": donnees.index, "Contribution": valeurs[0], "Value": donnees.to_numpy()})
+    return df.reindex(df.Contribution.abs().sort_values(ascending=False).index), float(base[0])
+
+
+def saabas_foret(foret, X):
+    """Attributions de Saabas d'une forêt scikit-learn : pour chaque nœud traversé, l'écart de valeur
+    avec son parent est crédité à la variable de séparation du parent (produit creux chemin × nœuds)"""
+    from scipy import sparse
+    X = np.asarray(X, dtype="float32")
+    contributions = np.zeros((len(X), foret.n_features_in_))
+    base = 0.0
+    for arbre in foret.estimators_:
+        t = arbre.tree_
+        valeurs = t.value[:, 0, 0]
+        parents = np.full(t.node_count, -1)
+        enfants = np.concatenate([t.children_left, t.children_right])
+        noeuds = np.tile(np.arange(t.node_count), 2)
+        parents[enfants[enfants >= 0]] = noeuds[enfants >= 0]
+        non_racine = np.flatnonzero(parents >= 0)
+        gains = sparse.csr_matrix((valeurs[non_racine] - valeurs[parents[non_racine]],
+                                   (non_racine, t.feature[parents[non_racine]])),
+                                  shape=(t.node_count, foret.n_features_in_))
+        contributions += (arbre.decision_path(X) @ gains).toarray()
+        base += valeurs[0]
+    nb = len(foret.estimators_)
+    return contributions / nb, np.full(len(X), base / nb)
+
+
+class ExplicationsBudgetees:
+    """Explication rendue dans un budget de latence
+
+    Le calcul exact part en arrière-plan ; s'il n'est pas terminé dans le budget, l'approximation est
+    renvoyée et le résultat exact reste disponible (même clé) pour un affichage ultérieur. S'il échoue
+    (`shap` absent pour une forêt, par exemple), l'approximation est renvoyée avec l'erreur.
+    """
+
+    def __init__(self, nb_threads=2, nb_gardees=NB_EXPLICATIONS_GARDEES):
+        self.pool = ThreadPoolExecutor(max_workers=nb_threads, thread_name_prefix="explication")
+        self.calculs = OrderedDict()
+        self.nb_gardees = nb_gardees
+        self.verrou = threading.Lock()
+
+    def _calcul_exact(self, cle, explicateur, X):
+        with self.verrou:
+            if cle not in self.calculs:
+                self.calculs[cle] = self.pool.submit(explicateur.expliquer, X)
+                while len(self.calculs) > self.nb_gardees:
+                    self.calculs.popitem(last=False)
+            self.calculs.move_to_end(cle)
+            return self.calculs[cle]
+
+    def expliquer(self, cle, explicateur, X, budget_ms=BUDGET_MS):
+        """{"valeurs", "base", "exacte", "erreur", "duree_ms"} ; `cle` identifie (modèle, ligne)"""
+        debut = time.perf_counter()
+        calcul = self._calcul_exact(cle, explicateur, X)
+        erreur = None
+        try:
+            valeurs, base = calcul.result(timeout=budget_ms / 1000)
+            exacte = True
+        except DelaiDepasse:
+            valeurs, base = explicateur.approximer(X)
+            exacte = False
+        except Exception as e:
+            valeurs, base = explicateur.approximer(X)
+            exacte, erreur = False, f"{type(e).__name__} : {e}"
+        return {"valeurs": valeurs, "base": base, "exacte": exacte, "erreur": erreur,
+                "duree_ms": (time.perf_counter() - debut) * 1000}
+
+    def exacte_disponible(self, cle):
+        """Vrai dès que le calcul exact de `cle` est terminé sans erreur (un nouvel affichage le servira)"""
+        calcul = self.calculs.get(cle)
+        return calcul is not None and calcul.done() and calcul.exception() is None
+
+
+def _duree(f, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        f()
+        durees.append(time.perf_counter() - debut)
+    return float(np.median(durees))
+
+
+def comparer_latences(modele, X, nb_lignes_lot=NB_LIGNES_LOT, repetitions=NB_REPETITIONS):
+    """Voie native vs `shap.TreeExplainer` : une ligne, et un lot de `nb_lignes_lot` lignes"""
+    lot = X.iloc[np.resize(np.arange(len(X)), nb_lignes_lot)] if isinstance(X, pd.DataFrame) else \
+        np.resize(np.asarray(X), (nb_lignes_lot, X.shape[1]))
+    ligne = X.iloc[[0]] if isinstance(X, pd.DataFrame) else np.asarray(X)[:1]
+    resultats = []
+    for forcer_shap in (False, True):
+        explicateur = Explicateur(modele, forcer_shap)
+        if not forcer_shap and not explicateur.natif:
+            continue
+        debut = time.perf_counter()
+        explicateur.expliquer(ligne)  # construction de l'explainer comptée à part
+        premier_appel = time.perf_counter() - debut
+        resultats.append({"moteur": explicateur.moteur, "premier_appel_ms": premier_appel * 1000,
+                          "ligne_ms": _duree(lambda: explicateur.expliquer(ligne), repetitions) * 1000,
+                          f"lot_{nb_lignes_lot}_s": _duree(lambda: explicateur.expliquer(lot), 1)})
+    return pd.DataFrame(resultats)
+
+
+if __name__ == "__main__":
+    from optimisation_optuna import charger_jeu
+
+    parser = argparse.ArgumentParser(description="Latence des explications : voie native vs shap")
+    parser.add_argument("modele", help="chemin du modèle (.pkl)")
+    parser.add_argument("type_bien", choices=["appart", "maison"])
+    parser.add_argument("--lot", type=int, default=NB_LIGNES_LOT)
+    args = parser.parse_args()
+
+    modele = joblib.load(args.modele)
+    X, _ = charger_jeu(args.type_bien)
+    explicateur = Explicateur(modele)
+    valeurs, base = explicateur.expliquer(X.iloc[:100])
+    entree = X.iloc[:100] if hasattr(modele, "feature_names_in_") else X.iloc[:100].to_numpy(dtype="float32")
+    ecart = np.abs(base + valeurs.sum(axis=1) - modele.predict(entree))
+    print(f"✅ {args.modele} : moteur {explicateur.moteur}, écart d'additivité max {ecart.max():.2e} €/m²")
+    print(comparer_latences(modele, X, args.lot).round(3).to_string(index=False))
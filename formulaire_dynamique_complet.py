@@ -1,40 +1,110 @@
-
+import numpy as np
 import streamlit as st
 
-def generer_formulaire_dynamique(X_input, variables):
-    for var in variables:
-        if "surface" in var and "terrain" not in var:
-            X_input.loc[0, var] = st.slider(f"{var} (m²)", 10, 300, 75)
-        elif "nb" in var or "etage" in var:
-            X_input.loc[0, var] = st.number_input(f"{var}", min_value=0, step=1, value=1)
-        elif var.startswith("exposition_"):
-            pass  # handled separately
-        elif var in ["chauffage_energie", "chauffage_systeme", "chauffage_mode"]:
-            options = {
-                "chauffage_energie": ["Electrique", "Gaz", "Fioul", "Bois", "Autre"],
-                "chauffage_systeme": ["Individuel", "Collectif", "Autre"],
-                "chauffage_mode": ["Radiateur", "Plancher chauffant", "Autre"]
-            }
-            choix = st.selectbox(f"{var}", options[var])
-            X_input.loc[0, var] = options[var].index(choix)
-        elif var == "dpeL":
-            ordre_dpe = ["A", "B", "C", "D", "E", "F", "G"]
-            dpe = st.selectbox("Classe énergétique DPE", ordre_dpe, index=3)
-            X_input.loc[0, var] = 7 - ordre_dpe.index(dpe)
-        elif var.startswith("exposition_"):
-            continue  # handled after
-        elif var.startswith("typedebien_") or var.startswith("commune_"):
-            continue  # trop nombreux ou hors scope manuel
-        else:
-            X_input.loc[0, var] = st.radio(f"{var} ?", ["Oui", "Non"]) == "Oui"
-
-    # Exposition groupée (si colonnes présentes)
-    expositions = [v for v in variables if v.startswith("exposition_")]
-    if expositions:
-        choix_exp = st.selectbox("Exposition", ["Sud", "Est", "Nord", "Autre"])
-        for dir in ["sud", "est", "nord", "autre"]:
-            col_name = f"exposition_{dir}"
-            if col_name in variables:
-                X_input.loc[0, col_name] = 1 if choix_exp.lower() == dir else 0
-
-    return X_input
+# === Schéma déclaratif de l'annonce saisie (type, bornes, modalités) ===
+# Les valeurs saisies sont brutes : l'encodage vers les variables du modèle est fait par le transformateur.
+# Modalités : union des deux types de bien ; `schema_pour` ne garde que celles que l'encodeur du type connaît
+SCHEMA_ANNONCE = {
+    "surface": {"type": "nombre", "libelle": "Surface (m²)", "min": 10, "max": 300, "defaut": 75,
+                "widget": "slider", "section": "🏠 Caractéristiques générales"},
+    "nb_pieces": {"type": "entier", "libelle": "Nombre de pièces", "min": 1, "max": 10, "defaut": 4,
+                  "widget": "slider", "section": "🏠 Caractéristiques générales"},
+    "nb_toilettes": {"type": "entier", "libelle": "Nombre de toilettes", "min": 0, "max": 5, "defaut": 1,
+                     "widget": "slider", "section": "🏠 Caractéristiques générales"},
+    "annee_construction": {"type": "entier", "libelle": "Année de construction", "min": 1900, "max": 2023,
+                           "defaut": 2000, "widget": "slider", "section": "🏠 Caractéristiques générales"},
+    "logement_neuf": {"type": "booleen", "libelle": "Logement neuf ?", "defaut": True, "section": "🛁 Équipements"},
+    "balcon": {"type": "booleen", "libelle": "Balcon ?", "defaut": True, "section": "🛁 Équipements"},
+    "cave": {"type": "booleen", "libelle": "Cave ?", "defaut": True, "section": "🛁 Équipements"},
+    "ascenseur": {"type": "booleen", "libelle": "Ascenseur ?", "defaut": True, "section": "🛁 Équipements"},
+    "bain": {"type": "booleen", "libelle": "Baignoire ?", "defaut": True, "section": "🛁 Équipements"},
+    "eau": {"type": "booleen", "libelle": "Salle d'eau ?", "defaut": True, "section": "🛁 Équipements"},
+    "places_parking": {"type": "booleen", "libelle": "Place de parking ?", "defaut": True, "section": "🛁 Équipements"},
+    "annonce_exclusive": {"type": "booleen", "libelle": "Annonce exclusive ?", "defaut": True,
+                          "section": "🛁 Équipements"},
+    "dpeL": {"type": "categorie", "libelle": "Classe énergétique DPE", "modalites": ["A", "B", "C", "D", "E", "F", "G"],
+             "defaut": "D", "section": "🔥 Chauffage & Énergie"},
+    "exposition": {"type": "categorie", "libelle": "Exposition", "modalites": ["Sud", "Est", "Nord", "Autre"],
+                   "defaut": "Sud", "section": "🔥 Chauffage & Énergie"},
+    "chauffage_energie": {"type": "categorie", "libelle": "Énergie chauffage",
+                          "modalites": ["Électrique", "Gaz", "Fioul", "Bois", "Mixte"], "defaut": "Électrique",
+                          "section": "🔥 Chauffage & Énergie"},
+    "chauffage_systeme": {"type": "categorie", "libelle": "Système chauffage",
+                          "modalites": ["Radiateur", "Sol", "Pompe à chaleur", "Autre"], "defaut": "Radiateur",
+                          "section": "🔥 Chauffage & Énergie"},
+    "chauffage_mode": {"type": "categorie", "libelle": "Mode chauffage", "modalites": ["Individuel", "Collectif"],
+                       "defaut": "Individuel", "section": "🔥 Chauffage & Énergie"},
+}
+
+
+def schema_pour(transformateur, schema=SCHEMA_ANNONCE):
+    """Schéma d'un type de bien : modalités limitées à celles que son encodeur sait coder"""
+    propre = {}
+    for nom, spec in schema.items():
+        if spec["type"] == "categorie":
+            modalites = [m for m in spec["modalites"] if transformateur.modalite_connue(nom, m)]
+            if not modalites:
+                continue
+            spec = {**spec, "modalites": modalites,
+                    "defaut": spec["defaut"] if spec["defaut"] in modalites else modalites[0]}
+        propre[nom] = spec
+    return propre
+
+
+def _widget(nom, spec):
+    if spec["type"] == "booleen":
+        return st.radio(spec["libelle"], ["Oui", "Non"], index=0 if spec["defaut"] else 1, horizontal=True,
+                        key=f"form_{nom}") == "Oui"
+    if spec["type"] == "categorie":
+        return st.selectbox(spec["libelle"], spec["modalites"], index=spec["modalites"].index(spec["defaut"]),
+                            key=f"form_{nom}")
+    if spec.get("widget") == "slider":
+        return st.slider(spec["libelle"], spec["min"], spec["max"], spec["defaut"], key=f"form_{nom}")
+    pas = 1 if spec["type"] == "entier" else None
+    return st.number_input(spec["libelle"], min_value=spec.get("min"), max_value=spec.get("max"),
+                           value=spec["defaut"], step=pas, key=f"form_{nom}")
+
+
+def generer_formulaire_dynamique(schema=SCHEMA_ANNONCE):
+    """Formulaire généré depuis le schéma (un conteneur par section) ; renvoie les réponses brutes"""
+    reponses, section_courante = {}, None
+    for nom, spec in schema.items():
+        if spec.get("section") != section_courante:
+            section_courante = spec.get("section")
+            st.markdown(f"### {section_courante}")
+        reponses[nom] = _widget(nom, spec)
+    return reponses
+
+
+def valider(reponses, schema=SCHEMA_ANNONCE, transformateur=None):
+    """Messages d'erreur (liste vide si la saisie est valide), vérifiés avant tout encodage
+
+    Avec `transformateur`, une modalité que l'encodeur ne sait pas coder est refusée plutôt qu'imputée.
+    """
+    erreurs = []
+    for nom, spec in schema.items():
+        valeur = reponses.get(nom)
+        if valeur is None:
+            erreurs.append(f"« {spec['libelle']} » est manquant.")
+        elif spec["type"] == "categorie":
+            if valeur not in spec["modalites"] or (transformateur is not None and
+                                                   not transformateur.modalite_connue(nom, valeur)):
+                erreurs.append(f"« {spec['libelle']} » : modalité inconnue ({valeur}).")
+        elif spec["type"] == "booleen":
+            if not isinstance(valeur, (bool, np.bool_)):
+                erreurs.append(f"« {spec['libelle']} » doit valoir Oui ou Non.")
+        elif not isinstance(valeur, (int, float, np.number)) or isinstance(valeur, bool) or not np.isfinite(valeur):
+            erreurs.append(f"« {spec['libelle']} » doit être un nombre.")
+        elif spec["type"] == "entier" and float(valeur) != int(valeur):
+            erreurs.append(f"« {spec['libelle']} » doit être un entier.")
+        elif not spec.get("min", -np.inf) <= valeur <= spec.get("max", np.inf):
+            erreurs.append(f"« {spec['libelle']} » doit être compris entre {spec.get('min')} et {spec.get('max')}.")
+    return erreurs
+
+
+def encoder_reponses(reponses, transformateur, noms_variables, contexte=None, sortie=None):
+    """Réponses (+ contexte IRIS) → vecteur float32 aligné sur `model.feature_names_in_`"""
+    annonce = {nom: int(valeur) if isinstance(valeur, (bool, np.bool_)) else valeur for nom, valeur in reponses.items()}
+    if contexte:
+        annonce.update(contexte)
+    return transformateur.transformer_ligne(annonce, sortie=sortie, ordre=transformateur.ordre(noms_variables))
@@ -0,0 +1,156 @@
+import os
+import time
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import cg
+
+from ingestion_dvf import DOSSIER_DVF, TAILLE_BLOC, charger_referentiels, lire_transactions
+
+# === Indice hédonique à variables muettes temporelles ===
+CHEMIN_INDICES = os.path.join(DOSSIER_DVF, "indices_prix.csv")
+# Même format que agregats_mensuels.csv : `--agregats` de prevision_prophet.py / prevision_baseline.py
+CHEMIN_AGREGATS_INDICES = os.path.join(DOSSIER_DVF, "agregats_indices.csv")
+STATUT_INDICE = "Ensemble"
+TYPE_INDICE = "Indice hédonique"
+RIDGE = 1e-6
+
+
+def _cumuler(tableau, codes, poids):
+    """Somme par code dans un tableau qui s'agrandit avec le nombre de codes rencontrés"""
+    taille = int(codes.max()) + 1 if len(codes) else 0
+    if taille > len(tableau):
+        tableau = np.concatenate([tableau, np.zeros((taille - len(tableau),) + tableau.shape[1:])])
+    if tableau.ndim == 1:
+        tableau += np.bincount(codes, weights=poids, minlength=len(tableau))
+    else:
+        for k in range(tableau.shape[1]):
+            tableau[:, k] += np.bincount(codes, weights=poids[:, k], minlength=len(tableau))
+    return tableau
+
+
+class EquationsNormales:
+    """Accumule XᵀX et Xᵀy bloc par bloc : la matrice de plan n'est jamais construite
+
+    Modèle : log(prix/m²) = δ[département, mois] + γ[commune] + β·z + ε, avec z = (maison, log surface).
+    Les effets communes absorbent le niveau local ; δ mesure l'évolution à qualité constante.
+    XᵀX se découpe en blocs tous additifs : comptes par période et par commune (diagonaux),
+    comptes croisés période × commune (creux), sommes de z par période / commune et zᵀz.
+    """
+
+    def __init__(self):
+        self.periodes = {}
+        self.communes = {}
+        self.nb_periode = np.zeros(0)
+        self.nb_commune = np.zeros(0)
+        self.croise = sparse.csr_matrix((0, 0))
+        self.z_periode = np.zeros((0, 2))
+        self.z_commune = np.zeros((0, 2))
+        self.ztz = np.zeros((2, 2))
+        self.y_periode = np.zeros(0)
+        self.y_commune = np.zeros(0)
+        self.zty = np.zeros(2)
+        self.nb_observations = 0
+
+    @staticmethod
+    def _codes(valeurs, table):
+        codes, uniques = pd.factorize(valeurs)
+        return np.array([table.setdefault(u, len(table)) for u in uniques], dtype="int64")[codes]
+
+    def ajouter(self, bloc):
+        if bloc.empty:
+            return
+        p = self._codes(pd.MultiIndex.from_arrays([bloc["code_departement"], bloc["mois"]]), self.periodes)
+        c = self._codes(bloc["code_commune"], self.communes)
+        z = np.column_stack([(bloc["type_bien"] == "Maison").to_numpy(float), np.log(bloc["surface"].to_numpy(float))])
+        y = np.log(bloc["prix_m2"].to_numpy(float))
+        un = np.ones(len(y))
+
+        self.nb_periode = _cumuler(self.nb_periode, p, un)
+        self.nb_commune = _cumuler(self.nb_commune, c, un)
+        self.z_periode = _cumuler(self.z_periode, p, z)
+        self.z_commune = _cumuler(self.z_commune, c, z)
+        self.y_periode = _cumuler(self.y_periode, p, y)
+        self.y_commune = _cumuler(self.y_commune, c, y)
+        self.ztz += z.T @ z
+        self.zty += z.T @ y
+
+        forme = (len(self.periodes), len(self.communes))
+        self.croise.resize(forme)
+        self.croise = self.croise + sparse.csr_matrix((un, (p, c)), shape=forme)
+        self.nb_observations += len(y)
+
+    def resoudre(self, tolerance=1e-10):
+        """Assemble XᵀX (creuse, symétrique) et résout les équations normales par gradient conjugué"""
+        xtx = sparse.bmat([
+            [sparse.diags(self.nb_periode), self.croise, sparse.csr_matrix(self.z_periode)],
+            [self.croise.T, sparse.diags(self.nb_commune), sparse.csr_matrix(self.z_commune)],
+            [sparse.csr_matrix(self.z_periode.T), sparse.csr_matrix(self.z_commune.T), sparse.csr_matrix(self.ztz)],
+        ], format="csr")
+        xty = np.concatenate([self.y_periode, self.y_commune, self.zty])
+        # Le modèle est sur-paramétré (communes emboîtées dans les départements) : une légère
+        # régularisation rend le système défini positif sans modifier les écarts entre périodes
+        xtx = xtx + RIDGE * sparse.identity(xtx.shape[0])
+        coefficients, info = cg(xtx, xty, rtol=tolerance, maxiter=10 * xtx.shape[0])
+        if info < 0:
+            raise ValueError(f"Gradient conjugué : système invalide (code {info})")
+        if info > 0:
+            warnings.warn(f"Gradient conjugué non convergé après {info} itérations (tolérance {tolerance:g}) : "
+                          f"indice approché", RuntimeWarning)
+        return coefficients[:len(self.periodes)], coefficients[-2:], info
+
+
+def estimer_indices(chemins_dvf, referentiels, taille_bloc=TAILLE_BLOC):
+    """Indice de prix à qualité constante par département et par mois (base 100 au premier mois)"""
+    equations = EquationsNormales()
+    debut = time.perf_counter()
+    for chemin in chemins_dvf:
+        for bloc in lire_transactions(chemin, referentiels, taille_bloc):
+            equations.ajouter(bloc)
+    deltas, betas, info = equations.resoudre()
+
+    periodes = pd.DataFrame(list(equations.periodes.keys()), columns=["code_departement", "mois"])
+    periodes["delta"] = deltas
+    periodes["nb_transactions"] = equations.nb_periode.astype("int64")
+    periodes = periodes.sort_values(["code_departement", "mois"]).reset_index(drop=True)
+    # Normalisation intra-département : seules les différences de δ sont identifiées
+    reference = periodes.groupby("code_departement")["delta"].transform("first")
+    periodes["indice"] = 100 * np.exp(periodes["delta"] - reference)
+    stats = {"nb_observations": equations.nb_observations, "convergence_cg": info,
+             "effet_maison": betas[0], "elasticite_surface": betas[1], "duree_s": time.perf_counter() - debut}
+    return periodes.drop(columns="delta"), stats
+
+
+def agregats_indices(indices):
+    """Indices au format des agrégats mensuels : utilisables directement par les moteurs de prévision"""
+    return pd.DataFrame({
+        "mois": indices["mois"],
+        "code_departement": indices["code_departement"],
+        "statut_uu": STATUT_INDICE,
+        "type_bien": TYPE_INDICE,
+        "nb_transactions": indices["nb_transactions"],
+        "log_prix_m2_moyen": np.log(indices["indice"]),
+    })
+
+
+def charger_indices(chemin=CHEMIN_INDICES):
+    return pd.read_csv(chemin, sep=";", dtype={"code_departement": str})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Indice hédonique des prix DVF par département et par mois")
+    parser.add_argument("fichiers", nargs="+", help="fichiers DVF géolocalisées")
+    args = parser.parse_args()
+
+    indices, stats = estimer_indices(args.fichiers, charger_referentiels())
+    indices.to_csv(CHEMIN_INDICES, sep=";", index=False)
+    agregats_indices(indices).to_csv(CHEMIN_AGREGATS_INDICES, sep=";", index=False)
+    etat = "✅" if stats["convergence_cg"] == 0 else "⚠️ (gradient conjugué non convergé)"
+    print(f"{etat} Indice estimé sur {stats['nb_observations']:,} transactions en {stats['duree_s']:.1f} s "
+          f"(effet maison {stats['effet_maison']:+.3f}, élasticité surface {stats['elasticite_surface']:+.3f}) "
+          f"→ {CHEMIN_INDICES}")
+    print(f"✅ Séries d'indices pour la prévision → {CHEMIN_AGREGATS_INDICES} "
+          f"(python prevision_baseline.py --agregats {CHEMIN_AGREGATS_INDICES} --dossier models/indices_prix)")
@@ -0,0 +1,295 @@
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# === Fichiers sources (DVF géolocalisées + référentiels INSEE) ===
+DOSSIER_DVF = "data/dvf"
+CHEMIN_COMMUNES = os.path.join(DOSSIER_DVF, "20230823-communes-departement-region.csv")
+CHEMIN_STATUT_UU = os.path.join(DOSSIER_DVF, "STATUT_COM_UU.csv")
+CHEMIN_AGREGATS = os.path.join(DOSSIER_DVF, "agregats_mensuels.csv")
+
+# === Colonnes DVF utilisées ===
+COLONNES_DVF = ["id_mutation", "date_mutation", "nature_mutation", "valeur_fonciere",
+                "code_commune", "type_local", "surface_reelle_bati"]
+TYPES_DVF = {"id_mutation": str, "date_mutation": str, "nature_mutation": str, "valeur_fonciere": "float64",
+             "code_commune": str, "type_local": str, "surface_reelle_bati": "float64"}
+TYPES_BIEN = ["Appartement", "Maison"]
+
+# === Statut urbain INSEE (unités urbaines 2020) ===
+LIBELLES_STATUT_UU = {"B": "Banlieue", "C": "Ville-centre", "I": "Ville isolée", "H": "Hors unité urbaine"}
+
+# === Filtrage des valeurs aberrantes ===
+PRIX_M2_MIN = 500
+PRIX_M2_MAX = 15000
+SURFACE_MIN = 9
+
+# === Agrégation ===
+TAILLE_BLOC = 500_000
+CLES_AGREGATION = ["mois", "code_region", "code_departement", "statut_uu", "type_bien"]
+# Histogramme log-espacé du prix/m² pour une médiane à mémoire bornée : classes de ~2,7 % de large, écart
+# aux quantiles exacts < 2 % quelle que soit la taille du groupe (dès 1 vente, cf. `quantile_histogramme`)
+NB_CLASSES = 128
+BORNES_LOG = np.linspace(np.log(PRIX_M2_MIN), np.log(PRIX_M2_MAX), NB_CLASSES + 1)
+
+
+def _valeur_de_rang(histo, cumul, rang, bornes_log):
+    """Valeur (log) de la vente de rang `rang` (0 = la moins chère) : les ventes d'une classe sont réparties
+    uniformément, au milieu de sous-intervalles égaux"""
+    lignes = np.arange(histo.shape[0])
+    classe = np.minimum((cumul <= rang[:, None]).sum(axis=1), histo.shape[1] - 1)
+    avant = np.where(classe > 0, cumul[lignes, np.maximum(classe - 1, 0)], 0)
+    dans = np.maximum(histo[lignes, classe], 1)
+    largeur = bornes_log[1] - bornes_log[0]
+    return bornes_log[classe] + (rang - avant + 0.5) / dans * largeur
+
+
+def quantile_histogramme(histo, q, bornes_log=BORNES_LOG):
+    """Quantile approché de chaque ligne d'un histogramme log
+
+    Même définition que `np.quantile` (rang q·(n − 1), interpolation linéaire entre les deux ventes qui
+    l'encadrent) : la médiane d'un groupe pair est la moyenne des deux ventes centrales. NaN si le groupe
+    est vide.
+    """
+    histo = np.asarray(histo)
+    cumul = histo.cumsum(axis=1)
+    n = cumul[:, -1].astype("float64")
+    rang = q * np.maximum(n - 1, 0)
+    bas, haut = np.floor(rang), np.ceil(rang)
+    valeur_bas = np.exp(_valeur_de_rang(histo, cumul, bas, bornes_log))
+    valeur_haut = np.exp(_valeur_de_rang(histo, cumul, haut, bornes_log))
+    quantile = valeur_bas + (rang - bas) * (valeur_haut - valeur_bas)
+    return np.where(n > 0, quantile, np.nan)
+
+
+def charger_referentiels(chemin_communes=CHEMIN_COMMUNES, chemin_statut=CHEMIN_STATUT_UU):
+    """Charge les référentiels géographiques en tables de hachage (code commune → attribut)"""
+    communes = pd.read_csv(chemin_communes, sep=",", dtype=str,
+                           usecols=["code_commune_INSEE", "code_departement", "code_region", "nom_region"])
+    communes = communes.drop_duplicates("code_commune_INSEE")
+    statuts = pd.read_csv(chemin_statut, sep=";", dtype=str, usecols=["CODGEO", "STATUT_COM_UU"])
+
+    return {
+        "departement": dict(zip(communes["code_commune_INSEE"], communes["code_departement"])),
+        "region": dict(zip(communes["code_commune_INSEE"], communes["code_region"])),
+        "nom_region": dict(zip(communes["code_region"], communes["nom_region"])),
+        "statut_uu": dict(zip(statuts["CODGEO"], statuts["STATUT_COM_UU"].map(LIBELLES_STATUT_UU))),
+    }
+
+
+def nettoyer_bloc(bloc, referentiels):
+    """Ventes simples d'un appartement ou d'une maison, prix/m² filtré, enrichies par les référentiels"""
+    bloc = bloc[(bloc["nature_mutation"] == "Vente") & bloc["type_local"].isin(TYPES_BIEN)]
+    # Une mutation portant sur plusieurs logements n'a pas de prix/m² unitaire exploitable
+    bloc = bloc[~bloc["id_mutation"].duplicated(keep=False)]
+    bloc = bloc[(bloc["surface_reelle_bati"] >= SURFACE_MIN) & (bloc["valeur_fonciere"] > 0)]
+
+    prix_m2 = bloc["valeur_fonciere"] / bloc["surface_reelle_bati"]
+    garde = prix_m2.between(PRIX_M2_MIN, PRIX_M2_MAX)
+    bloc, prix_m2 = bloc[garde], prix_m2[garde]
+
+    sortie = pd.DataFrame({
+        "id_mutation": bloc["id_mutation"],
+        "mois": bloc["date_mutation"].str[:7],
+        "code_commune": bloc["code_commune"],
+        "code_departement": bloc["code_commune"].map(referentiels["departement"]),
+        "code_region": bloc["code_commune"].map(referentiels["region"]),
+        "statut_uu": bloc["code_commune"].map(referentiels["statut_uu"]),
+        "type_bien": bloc["type_local"],
+        "surface": bloc["surface_reelle_bati"],
+        "valeur_fonciere": bloc["valeur_fonciere"],
+        "prix_m2": prix_m2,
+    })
+    return sortie.dropna(subset=["code_departement", "code_region", "statut_uu"])
+
+
+def lire_transactions(chemin_dvf, referentiels, taille_bloc=TAILLE_BLOC, stats=None):
+    """Lecture en flux du fichier DVF : génère des blocs de transactions nettoyées
+
+    Les fichiers DVF sont triés par mutation : les lignes de la dernière mutation d'un bloc
+    sont reportées sur le bloc suivant pour ne jamais couper une mutation en deux.
+    """
+    report = None
+    lecteur = pd.read_csv(chemin_dvf, sep=",", usecols=COLONNES_DVF, dtype=TYPES_DVF, chunksize=taille_bloc)
+    for bloc in lecteur:
+        if stats is not None:
+            stats["lignes_lues"] = stats.get("lignes_lues", 0) + len(bloc)
+        if report is not None:
+            bloc = pd.concat([report, bloc], ignore_index=True)
+        derniere = bloc["id_mutation"].iloc[-1]
+        fin = bloc["id_mutation"] == derniere
+        report, bloc = bloc[fin], bloc[~fin]
+        propre = nettoyer_bloc(bloc, referentiels)
+        if stats is not None:
+            stats["lignes_retenues"] = stats.get("lignes_retenues", 0) + len(propre)
+        yield propre
+    if report is not None and len(report):
+        propre = nettoyer_bloc(report, referentiels)
+        if stats is not None:
+            stats["lignes_retenues"] = stats.get("lignes_retenues", 0) + len(propre)
+        yield propre
+
+
+class AgregateurMensuel:
+    """Accumulateurs par groupe (compte, sommes, histogramme log) : mémoire bornée par le nombre de groupes"""
+
+    def __init__(self, cles=CLES_AGREGATION, bornes_log=BORNES_LOG):
+        self.cles = list(cles)
+        self.bornes_log = bornes_log
+        self.nb_classes = len(bornes_log) - 1
+        self.index = {}
+        self.capacite = 0
+        self.nb = np.zeros(0, dtype="int64")
+        self.somme_prix = np.zeros(0, dtype="float64")
+        self.somme_log = np.zeros(0, dtype="float64")
+        self.histo = np.zeros((0, self.nb_classes), dtype="int32")
+
+    def _agrandir(self, taille):
+        nouvelle = max(taille, 2 * self.capacite, 1024)
+        self.nb = np.resize(self.nb, nouvelle)
+        self.nb[self.capacite:] = 0
+        self.somme_prix = np.resize(self.somme_prix, nouvelle)
+        self.somme_prix[self.capacite:] = 0
+        self.somme_log = np.resize(self.somme_log, nouvelle)
+        self.somme_log[self.capacite:] = 0
+        histo = np.zeros((nouvelle, self.nb_classes), dtype="int32")
+        histo[:self.capacite] = self.histo
+        self.histo = histo
+        self.capacite = nouvelle
+
+    def lignes_groupes(self, bloc):
+        """Numéro de groupe global de chaque transaction du bloc"""
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(bloc[self.cles]))
+        lignes = np.empty(len(uniques), dtype="int64")
+        for i, cle in enumerate(uniques):
+            ligne = self.index.get(cle)
+            if ligne is None:
+                ligne = self.index[cle] = len(self.index)
+            lignes[i] = ligne
+        if len(self.index) > self.capacite:
+            self._agrandir(len(self.index))
+        return lignes[codes]
+
+    def ajouter(self, bloc):
+        if bloc.empty:
+            return
+        groupes = self.lignes_groupes(bloc)
+        prix = bloc["prix_m2"].to_numpy(dtype="float64")
+        log_prix = np.log(prix)
+        n = self.capacite
+
+        self.nb += np.bincount(groupes, minlength=n)
+        self.somme_prix += np.bincount(groupes, weights=prix, minlength=n)
+        self.somme_log += np.bincount(groupes, weights=log_prix, minlength=n)
+        classes = np.clip(np.searchsorted(self.bornes_log, log_prix, side="right") - 1, 0, self.nb_classes - 1)
+        np.add.at(self.histo, (groupes, classes), 1)
+
+    def medianes(self):
+        """Médiane approchée par interpolation dans l'histogramme log"""
+        return quantile_histogramme(self.histo[:len(self.index)], 0.5, self.bornes_log)
+
+    def resultat(self, noms_regions=None):
+        nb_groupes = len(self.index)
+        df = pd.DataFrame(list(self.index.keys()), columns=self.cles)
+        nb = self.nb[:nb_groupes]
+        df["nb_transactions"] = nb
+        df["prix_m2_moyen"] = self.somme_prix[:nb_groupes] / nb
+        df["prix_m2_median"] = self.medianes()
+        df["log_prix_m2_moyen"] = self.somme_log[:nb_groupes] / nb
+        if noms_regions is not None and "code_region" in df.columns:
+            df.insert(df.columns.get_loc("code_region") + 1, "nom_region", df["code_region"].map(noms_regions))
+        return df.sort_values(self.cles).reset_index(drop=True)
+
+
+def agreger_dvf(chemins_dvf, referentiels, taille_bloc=TAILLE_BLOC):
+    """Agrégation mensuelle en flux d'un ou plusieurs fichiers DVF"""
+    if isinstance(chemins_dvf, str):
+        chemins_dvf = [chemins_dvf]
+    stats = {}
+    agregateur = AgregateurMensuel()
+    debut = time.perf_counter()
+    for chemin in chemins_dvf:
+        for bloc in lire_transactions(chemin, referentiels, taille_bloc, stats):
+            agregateur.ajouter(bloc)
+    stats["duree_s"] = time.perf_counter() - debut
+    stats["debit_lignes_s"] = stats.get("lignes_lues", 0) / max(stats["duree_s"], 1e-9)
+    return agregateur.resultat(referentiels["nom_region"]), stats
+
+
+def generer_referentiels_synthetiques(dossier, nb_communes=5000, seed=0):
+    """Référentiels communes/départements/régions et statut urbain fictifs pour le benchmark"""
+    rng = np.random.default_rng(seed)
+    deps = [f"{d:02d}" for d in range(1, 96) if d != 20]
+    codes_dep = rng.choice(deps, nb_communes)
+    codes = [f"{dep}{i % 1000:03d}" for i, dep in enumerate(codes_dep)]
+    chemin_communes = os.path.join(dossier, "communes.csv")
+    chemin_statut = os.path.join(dossier, "statut.csv")
+    pd.DataFrame({
+        "code_commune_INSEE": codes,
+        "code_departement": codes_dep,
+        "code_region": [f"R{int(d) % 13:02d}" for d in codes_dep],
+        "nom_region": [f"Région {int(d) % 13}" for d in codes_dep],
+    }).to_csv(chemin_communes, index=False)
+    pd.DataFrame({
+        "CODGEO": codes,
+        "STATUT_COM_UU": rng.choice(list(LIBELLES_STATUT_UU), nb_communes),
+    }).to_csv(chemin_statut, sep=";", index=False)
+    return chemin_communes, chemin_statut, codes
+
+
+def generer_dvf_synthetique(chemin, nb_lignes, codes_communes, taille_bloc=TAILLE_BLOC, seed=0):
+    """Fichier DVF fictif écrit par blocs (mémoire bornée quelle que soit sa taille)"""
+    rng = np.random.default_rng(seed)
+    codes_communes = np.asarray(codes_communes)
+    ecrites = 0
+    while ecrites < nb_lignes:
+        n = min(taille_bloc, nb_lignes - ecrites)
+        surface = rng.uniform(15, 200, n).round(0)
+        mois = rng.integers(0, 60, n)
+        bloc = pd.DataFrame({
+            "id_mutation": [f"2020-{i}" for i in range(ecrites, ecrites + n)],
+            "date_mutation": [f"{2019 + m // 12}-{m % 12 + 1:02d}-15" for m in mois],
+            "nature_mutation": rng.choice(["Vente", "Vente", "Vente", "Echange"], n),
+            "valeur_fonciere": (surface * np.exp(rng.normal(7.9, 0.5, n))).round(0),
+            "code_commune": rng.choice(codes_communes, n),
+            "type_local": rng.choice(["Appartement", "Maison", "Dépendance"], n),
+            "surface_reelle_bati": surface,
+        })
+        bloc.to_csv(chemin, mode="a" if ecrites else "w", header=not ecrites, index=False)
+        ecrites += n
+    return chemin
+
+
+def mesurer_debit(nb_lignes=5_000_000, taille_bloc=TAILLE_BLOC):
+    """Débit d'ingestion sur un fichier DVF synthétique de plusieurs millions de lignes"""
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin_communes, chemin_statut, codes = generer_referentiels_synthetiques(dossier)
+        chemin_dvf = generer_dvf_synthetique(os.path.join(dossier, "dvf.csv"), nb_lignes, codes, taille_bloc)
+        referentiels = charger_referentiels(chemin_communes, chemin_statut)
+        agregats, stats = agreger_dvf(chemin_dvf, referentiels, taille_bloc)
+        stats["taille_fichier_mo"] = os.path.getsize(chemin_dvf) / 1e6
+        stats["nb_groupes"] = len(agregats)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion en flux des fichiers DVF et agrégation mensuelle")
+    parser.add_argument("fichiers", nargs="*", help="fichiers DVF géolocalisées (csv)")
+    parser.add_argument("--sortie", default=CHEMIN_AGREGATS)
+    parser.add_argument("--taille-bloc", type=int, default=TAILLE_BLOC)
+    parser.add_argument("--benchmark", type=int, metavar="NB_LIGNES", help="mesurer le débit sur un fichier synthétique")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        stats = mesurer_debit(args.benchmark, args.taille_bloc)
+        print(f"✅ {stats['lignes_lues']:,} lignes ({stats['taille_fichier_mo']:.0f} Mo) en {stats['duree_s']:.1f} s "
+              f"→ {stats['debit_lignes_s']:,.0f} lignes/s, {stats['nb_groupes']} groupes")
+    else:
+        agregats, stats = agreger_dvf(args.fichiers, charger_referentiels(), args.taille_bloc)
+        os.makedirs(os.path.dirname(args.sortie), exist_ok=True)
+        agregats.to_csv(args.sortie, sep=";", index=False)
+        print(f"✅ {stats['lignes_retenues']:,}/{stats['lignes_lues']:,} transactions retenues, "
+              f"{len(agregats)} agrégats exportés : {args.sortie} ({stats['debit_lignes_s']:,.0f} lignes/s)")
@@ -0,0 +1,147 @@
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from ingestion_dvf import (CHEMIN_AGREGATS, CLES_AGREGATION, DOSSIER_DVF, TAILLE_BLOC, AgregateurMensuel,
+                           charger_referentiels, lire_transactions)
+from prevision_prophet import CLES_SERIE, marquer_perimees, nom_serie
+
+# === Partitions (mois × département) et leurs sommes de contrôle ===
+CHEMIN_CHECKSUMS = os.path.join(DOSSIER_DVF, "checksums_partitions.csv")
+CLES_PARTITION = ["mois", "code_departement"]
+COLONNES_EMPREINTE = ["id_mutation", "mois", "code_commune", "type_bien", "surface", "valeur_fonciere"]
+
+
+class ChecksumsPartitions:
+    """Somme de contrôle par partition, indépendante de l'ordre des lignes (somme modulo 2⁶⁴ des hachages)"""
+
+    def __init__(self):
+        self.index = {}
+        self.sommes = []
+        self.nb = []
+
+    def ajouter(self, bloc):
+        if bloc.empty:
+            return
+        hachages = pd.util.hash_pandas_object(bloc[COLONNES_EMPREINTE], index=False).to_numpy(dtype="uint64")
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(bloc[CLES_PARTITION]))
+        sommes = np.zeros(len(uniques), dtype="uint64")
+        np.add.at(sommes, codes, hachages)
+        nb = np.bincount(codes, minlength=len(uniques))
+        for cle, somme, n in zip(uniques, sommes, nb):
+            ligne = self.index.get(cle)
+            if ligne is None:
+                self.index[cle] = len(self.sommes)
+                self.sommes.append(np.uint64(0))
+                self.nb.append(0)
+                ligne = self.index[cle]
+            with np.errstate(over="ignore"):
+                self.sommes[ligne] = np.uint64(self.sommes[ligne] + somme)
+            self.nb[ligne] += int(n)
+
+    def resultat(self):
+        df = pd.DataFrame(list(self.index.keys()), columns=CLES_PARTITION)
+        df["nb_transactions"] = self.nb
+        df["checksum"] = [f"{int(s):016x}" for s in self.sommes]
+        return df.sort_values(CLES_PARTITION).reset_index(drop=True)
+
+
+def charger_checksums(chemin=CHEMIN_CHECKSUMS):
+    if not os.path.exists(chemin):
+        return pd.DataFrame(columns=CLES_PARTITION + ["nb_transactions", "checksum"])
+    return pd.read_csv(chemin, sep=";", dtype={"code_departement": str, "checksum": str})
+
+
+def initialiser(chemins_dvf, referentiels, chemin_agregats=CHEMIN_AGREGATS, chemin_checksums=CHEMIN_CHECKSUMS,
+                taille_bloc=TAILLE_BLOC):
+    """Construction complète : agrégats mensuels et sommes de contrôle en une seule passe"""
+    agregateur, checksums = AgregateurMensuel(), ChecksumsPartitions()
+    for chemin in chemins_dvf:
+        for bloc in lire_transactions(chemin, referentiels, taille_bloc):
+            agregateur.ajouter(bloc)
+            checksums.ajouter(bloc)
+    agregateur.resultat(referentiels["nom_region"]).to_csv(chemin_agregats, sep=";", index=False)
+    checksums.resultat().to_csv(chemin_checksums, sep=";", index=False)
+
+
+def partitions_modifiees(nouveaux, anciens):
+    """Partitions nouvelles ou dont la somme de contrôle a changé"""
+    comparaison = nouveaux.merge(anciens[CLES_PARTITION + ["checksum"]], on=CLES_PARTITION,
+                                 how="left", suffixes=("", "_ancien"))
+    modifiees = comparaison["checksum"] != comparaison["checksum_ancien"]
+    return comparaison.loc[modifiees, CLES_PARTITION]
+
+
+def mettre_a_jour(chemins_dvf, referentiels, chemin_agregats=CHEMIN_AGREGATS, chemin_checksums=CHEMIN_CHECKSUMS,
+                  taille_bloc=TAILLE_BLOC):
+    """Intègre une nouvelle livraison DVF en ne recalculant que les partitions modifiées
+
+    1re passe : sommes de contrôle des partitions de la livraison (hachage seul).
+    2e passe : agrégation des seules transactions appartenant aux partitions modifiées.
+    Les partitions absentes de la livraison sont conservées telles quelles.
+    """
+    debut = time.perf_counter()
+    checksums = ChecksumsPartitions()
+    for chemin in chemins_dvf:
+        for bloc in lire_transactions(chemin, referentiels, taille_bloc):
+            checksums.ajouter(bloc)
+    nouveaux = checksums.resultat()
+    anciens = charger_checksums(chemin_checksums)
+    modifiees = partitions_modifiees(nouveaux, anciens)
+
+    stats = {"nb_partitions_livrees": len(nouveaux), "nb_partitions_modifiees": len(modifiees),
+             "series_perimees": []}
+    if modifiees.empty:
+        stats["duree_s"] = time.perf_counter() - debut
+        return stats
+
+    cles_modifiees = pd.MultiIndex.from_frame(modifiees)
+    agregateur = AgregateurMensuel()
+    for chemin in chemins_dvf:
+        for bloc in lire_transactions(chemin, referentiels, taille_bloc):
+            dans_partition = pd.MultiIndex.from_frame(bloc[CLES_PARTITION]).isin(cles_modifiees)
+            agregateur.ajouter(bloc[dans_partition])
+    recalcules = agregateur.resultat(referentiels["nom_region"])
+
+    # Remplacement des partitions modifiées dans les agrégats existants
+    if os.path.exists(chemin_agregats):
+        agregats = pd.read_csv(chemin_agregats, sep=";", dtype={"code_departement": str, "code_region": str})
+        remplaces = pd.MultiIndex.from_frame(agregats[CLES_PARTITION]).isin(cles_modifiees)
+        anciens_groupes = agregats[remplaces]
+        agregats = pd.concat([agregats[~remplaces], recalcules], ignore_index=True)
+    else:
+        anciens_groupes = recalcules.iloc[:0]
+        agregats = recalcules
+    agregats.sort_values(CLES_AGREGATION).to_csv(chemin_agregats, sep=";", index=False)
+
+    # Mise à jour des sommes de contrôle des seules partitions livrées
+    livrees = pd.MultiIndex.from_frame(nouveaux[CLES_PARTITION])
+    anciens = anciens[~pd.MultiIndex.from_frame(anciens[CLES_PARTITION]).isin(livrees)]
+    pd.concat([anciens, nouveaux], ignore_index=True).sort_values(CLES_PARTITION) \
+        .to_csv(chemin_checksums, sep=";", index=False)
+
+    # Prévisions périmées : uniquement les séries touchées par une partition modifiée
+    touchees = pd.concat([anciens_groupes[CLES_SERIE], recalcules[CLES_SERIE]]).drop_duplicates()
+    noms = [nom_serie(cle) for cle in touchees.itertuples(index=False)]
+    stats["series_perimees"] = marquer_perimees(noms)
+    stats["duree_s"] = time.perf_counter() - debut
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mise à jour incrémentale des agrégats DVF par partition mois × département")
+    parser.add_argument("fichiers", nargs="+", help="fichiers DVF de la nouvelle livraison")
+    parser.add_argument("--initialiser", action="store_true", help="reconstruire agrégats et sommes de contrôle")
+    args = parser.parse_args()
+
+    referentiels = charger_referentiels()
+    if args.initialiser:
+        initialiser(args.fichiers, referentiels)
+        print(f"✅ Agrégats et sommes de contrôle initialisés : {CHEMIN_AGREGATS}, {CHEMIN_CHECKSUMS}")
+    else:
+        stats = mettre_a_jour(args.fichiers, referentiels)
+        print(f"✅ {stats['nb_partitions_modifiees']}/{stats['nb_partitions_livrees']} partitions recalculées, "
+              f"{len(stats['series_perimees'])} séries de prévision marquées périmées ({stats['duree_s']:.1f} s)")
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import optuna
+from optuna.storages import RDBStorage
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.model_selection import KFold
+
+from transformation_annonces import COLONNES_HORS_MODELE, ENCODAGE_REFERENCE, FICHIERS_REFERENCE
+
+# === Jeux d'entraînement, études Optuna et modèles exportés ===
+FICHIERS_CIBLE = {"appart": "data/y_a_test.csv", "maison": "data/y_m_test.csv"}
+CHEMIN_ETUDES = "data/optuna/etudes.db"
+DOSSIER_MODELES = "models"
+MODELES_RETENUS = {"appart": "extratrees", "maison": "xgboost"}  # cf. page Évaluation
+PREFIXES = {"extratrees": "et", "randomforest": "rf", "xgboost": "xgb", "lightgbm": "lgbm"}
+NB_ESSAIS = 30
+NB_PLIS = 5
+GRAINE = 42
+
+
+def charger_jeu(type_bien):
+    """Matrice encodée (colonnes du modèle) et prix au m² cible"""
+    encode = pd.read_csv(FICHIERS_REFERENCE[type_bien][1], sep=";", encoding=ENCODAGE_REFERENCE)
+    X = encode.drop(columns=[c for c in COLONNES_HORS_MODELE if c in encode.columns]).astype("float32")
+    y = pd.read_csv(FICHIERS_CIBLE[type_bien]).iloc[:, 0].to_numpy(dtype="float64")
+    return X, y
+
+
+# === Espaces de recherche par famille de modèles ===
+def _espace_extratrees(trial):
+    return {"n_estimators": trial.suggest_int("n_estimators", 100, 500, step=50),
+            "max_depth": trial.suggest_int("max_depth", 8, 40),
+            "min_samples_split": trial.suggest_int("min_samples_split", 2, 10),
+            "max_features": trial.suggest_categorical("max_features", ["sqrt", "log2", 0.5, 1.0]),
+            "bootstrap": trial.suggest_categorical("bootstrap", [True, False])}
+
+
+def _espace_xgboost(trial):
+    return {"n_estimators": trial.suggest_int("n_estimators", 100, 600, step=50),
+            "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.3, log=True),
+            "max_depth": trial.suggest_int("max_depth", 3, 10),
+            "subsample": trial.suggest_float("subsample", 0.5, 1.0),
+            "colsample_bytree": trial.suggest_float("colsample_bytree", 0.5, 1.0),
+            "min_child_weight": trial.suggest_float("min_child_weight", 1, 20, log=True),
+            "reg_lambda": trial.suggest_float("reg_lambda", 1e-3, 10, log=True)}
+
+
+def _espace_lightgbm(trial):
+    return {"n_estimators": trial.suggest_int("n_estimators", 100, 600, step=50),
+            "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.3, log=True),
+            "num_leaves": trial.suggest_int("num_leaves", 15, 255, log=True),
+            "max_depth": trial.suggest_int("max_depth", 3, 12),
+            "min_child_samples": trial.suggest_int("min_child_samples", 5, 60),
+            "subsample": trial.suggest_float("subsample", 0.5, 1.0),
+            "subsample_freq": 1,
+            "colsample_bytree": trial.suggest_float("colsample_bytree", 0.5, 1.0)}
+
+
+ESPACES = {"extratrees": _espace_extratrees, "randomforest": _espace_extratrees,
+           "xgboost": _espace_xgboost, "lightgbm": _espace_lightgbm}
+
+
+def construire_modele(famille, params, n_jobs=1, graine=GRAINE):
+    if famille == "extratrees":
+        return ExtraTreesRegressor(**params, n_jobs=n_jobs, random_state=graine)
+    if famille == "randomforest":
+        return RandomForestRegressor(**params, n_jobs=n_jobs, random_state=graine)
+    if famille == "xgboost":
+        from xgboost import XGBRegressor
+        return XGBRegressor(**params, n_jobs=n_jobs, random_state=graine)
+    if famille == "lightgbm":
+        from lightgbm import LGBMRegressor
+        return LGBMRegressor(**params, n_jobs=n_jobs, random_state=graine, verbose=-1)
+    raise ValueError(f"Famille de modèle inconnue : {famille}")
+
+
+# === Études persistantes ===
+def stockage(chemin=CHEMIN_ETUDES):
+    """Stockage SQLite partagé par les processus (attente sur verrou plutôt qu'échec en écriture concurrente)"""
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    return RDBStorage(f"sqlite:///{chemin}", engine_kwargs={"connect_args": {"timeout": 60}})
+
+
+def elagueur(nom, nb_plis=NB_PLIS):
+    """Élagage sur la RMSE cumulée pli après pli : un essai mal parti n'évalue pas tous ses plis"""
+    if nom == "hyperband":
+        return optuna.pruners.HyperbandPruner(min_resource=1, max_resource=nb_plis, reduction_factor=3)
+    return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+
+
+def nom_etude(type_bien, famille):
+    return f"{type_bien}_{famille}"
+
+
+def objectif(trial, famille, X, y, plis):
+    """RMSE de validation croisée ; la moyenne courante est rapportée après chaque pli"""
+    params = ESPACES[famille](trial)
+    erreurs = []
+    for etape, (apprentissage, validation) in enumerate(plis):
+        modele = construire_modele(famille, params)
+        modele.fit(X[apprentissage], y[apprentissage])
+        residus = modele.predict(X[validation]) - y[validation]
+        erreurs.append(np.sqrt(np.mean(residus ** 2)))
+        trial.report(float(np.mean(erreurs)), etape)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+    return float(np.mean(erreurs))
+
+
+def _optimiser_worker(type_bien, famille, chemin_etudes, nom_elagueur, nb_essais, graine):
+    """Processus de travail : recharge le jeu et rejoint l'étude via le stockage SQLite"""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    X, y = charger_jeu(type_bien)
+    X = X.to_numpy()
+    plis = list(KFold(NB_PLIS, shuffle=True, random_state=GRAINE).split(X))
+    etude = optuna.load_study(study_name=nom_etude(type_bien, famille), storage=stockage(chemin_etudes),
+                              sampler=optuna.samplers.TPESampler(seed=graine),
+                              pruner=elagueur(nom_elagueur))
+    # Plafond global : les workers s'arrêtent dès que l'étude totalise `nb_essais` essais terminés ou élagués
+    etude.optimize(lambda trial: objectif(trial, famille, X, y, plis), n_trials=nb_essais,
+                   callbacks=[MaxTrialsCallback(nb_essais, states=(TrialState.COMPLETE, TrialState.PRUNED))])
+
+
+def chemin_export(type_bien, famille, exporter=False, dossier_modeles=DOSSIER_MODELES):
+    """Modèle candidat par défaut ; le modèle servi par les pages n'est remplacé que sur demande explicite"""
+    nom = f"{PREFIXES[famille]}_{type_bien}.pkl"
+    return os.path.join(dossier_modeles, nom if exporter else f"candidat_{nom}")
+
+
+def optimiser(type_bien, famille=None, nb_essais=NB_ESSAIS, n_workers=None, nom_elagueur="median",
+              chemin_etudes=CHEMIN_ETUDES, dossier_modeles=DOSSIER_MODELES, exporter=False):
+    """Étude reprise si elle existe, essais répartis sur `n_workers` processus, meilleur modèle sauvegardé
+
+    Le jeu disponible est le jeu de test du pipeline d'origine, celui sur lequel les pages Simulateur et
+    Évaluation mesurent les modèles : le modèle réentraîné est donc un candidat (`candidat_*.pkl`), et
+    n'écrase le modèle servi qu'avec `exporter=True`.
+    """
+    famille = famille or MODELES_RETENUS[type_bien]
+    n_workers = n_workers or os.cpu_count()
+    debut = time.perf_counter()
+    etude = optuna.create_study(study_name=nom_etude(type_bien, famille), storage=stockage(chemin_etudes),
+                                direction="minimize", load_if_exists=True)
+    deja_faits = len(etude.get_trials(deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED)))
+
+    if deja_faits < nb_essais:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_optimiser_worker, type_bien, famille, chemin_etudes, nom_elagueur, nb_essais,
+                                   GRAINE + i) for i in range(n_workers)]
+            for future in futures:
+                future.result()
+    duree_recherche = time.perf_counter() - debut
+
+    # Réentraînement sur tout le jeu avec les meilleurs hyperparamètres
+    etude = optuna.load_study(study_name=nom_etude(type_bien, famille), storage=stockage(chemin_etudes))
+    X, y = charger_jeu(type_bien)
+    modele = construire_modele(famille, etude.best_params, n_jobs=-1)
+    modele.fit(X, y)
+    chemin_modele = chemin_export(type_bien, famille, exporter, dossier_modeles)
+    joblib.dump(modele, chemin_modele)
+
+    etats = pd.Series([t.state.name for t in etude.get_trials(deepcopy=False)]).value_counts()
+    rapport = {"type_bien": type_bien, "famille": famille, "modele": chemin_modele, "exporte": exporter,
+               "donnees_entrainement": {"X": FICHIERS_REFERENCE[type_bien][1], "y": FICHIERS_CIBLE[type_bien],
+                                        "nb_lignes": len(y),
+                                        "remarque": "jeu de test du pipeline d'origine (aucune donnée hors "
+                                                    "échantillon pour évaluer ce modèle)"},
+               "elagueur": nom_elagueur,
+               "rmse_cv": etude.best_value, "params": etude.best_params,
+               "nb_essais_termines": int(etats.get("COMPLETE", 0)), "nb_essais_elagues": int(etats.get("PRUNED", 0)),
+               "nb_essais_repris": deja_faits, "n_workers": n_workers,
+               "duree_recherche_s": duree_recherche, "duree_totale_s": time.perf_counter() - debut}
+    with open(os.path.join(dossier_modeles, f"optuna_{type_bien}.json"), "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=2)
+    return rapport
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Réoptimisation Optuna des modèles appartement / maison")
+    parser.add_argument("--types", nargs="+", default=list(MODELES_RETENUS), choices=list(MODELES_RETENUS))
+    parser.add_argument("--famille", choices=list(ESPACES), help="par défaut : modèle retenu pour chaque type")
+    parser.add_argument("--essais", type=int, default=NB_ESSAIS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--elagueur", choices=["median", "hyperband"], default="median")
+    parser.add_argument("--etudes", default=CHEMIN_ETUDES, help="fichier SQLite des études (reprise automatique)")
+    parser.add_argument("--exporter", action="store_true",
+                        help="remplacer le modèle servi par les pages (par défaut : models/candidat_*.pkl)")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    for type_bien in args.types:
+        rapport = optimiser(type_bien, args.famille, args.essais, args.workers, args.elagueur, args.etudes,
+                            exporter=args.exporter)
+        print(f"✅ {type_bien} / {rapport['famille']} : RMSE CV {rapport['rmse_cv']:.2f} € "
+              f"({rapport['nb_essais_termines']} essais terminés, {rapport['nb_essais_elagues']} élagués, "
+              f"{rapport['duree_totale_s']:.1f} s) → {rapport['modele']}")
+    print(f"✅ Réoptimisation complète en {time.perf_counter() - debut:.1f} s (temps réel)")
@@ -8,6 +8,56 @@ warnings.filterwarnings("ignore")  # Ignore warnings for cleaner output
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))  # Add current directory to path
+from chargement_donnees import CHEMIN_ANNONCES
+from profil_eda import CHEMIN_PROFIL, generer_profil, charger_profil
+from cache_figures import afficher_figure
+
+
+@st.cache_data(show_spinner="Profilage des données…")
+def obtenir_profil(date_modif_donnees):
+    """Résumés pré-calculés ; l'artefact n'est régénéré que si l'empreinte des données change"""
+    if os.path.exists(CHEMIN_ANNONCES):
+        return generer_profil()[0]
+    return charger_profil()
+
+
+def dessiner_distribution(histo):
+    bornes = np.array(histo["bornes"])
+    fig1, ax1 = plt.subplots(figsize=(10, 4))
+    ax1.bar(bornes[:-1], histo["comptes"], width=np.diff(bornes), align="edge", color="#1f77b4", alpha=0.6,
+            edgecolor="white")
+    ax1.plot(histo["kde_x"], histo["kde_y"], color="#1f77b4")
+    ax1.set_title("Distribution du prix au m² (log10)", fontsize=14)
+    ax1.set_xlabel("log₁₀(prix_m2) → échelle logarithmique", fontsize=12)
+    ax1.set_ylabel("Nombre d’occurrences", fontsize=12)
+    ax1.grid(True, which="both", linestyle="--", linewidth=0.5)
+
+    # Annotation facultative pour la soutenance
+    median_val = histo["mediane"]
+    ax1.axvline(np.log10(median_val), color='red', linestyle='--')
+    ax1.text(np.log10(median_val)+0.1, ax1.get_ylim()[1]*0.9,
+         f"Médiane : {int(median_val)} €/m²", color="red")
+    ax1.set_xscale("log")
+    ax1.set_title("Distribution du prix au m² (log scale)")
+    return fig1
+
+
+def dessiner_boites_dpe(boites):
+    fig2, ax2 = plt.subplots(figsize=(8, 4))
+    elements = ax2.bxp(boites, patch_artist=True, showfliers=True)
+    for boite, couleur in zip(elements["boxes"], sns.color_palette("Set2", len(boites))):
+        boite.set_facecolor(couleur)
+    ax2.set_xlabel("dpeL")
+    ax2.set_ylabel("prix_m2_vente")
+    ax2.set_title("Boxplot prix_m2 selon la classe DPE (dpeL)")
+    return fig2
+
+
+def dessiner_correlation(corr_matrix):
+    fig3, ax3 = plt.subplots(figsize=(12, 8))
+    sns.heatmap(corr_matrix, annot=False, cmap="coolwarm", fmt=".2f", ax=ax3)
+    ax3.set_title("Matrice de corrélation des variables numériques")
+    return fig3
 
 
 st.set_page_config(page_title="Exploration des Données", layout="wide")
@@ -43,21 +93,23 @@ st.markdown("""
 
 try:
     # Chargement du fichier enrichi final utilisé pour le rapport
-    df = pd.read_csv("data/annonces_ventes_enrichies_rvf_bpe.csv", sep=";", encoding="latin1")
+    # Les visuels sont rendus depuis le profil pré-calculé (valeurs aberrantes 500–8000 €/m² déjà filtrées)
+    date_modif = os.path.getmtime(CHEMIN_ANNONCES) if os.path.exists(CHEMIN_ANNONCES) else os.path.getmtime(CHEMIN_PROFIL)
+    profil = obtenir_profil(date_modif)
+    # Les figures ne dépendent que du profil : son empreinte suffit comme clé de cache
+    empreinte = f"{profil.get('empreinte')}:{profil.get('mode', 'exact')}"
     st.success("✅ Données chargées avec succès.")
+    if profil.get("mode") == "flux":
+        st.caption("≈ Statistiques approchées calculées en une passe (sketches de quantiles, histogrammes fusionnables).")
 
     # Sélection rapide de colonnes pertinentes si présentes
     st.markdown("### 🧾 Aperçu rapide du dataset (5 premières lignes)")
-    st.dataframe(df.head())
-
-    # Nettoyage léger : filtrer les valeurs aberrantes de prix_m2 pour lisibilité
-    if "prix_m2_vente" in df.columns:
-        df = df[df["prix_m2_vente"].between(500, 8000)]
+    apercu = profil["apercu"]
+    st.dataframe(pd.DataFrame(apercu["data"], columns=apercu["columns"], index=apercu["index"]))
 
     # 1️⃣ Taux de valeurs manquantes
     st.markdown("### 1️⃣ Analyse rapide des valeurs manquantes")
-    na_percent = df.isna().mean().sort_values(ascending=False) * 100
-    na_filtered = na_percent[na_percent > 5]
+    na_filtered = pd.Series(profil["na"]["taux"], index=profil["na"]["colonnes"], dtype="float64")
 
     if not na_filtered.empty:
         st.dataframe(na_filtered.round(1).to_frame(name="Taux de NA (%)"))
@@ -73,22 +125,8 @@ try:
     La variable `prix_m2_vente` est la **cible principale** du projet.  
     Cette distribution log-normale justifie le recours à une transformation logarithmique et au filtrage des outliers.
     """)
-    fig1, ax1 = plt.subplots(figsize=(10, 4))
-    log_prices = np.log10(df["prix_m2_vente"])
-    sns.histplot(log_prices, bins=50, kde=True, ax=ax1, color="#1f77b4")
-    ax1.set_title("Distribution du prix au m² (log10)", fontsize=14)
-    ax1.set_xlabel("log₁₀(prix_m2) → échelle logarithmique", fontsize=12)
-    ax1.set_ylabel("Nombre d’occurrences", fontsize=12)
-    ax1.grid(True, which="both", linestyle="--", linewidth=0.5)
-
-    # Annotation facultative pour la soutenance
-    median_val = np.median(df["prix_m2_vente"])
-    ax1.axvline(np.log10(median_val), color='red', linestyle='--')
-    ax1.text(np.log10(median_val)+0.1, ax1.get_ylim()[1]*0.9,
-         f"Médiane : {int(median_val)} €/m²", color="red")
-    ax1.set_xscale("log")
-    ax1.set_title("Distribution du prix au m² (log scale)")
-    st.pyplot(fig1)
+    histo = profil["histogramme"]
+    afficher_figure(empreinte, "distribution_prix_m2", {"figsize": (10, 4)}, dessiner_distribution, histo)
 
     st.markdown("""
     La distribution du prix_m2 est fortement asymétrique et suit une loi log-normale, comme souvent en immobilier.
@@ -98,7 +136,7 @@ try:
     """)
 
     # 3️⃣ Analyse du DPE (classe énergétique)
-    if "dpeL" in df.columns:
+    if "boites_dpe" in profil:
         st.markdown("### 2️⃣ Impact du DPE sur le prix au m²")
         st.markdown("""
         Le **DPE (Diagnostic de Performance Énergétique)** est une variable catégorielle ordinale importante.  
@@ -106,12 +144,9 @@ try:
         """)
 
         # Définir un ordre explicite des classes DPE
-        ordre_dpe = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'NS', 'VI', '0']
-        df['dpeL'] = pd.Categorical(df['dpeL'], categories=ordre_dpe, ordered=True)
-        fig2, ax2 = plt.subplots(figsize=(8, 4))
-        sns.boxplot(data=df, x="dpeL", y="prix_m2_vente", ax=ax2, order=ordre_dpe, palette="Set2")
-        ax2.set_title("Boxplot prix_m2 selon la classe DPE (dpeL)")
-        st.pyplot(fig2)
+        boites = [dict(stats, label=classe) for classe, stats in profil["boites_dpe"].items()]
+        afficher_figure(empreinte, "boxplot_dpe", {"figsize": (8, 4), "palette": "Set2"},
+                        dessiner_boites_dpe, boites)
 
     st.markdown("""
     Les biens classés A, B, C présentent une valeur médiane plus élevée, ce qui traduit une meilleure valorisation à la vente.
@@ -126,13 +161,11 @@ try:
     La matrice de corrélation permet de visualiser les redondances et liens linéaires entre variables quantitatives.  
     Cela permet de guider la **sélection de features** et de détecter la multicolinéarité.
     """)
-    numeric_df = df.select_dtypes(include=["float64", "int64"]).dropna(axis=1)
-    corr_matrix = numeric_df.corr()
+    corr_matrix = pd.DataFrame(profil["correlation"]["valeurs"], index=profil["correlation"]["colonnes"],
+                               columns=profil["correlation"]["colonnes"])
 
-    fig3, ax3 = plt.subplots(figsize=(12, 8))
-    sns.heatmap(corr_matrix, annot=False, cmap="coolwarm", fmt=".2f", ax=ax3)
-    ax3.set_title("Matrice de corrélation des variables numériques")
-    st.pyplot(fig3)
+    afficher_figure(empreinte, "correlation", {"figsize": (12, 8), "cmap": "coolwarm"},
+                    dessiner_correlation, corr_matrix)
 
     st.markdown("""
     L’analyse de la matrice de corrélation montre :
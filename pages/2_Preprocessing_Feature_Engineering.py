@@ -3,6 +3,15 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from chargement_donnees import charger_annonces, afficher_rapport_memoire, empreinte_annonces
+from cache_figures import afficher_figure
+
+
+def dessiner_distribution(prix):
+    fig2, ax2 = plt.subplots(figsize=(8, 3))
+    sns.histplot(prix.dropna(), bins=50, kde=True, ax=ax2, color="#1f77b4")
+    ax2.set_title("Distribution du prix au m² après nettoyage")
+    return fig2
 
 st.set_page_config(page_title="Préprocessing & Feature Engineering", layout="wide")
 st.title("🛠️ Préprocessing & Feature Engineering")
@@ -46,8 +55,9 @@ Ce pipeline est le cœur du traitement des données avant modélisation. Il suit
 # 📦 Chargement du dataset pré-nettoyé
 st.markdown("## 📦 Données enrichies et nettoyées")
 try:
-    df = pd.read_csv("data/annonces_ventes_enrichies_rvf_bpe.csv", sep=";", encoding="latin1")
+    df, rapport_memoire = charger_annonces()
     st.success(f"✅ Données chargées : {df.shape[0]} lignes, {df.shape[1]} colonnes.")
+    afficher_rapport_memoire(rapport_memoire)
 except Exception as e:
     st.error(f"Erreur lors du chargement du dataset : {e}")
 st.markdown("---")
@@ -88,10 +98,8 @@ with st.expander("📊 Visualisations post-traitement"):
 
     if "prix_m2_vente" in df.columns:
         st.markdown("### ➤ Distribution du prix au m² (nettoyé)")
-        fig2, ax2 = plt.subplots(figsize=(8, 3))
-        sns.histplot(df["prix_m2_vente"].dropna(), bins=50, kde=True, ax=ax2, color="#1f77b4")
-        ax2.set_title("Distribution du prix au m² après nettoyage")
-        st.pyplot(fig2)
+        afficher_figure(empreinte_annonces(), "distribution_prix_m2_nettoye", {"figsize": (8, 3), "bins": 50},
+                        dessiner_distribution, df["prix_m2_vente"])
 
         st.markdown("#### Analyse de la distribution du prix au m²")
         st.markdown("""
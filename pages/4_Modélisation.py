@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import plotly.express as px
 import os
 
 st.set_page_config(page_title="Modélisation", layout="wide")
@@ -16,49 +17,108 @@ st.markdown("- RMSE : Erreur quadratique moyenne")
 st.markdown("- MAE : Erreur absolue moyenne")
 st.markdown("- R² : Coefficient de détermination")
 
-# Résultats Appartements
-st.markdown("### 📈 Résultats Appartements")
-df_appartements = pd.DataFrame({
-    "Modèle": ["ExtraTrees", "XGBoost", "LightGBM", "RandomForest", "GradientBoosting", "MLP", "LinearRegression", "Ridge", "Lasso", "ElasticNet", "DecisionTree", "AdaBoost", "SVR", "Dummy", "KNN", "GaussianProcess"],
-    "RMSE": [519.14, 524.30, 528.04, 530.96, 600.57, 658.98, 697.81, 702.76, 706.65, 725.40, 782.23, 831.01, 1071.85, 1073.90, 1139.83, 2760.44],
-    "MAE": [348.92, 371.19, 384.56, 372.77, 441.79, 490.84, 528.12, 530.36, 532.82, 547.94, 512.92, 664.04, 862.83, 877.53, 868.75, 2542.09],
-    "R²": [0.7663, 0.7616, 0.7582, 0.7555, 0.6872, 0.6234, 0.5777, 0.5717, 0.5670, 0.5437, 0.4694, 0.4011, 0.0037, -0.00006, -0.1266, -5.6074]
-})
-st.dataframe(df_appartements, use_container_width=True)
-
-# Résultats Maisons
-st.markdown("### 🏠 Résultats Maisons")
-df_maisons = pd.DataFrame({
-    "Modèle": ["XGBoost", "LightGBM", "RandomForest", "ExtraTrees", "GradientBoosting", "MLP", "Ridge", "LinearRegression", "Lasso", "ElasticNet", "AdaBoost", "DecisionTree", "KNN", "SVR", "Dummy", "GaussianProcess"],
-    "RMSE": [574.29, 579.64, 594.22, 601.68, 634.32, 650.04, 705.67, 705.93, 707.62, 730.50, 785.36, 863.95, 899.70, 949.24, 950.90, 2888.75],
-    "MAE": [415.66, 414.93, 415.57, 416.72, 452.95, 471.33, 518.07, 518.29, 519.84, 534.27, 601.80, 592.54, 678.35, 724.77, 725.69, 2683.95],
-    "R²": [0.6348, 0.6279, 0.6090, 0.5991, 0.5544, 0.5321, 0.4486, 0.4482, 0.4456, 0.4091, 0.3170, 0.1735, 0.1037, 0.0023, -0.0011, -8.2398]
-})
-st.dataframe(df_maisons, use_container_width=True)
-
-# Affichage des visuels comparatifs sauvegardés
-st.markdown("### 📊 Visualisations comparatives des performances")
-image_paths = [
-    "data/rmse_maisons.png",
-    "data/mae_maisons.png",
-    "data/r2_maisons.png",
-    "data/rmse_apparts.png",
-    "data/mae_apparts.png",
-    "data/r2_apparts.png"
-]
-
-for path in image_paths:
-    if os.path.exists(path):
-        st.image(path, use_container_width=True)
-    else:
-        st.warning(f"Image non trouvée : {path}")
-
-st.markdown("## 🎯 Sélection des modèles pour la suite")
-st.success("➡️ **ExtraTrees** est retenu pour les **appartements** (meilleure performance globale - R² = 0.7663).\n"
-           "➡️ **XGBoost** est retenu pour les **maisons** (meilleur compromis RMSE/MAE/R²).")
-
-st.markdown("## 📊 Analyse comparative Apparts vs Maisons")
-st.markdown("""
+CHEMIN_CLASSEMENT = "data/classement_modeles.csv"
+
+
+@st.cache_data
+def lire_classement(date_modif):
+    return pd.read_csv(CHEMIN_CLASSEMENT, sep=";")
+
+
+classement = lire_classement(os.path.getmtime(CHEMIN_CLASSEMENT)) if os.path.exists(CHEMIN_CLASSEMENT) else None
+
+if classement is not None:
+    # Résultats du comparatif (python classement_modeles.py) : précision et coût de service
+    st.caption("ℹ️ Modèles réajustés sur un découpage 80 / 20 des jeux de test (~2 700 biens par type) : "
+               "les scores ne sont pas directement comparables à ceux de l'évaluation d'origine.")
+    colonnes = {"fit_s": "Ajustement (s)", "latence_ms": "Latence 1 ligne (ms)",
+                "debit_lignes_s": "Débit (lignes/s)", "taille_ko": "Taille (Ko)"}
+    for type_bien, titre in [("appart", "### 📈 Résultats Appartements"), ("maison", "### 🏠 Résultats Maisons")]:
+        resultats = classement[classement["type_bien"] == type_bien].drop(columns="type_bien")
+        if resultats.empty:
+            continue
+        st.markdown(titre)
+        st.dataframe(resultats.sort_values("RMSE").rename(columns=colonnes).round(
+            {"RMSE": 2, "MAE": 2, "R²": 4, "Ajustement (s)": 3, "Latence 1 ligne (ms)": 3, "Débit (lignes/s)": 0,
+             "Taille (Ko)": 1}), use_container_width=True, hide_index=True)
+
+    st.markdown("### ⚖️ Précision vs latence de prédiction")
+    st.markdown("Chaque point est un modèle : en bas à gauche, les modèles à la fois précis et rapides à servir "
+                "(latence d'une prédiction unitaire, comme dans le simulateur).")
+    metrique_cout = st.radio("Coût", ["latence_ms", "taille_ko", "fit_s"], horizontal=True,
+                             format_func=colonnes.get)
+    fig = px.scatter(classement[classement["R²"] > 0], x=metrique_cout, y="RMSE", color="type_bien",
+                     text="Modèle", log_x=True, labels={**colonnes, "type_bien": "Type de bien"})
+    fig.update_traces(textposition="top center")
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Conclusion tirée du tableau affiché
+    meilleurs = classement.sort_values("RMSE").groupby("type_bien").first()
+    noms_types = {"appart": "appartements", "maison": "maisons"}
+    st.markdown("## 🎯 Sélection des modèles pour la suite")
+    st.success("\n".join(
+        f"➡️ **{ligne['Modèle']}** obtient le meilleur RMSE sur les **{noms_types.get(type_bien, type_bien)}** "
+        f"({ligne['RMSE']:.2f} €/m², R² = {ligne['R²']:.3f})." for type_bien, ligne in meilleurs.iterrows()))
+    st.info("Les modèles servis par le simulateur (ExtraTrees pour les appartements, XGBoost pour les maisons) "
+            "restent ceux choisis lors de l'évaluation d'origine.")
+
+    st.markdown("## 📊 Analyse comparative Apparts vs Maisons")
+    ensembles = ["ExtraTrees", "RandomForest", "XGBoost", "LightGBM", "GradientBoosting"]
+    lineaires = ["LinearRegression", "Ridge", "Lasso", "ElasticNet"]
+    lignes = []
+    for type_bien, ligne in meilleurs.iterrows():
+        resultats = classement[classement["type_bien"] == type_bien]
+        r2_ensembles = resultats.loc[resultats["Modèle"].isin(ensembles), "R²"].max()
+        r2_lineaires = resultats.loc[resultats["Modèle"].isin(lineaires), "R²"].max()
+        lignes.append(f"- **{noms_types.get(type_bien, type_bien).capitalize()}** : R² maximal "
+                      f"{ligne['R²']:.3f} ({ligne['Modèle']}), écart RMSE − MAE du meilleur modèle "
+                      f"{ligne['RMSE'] - ligne['MAE']:.0f} €/m² ; meilleur modèle d'ensemble R² {r2_ensembles:.3f} "
+                      f"contre {r2_lineaires:.3f} pour le meilleur modèle linéaire.")
+    st.markdown("\n".join(lignes))
+else:
+    # Résultats Appartements
+    st.markdown("### 📈 Résultats Appartements")
+    df_appartements = pd.DataFrame({
+        "Modèle": ["ExtraTrees", "XGBoost", "LightGBM", "RandomForest", "GradientBoosting", "MLP", "LinearRegression", "Ridge", "Lasso", "ElasticNet", "DecisionTree", "AdaBoost", "SVR", "Dummy", "KNN", "GaussianProcess"],
+        "RMSE": [519.14, 524.30, 528.04, 530.96, 600.57, 658.98, 697.81, 702.76, 706.65, 725.40, 782.23, 831.01, 1071.85, 1073.90, 1139.83, 2760.44],
+        "MAE": [348.92, 371.19, 384.56, 372.77, 441.79, 490.84, 528.12, 530.36, 532.82, 547.94, 512.92, 664.04, 862.83, 877.53, 868.75, 2542.09],
+        "R²": [0.7663, 0.7616, 0.7582, 0.7555, 0.6872, 0.6234, 0.5777, 0.5717, 0.5670, 0.5437, 0.4694, 0.4011, 0.0037, -0.00006, -0.1266, -5.6074]
+    })
+    st.dataframe(df_appartements, use_container_width=True)
+
+    # Résultats Maisons
+    st.markdown("### 🏠 Résultats Maisons")
+    df_maisons = pd.DataFrame({
+        "Modèle": ["XGBoost", "LightGBM", "RandomForest", "ExtraTrees", "GradientBoosting", "MLP", "Ridge", "LinearRegression", "Lasso", "ElasticNet", "AdaBoost", "DecisionTree", "KNN", "SVR", "Dummy", "GaussianProcess"],
+        "RMSE": [574.29, 579.64, 594.22, 601.68, 634.32, 650.04, 705.67, 705.93, 707.62, 730.50, 785.36, 863.95, 899.70, 949.24, 950.90, 2888.75],
+        "MAE": [415.66, 414.93, 415.57, 416.72, 452.95, 471.33, 518.07, 518.29, 519.84, 534.27, 601.80, 592.54, 678.35, 724.77, 725.69, 2683.95],
+        "R²": [0.6348, 0.6279, 0.6090, 0.5991, 0.5544, 0.5321, 0.4486, 0.4482, 0.4456, 0.4091, 0.3170, 0.1735, 0.1037, 0.0023, -0.0011, -8.2398]
+    })
+    st.dataframe(df_maisons, use_container_width=True)
+
+    # Affichage des visuels comparatifs sauvegardés
+    st.markdown("### 📊 Visualisations comparatives des performances")
+    image_paths = [
+        "data/rmse_maisons.png",
+        "data/mae_maisons.png",
+        "data/r2_maisons.png",
+        "data/rmse_apparts.png",
+        "data/mae_apparts.png",
+        "data/r2_apparts.png"
+    ]
+
+    for path in image_paths:
+        if os.path.exists(path):
+            st.image(path, use_container_width=True)
+        else:
+            st.warning(f"Image non trouvée : {path}")
+
+    st.markdown("## 🎯 Sélection des modèles pour la suite")
+    st.success("➡️ **ExtraTrees** est retenu pour les **appartements** (meilleure performance globale - R² = 0.7663).\n"
+               "➡️ **XGBoost** est retenu pour les **maisons** (meilleur compromis RMSE/MAE/R²).")
+
+    st.markdown("## 📊 Analyse comparative Apparts vs Maisons")
+    st.markdown("""
 ### 🔍 **Performance globale**
 - Les performances sont **nettement meilleures sur les Apparts** que sur les Maisons :
   - **R² maximal 0.766 (ExtraTrees)** pour les Apparts
@@ -78,4 +138,4 @@ st.markdown("""
   - La **supériorité d’ExtraTrees** sur les Apparts
   - La **robustesse de XGBoost** sur les Maisons
 - Ces visuels **justifient les modèles retenus** pour l’étape suivante.
-""")
+    """)
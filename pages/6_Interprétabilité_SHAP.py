@@ -1,5 +1,7 @@
 import streamlit as st
 import os
+import gzip
+from precalcul_shap import MagasinShap
 
 st.set_page_config(page_title="🔍 Interprétabilité SHAPASH", layout="wide")
 
@@ -126,14 +128,63 @@ if bien == "Maisons" and modele == "ExtraTrees":
     """)
 
 
+# 📊 Synthèse globale depuis les valeurs SHAP précalculées (python precalcul_shap.py)
+@st.cache_resource
+def charger_shap(type_bien, famille, date_modif):
+    return MagasinShap.charger(type_bien, famille)
+
+
+@st.cache_data
+def shap_a_jour(type_bien, famille, date_meta, date_modele):
+    """Empreinte SHA-256 du modèle recalculée seulement quand le modèle ou le précalcul change"""
+    return charger_shap(type_bien, famille, date_meta).a_jour()
+
+
+type_bien = {"Appartements": "appart", "Maisons": "maison"}[bien]
+famille = modele.lower()
+meta_shap = os.path.join("data/shap", f"shap_{type_bien}_{famille}.json")
+date_meta = os.path.getmtime(meta_shap) if os.path.exists(meta_shap) else None
+magasin = charger_shap(type_bien, famille, date_meta) if date_meta else None
+
+if magasin is not None:
+    st.markdown(f"## 📊 Synthèse SHAP globale ({magasin.meta['forme'][0]} biens)")
+    chemin_pkl = magasin.meta["modele"]
+    date_modele = os.path.getmtime(chemin_pkl) if os.path.exists(chemin_pkl) else None
+    if not shap_a_jour(type_bien, famille, date_meta, date_modele):
+        st.warning("Le modèle a changé depuis le précalcul : relancer `python precalcul_shap.py`.")
+    st.bar_chart(magasin.importance(15), horizontal=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        variable = st.selectbox("Dépendance de", magasin.variables,
+                                index=magasin.variables.index(magasin.importance(1).index[0]))
+    with col2:
+        couleur = st.selectbox("Colorée par", ["—"] + magasin.variables)
+    dependance = magasin.dependance(variable, None if couleur == "—" else couleur)
+    st.scatter_chart(dependance, x=variable, y="shap", color=None if couleur == "—" else couleur)
+
+    interactions = magasin.interactions_principales(10)
+    if interactions is not None:
+        st.markdown(f"**Interactions principales** (moyenne des |SHAP| d'interaction, "
+                    f"{magasin.meta['nb_lignes_interactions']} biens)")
+        st.dataframe(interactions, use_container_width=True, hide_index=True)
+
+
+# 📄 Affichage du rapport (compressé par python rapports_shapash.py, ou HTML d'origine)
+@st.cache_data(max_entries=4)
+def lire_rapport(chemin, date_modif):
+    ouvrir = gzip.open if chemin.endswith(".gz") else open
+    with ouvrir(chemin, "rt", encoding="utf-8") as f:
+        return f.read()
+
 
-# 📄 Affichage du rapport
 file_name = rapport_map[bien][modele]
 file_path = os.path.join("reports", file_name)
+if os.path.exists(file_path + ".gz"):
+    file_path += ".gz"
 
 if os.path.exists(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        html_content = f.read()
+    html_content = lire_rapport(file_path, os.path.getmtime(file_path))
     st.components.v1.html(html_content, height=800, scrolling=True)
 else:
     st.warning(f"🚧 Rapport introuvable : {file_path}")
\ No newline at end of file
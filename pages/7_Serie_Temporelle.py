@@ -127,4 +127,134 @@ elif choix == "Densité":
 
 elif choix == "Prédiction":
     filepath = "data/graphes/Figure_prophet_92.png"
-    st.image(filepath)
\ No newline at end of file
+    st.image(filepath)
+
+# ================================
+# Bloc Prévisions en direct
+# ================================
+from prevision_prophet import charger_previsions, charger_manifeste, DOSSIER_PREVISIONS, NOM_PREVISIONS
+
+
+@st.cache_data
+def charger_previsions_cache(date_modif):
+    """Prévisions Prophet persistées (cache invalidé à chaque réajustement)"""
+    return charger_previsions()
+
+
+st.subheader("Prévisions Prophet en direct")
+chemin_previsions = os.path.join(DOSSIER_PREVISIONS, NOM_PREVISIONS)
+
+if not os.path.exists(chemin_previsions):
+    st.info("Aucune prévision disponible : lancer `python prevision_prophet.py` pour ajuster les séries.")
+else:
+    df_prev = charger_previsions_cache(os.path.getmtime(chemin_previsions))
+    manifeste = charger_manifeste()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        departement = st.selectbox("Département", sorted(df_prev["code_departement"].unique()))
+    df_dep = df_prev[df_prev["code_departement"] == departement]
+    with col2:
+        statut = st.selectbox("Statut urbain", sorted(df_dep["statut_uu"].unique()))
+    with col3:
+        type_bien = st.selectbox("Type de bien", sorted(df_dep[df_dep["statut_uu"] == statut]["type_bien"].unique()))
+
+    serie = df_dep[(df_dep["statut_uu"] == statut) & (df_dep["type_bien"] == type_bien)].sort_values("ds")
+    historique = serie[serie["historique"]]
+    futur = serie[~serie["historique"]]
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.plot(pd.to_datetime(historique["ds"]), historique["yhat"], color="#1f77b4", label="Ajustement")
+    ax.plot(pd.to_datetime(futur["ds"]), futur["yhat"], color="crimson", label="Prévision 6 mois")
+    ax.fill_between(pd.to_datetime(futur["ds"]), futur["yhat_lower"], futur["yhat_upper"], color="crimson", alpha=0.2)
+    ax.set_ylabel("Prix au m² (€)")
+    ax.set_title(f"Département {departement} – {statut} – {type_bien}")
+    ax.grid(True, linestyle="--", linewidth=0.5)
+    ax.legend()
+    st.pyplot(fig)
+
+    info = manifeste.get(serie["serie"].iloc[0], {}) if not serie.empty else {}
+    if info:
+        commentaire(f"Modèle ajusté le {info['date_ajustement']} en {info['duree_s']:.1f} s"
+                    + (" – données modifiées depuis, réajustement en attente." if info.get("perime") else "."))
+
+
+# ================================
+# Bloc Exploration interactive (cube DVF)
+# ================================
+from cube_dvf import CubeDVF, DOSSIER_CUBE, NIVEAUX_TEMPS, TOUS
+from reconciliation import CHEMIN_RECONCILIEES
+
+
+@st.cache_resource
+def charger_cube():
+    """Cube DVF chargé une seule fois par processus"""
+    return CubeDVF.charger()
+
+
+@st.cache_data
+def charger_reconciliees(date_modif):
+    """Prévisions réconciliées par niveau géographique"""
+    return pd.read_csv(CHEMIN_RECONCILIEES, sep=";", dtype={"geo": str})
+
+
+st.subheader("Exploration interactive des prix DVF")
+
+if not os.path.exists(DOSSIER_CUBE):
+    st.info("Cube DVF absent : lancer `python cube_dvf.py <fichiers DVF>` pour le construire.")
+else:
+    cube = charger_cube()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        niveau_temps = st.selectbox("Granularité temporelle", NIVEAUX_TEMPS,
+                                    format_func={"mois": "Mois", "trimestre": "Trimestre", "annee": "Année"}.get)
+    with col2:
+        statut_cube = st.selectbox("Statut urbain ", [TOUS] + sorted(s for s in cube.cellules["statut_uu"].unique()
+                                                                       if s != TOUS))
+    with col3:
+        type_cube = st.selectbox("Type de bien ", [TOUS, "Appartement", "Maison"])
+
+    # Fil d'Ariane : France → région → département → commune
+    niveau_geo, geo = "france", "FR"
+    for niveau_enfant, libelle in [("region", "Région"), ("departement", "Département"), ("commune", "Commune")]:
+        serie_parent = cube.serie(niveau_temps, niveau_geo, geo, statut_cube, type_cube)
+        if serie_parent.empty:
+            break
+        enfants = cube.enfants(niveau_temps, serie_parent["temps"].iloc[-1], niveau_geo, geo, statut_cube, type_cube)
+        choix_enfant = st.selectbox(libelle, ["(tous)"] + sorted(enfants["geo"].tolist()))
+        if choix_enfant == "(tous)":
+            break
+        niveau_geo, geo = niveau_enfant, choix_enfant
+
+    serie_cube = cube.serie(niveau_temps, niveau_geo, geo, statut_cube, type_cube)
+    if serie_cube.empty:
+        st.warning("Aucune transaction pour cette sélection.")
+    else:
+        fig, ax = plt.subplots(figsize=(10, 4))
+        ax.plot(serie_cube["temps"], serie_cube["prix_m2_median"], color="#1f77b4", label="Médiane")
+        ax.plot(serie_cube["temps"], serie_cube["prix_m2_moyen"], color="grey", linestyle="--", label="Moyenne")
+        ax.fill_between(serie_cube["temps"], serie_cube["p25"], serie_cube["p75"], color="#1f77b4", alpha=0.2,
+                        label="Q1 – Q3")
+        # Prévisions réconciliées (cohérentes entre commune, département, région et France)
+        if niveau_temps == "mois" and statut_cube == TOUS and os.path.exists(CHEMIN_RECONCILIEES):
+            reconciliees = charger_reconciliees(os.path.getmtime(CHEMIN_RECONCILIEES))
+            prev_geo = reconciliees[(reconciliees["niveau_geo"] == niveau_geo) & (reconciliees["geo"] == geo)
+                                    & (reconciliees["type_bien"] == type_cube)].sort_values("ds")
+            if not prev_geo.empty:
+                ax.plot(prev_geo["ds"], prev_geo["prix_m2_reconcilie"], color="crimson", marker="o",
+                        label="Prévision réconciliée")
+        ax.set_ylabel("Prix au m² (€)")
+        ax.tick_params(axis="x", rotation=60)
+        ax.xaxis.set_major_locator(plt.MaxNLocator(12))
+        ax.grid(True, linestyle="--", linewidth=0.5)
+        ax.legend()
+        st.pyplot(fig)
+
+        derniere = serie_cube.iloc[-1]
+        st.dataframe(
+            cube.enfants(niveau_temps, derniere["temps"], niveau_geo, geo, statut_cube, type_cube)
+            [["geo", "nb_transactions", "prix_m2_median", "prix_m2_moyen", "p25", "p75"]].round(0),
+            use_container_width=True
+        )
+        commentaire(f"Détail de la période {derniere['temps']} : {int(derniere['nb_transactions'])} transactions, "
+                    f"médiane {derniere['prix_m2_median']:.0f} €/m².")
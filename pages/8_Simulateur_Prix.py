@@ -2,9 +2,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import shap
 import joblib
 import plotly.graph_objects as go
+from transformation_annonces import TransformateurAnnonces
+from explication import BUDGET_MS, Explicateur, ExplicationsBudgetees, tableau_contributions
+from contexte_communes import MagasinContexte
+from formulaire_dynamique_complet import schema_pour, generer_formulaire_dynamique, valider, encoder_reponses
 
 # Configuration de la page
 st.set_page_config(layout="wide")
@@ -20,6 +23,31 @@ X_maison_encoded = pd.read_csv("data/annonces_ventes_68_maisons_X_test.csv", sep
 X_appart_raw = pd.read_csv("data/X_test_appart_raw.csv", sep=";", encoding="ISO-8859-1")
 X_maison_raw = pd.read_csv("data/X_test_maison_raw.csv", sep=";", encoding="ISO-8859-1")
 
+
+@st.cache_resource
+def charger_transformateur(type_bien):
+    """Encodage brut → variables du modèle (paramètres du pipeline d'entraînement)"""
+    return TransformateurAnnonces.charger(type_bien)
+
+
+@st.cache_resource
+def charger_explicateur(type_bien, _modele):
+    """Contributions natives (XGBoost / LightGBM) ou `shap.TreeExplainer` construit une seule fois"""
+    return Explicateur(_modele)
+
+
+@st.cache_resource
+def charger_explications_budgetees():
+    """Calculs exacts en arrière-plan, partagés par les sessions"""
+    return ExplicationsBudgetees()
+
+
+@st.cache_resource
+def charger_contexte():
+    """Variables de contexte (INSEE, BPE, revenu, coordonnées) par IRIS et par commune"""
+    return MagasinContexte.charger()
+
+
 # Paramètres de simulation
 typedebien = st.radio("Type de bien", ["Appartement", "Maison"], horizontal=True)
 if typedebien == "Appartement":
@@ -27,17 +55,19 @@ if typedebien == "Appartement":
     X_encoded = X_appart_encoded.copy()
     X_raw = X_appart_raw.copy()
     MAE = 351.77
+    transformateur = charger_transformateur("appart")
+    explicateur = charger_explicateur("appart", model)
 else:
     model = model_maison
     X_encoded = X_maison_encoded.copy()
     X_raw = X_maison_raw.copy()
     MAE = 397.36
+    transformateur = charger_transformateur("maison")
+    explicateur = charger_explicateur("maison", model)
 
 st.markdown("---")
 
 mode_simulation = st.radio("Mode de simulation", ["🗂️ Choisir un bien existant", "🛠️ Entrer mes propres caractéristiques"])
-X_input = pd.DataFrame(columns=X_encoded.columns)
-X_input.loc[0] = 0
 
 if mode_simulation == "🗂️ Choisir un bien existant":
     # 🔁 Ajout identifiant unique et label utilisateur
@@ -92,61 +122,38 @@ if mode_simulation == "🗂️ Choisir un bien existant":
         if texte:
             st.markdown("📌 " + ", ".join(texte) + ".")
 else:
+    magasin_contexte = charger_contexte()
     with st.container():
-        st.markdown("### 🏠 Caractéristiques générales")
-        surface = st.slider("Surface (m²)", 10, 300, 75)
-        nb_pieces = st.slider("Nombre de pièces", 1, 10, 4)
-        nb_toilettes = st.slider("Nombre de toilettes", 0, 5, 1)
-        annee_construction = st.slider("Année de construction", min_value=1900, max_value=2023, value=2000)
+        st.markdown("### 📍 Localisation")
+        commune_cible = st.selectbox("📍 Sélectionne une commune", magasin_contexte.communes)
+        iris_commune = magasin_contexte.iris_de(commune_cible)
+        code_iris = iris_commune[0]
+        if len(iris_commune) > 1:
+            code_iris = st.selectbox("Quartier (IRIS)", iris_commune, help="Par défaut : IRIS le plus représenté")
+
+    # Formulaire généré depuis le schéma du type de bien ; la saisie est validée avant tout encodage
+    schema = schema_pour(transformateur)
+    reponses = generer_formulaire_dynamique(schema)
+    erreurs = valider(reponses, schema, transformateur)
+    if erreurs:
+        for erreur in erreurs:
+            st.error(f"⛔ {erreur}")
+        st.stop()
+    surface = reponses["surface"]
+    # Réponses brutes + contexte de l'IRIS encodés directement dans un vecteur float32 aligné sur le modèle
+    vecteur = encoder_reponses(reponses, transformateur, model.feature_names_in_,
+                               contexte=magasin_contexte.contexte_iris(code_iris))
+    X_input_final = pd.DataFrame(vecteur[None, :], columns=model.feature_names_in_)
 
-    with st.container():
-        st.markdown("### 🛁 Équipements")
-        logement_neuf = st.radio("Logement neuf ?", ["Oui", "Non"], horizontal=True)
-        balcon = st.radio("Balcon ?", ["Oui", "Non"], horizontal=True)
-        cave = st.radio("Cave ?", ["Oui", "Non"], horizontal=True)
-        ascenseur = st.radio("Ascenseur ?", ["Oui", "Non"], horizontal=True)
-        bain = st.radio("Baignoire ?", ["Oui", "Non"], horizontal=True)
-        eau = st.radio("Salle d'eau ?", ["Oui", "Non"], horizontal=True)
-        parking = st.radio("Place de parking ?", ["Oui", "Non"], horizontal=True)
-        exclusivite = st.radio("Annonce exclusive ?", ["Oui", "Non"], horizontal=True)
+if mode_simulation == "🗂️ Choisir un bien existant":
+    # Nettoyage et matching
+    X_input.drop(columns=[col for col in ["date", "typedebien_lite"] if col in X_input.columns], inplace=True, errors="ignore")
+    X_input_final = X_input.loc[:, model.feature_names_in_].copy()
+    X_input_final = X_input_final.apply(pd.to_numeric, errors='coerce')
 
-    with st.container():
-        st.markdown("### 🔥 Chauffage & Énergie")
-        dpeL = st.selectbox("Classe énergétique DPE", ["A", "B", "C", "D", "E", "F", "G"], index=3)
-        exposition = st.selectbox("Exposition", ["Sud", "Est", "Nord", "Autre"])
-        chauffage_energie = st.selectbox("Énergie chauffage", ["Electrique", "Gaz", "Fioul", "Bois", "Autre"])
-        chauffage_systeme = st.selectbox("Système chauffage", ["Individuel", "Collectif", "Autre"])
-        chauffage_mode = st.selectbox("Mode chauffage", ["Radiateur", "Plancher chauffant", "Autre"])
-
-    dpe_mapping = {"A": 7, "B": 6, "C": 5, "D": 4, "E": 3, "F": 2, "G": 1}
-    X_input.loc[0, "surface"] = surface
-    X_input.loc[0, "nb_pieces"] = nb_pieces
-    X_input.loc[0, "nb_toilettes"] = nb_toilettes
-    X_input.loc[0, "logement_neuf"] = 1 if logement_neuf == "Oui" else 0
-    X_input.loc[0, "balcon"] = 1 if balcon == "Oui" else 0
-    X_input.loc[0, "cave"] = 1 if cave == "Oui" else 0
-    X_input.loc[0, "ascenseur"] = 1 if ascenseur == "Oui" else 0
-    X_input.loc[0, "bain"] = 1 if bain == "Oui" else 0
-    X_input.loc[0, "eau"] = 1 if eau == "Oui" else 0
-    X_input.loc[0, "places_parking"] = 1 if parking == "Oui" else 0
-    X_input.loc[0, "annonce_exclusive"] = 1 if exclusivite == "Oui" else 0
-    X_input.loc[0, "dpeL"] = dpe_mapping[dpeL]
-    for dir in ["sud", "est", "nord", "autre"]:
-        X_input.loc[0, f"exposition_{dir}"] = 1 if exposition.lower() == dir else 0
-    X_input.loc[0, "chauffage_energie"] = {"Electrique": 0, "Gaz": 1, "Fioul": 2, "Bois": 3, "Autre": 4}[chauffage_energie]
-    X_input.loc[0, "chauffage_systeme"] = {"Individuel": 0, "Collectif": 1, "Autre": 2}[chauffage_systeme]
-    X_input.loc[0, "chauffage_mode"] = {"Radiateur": 0, "Plancher chauffant": 1, "Autre": 2}[chauffage_mode]
-    X_input.loc[0, "annee_construction"] = annee_construction
-
-
-# Nettoyage et matching
-X_input.drop(columns=[col for col in ["date", "typedebien_lite"] if col in X_input.columns], inplace=True, errors="ignore")
-X_input_final = X_input.loc[:, model.feature_names_in_].copy()
-X_input_final = X_input_final.apply(pd.to_numeric, errors='coerce')
-
-if X_input_final.isnull().values.any():
-    st.error("⛔ Certaines variables sont mal saisies ou manquantes. Vérifie les sélections.")
-    st.stop()
+    if X_input_final.isnull().values.any():
+        st.error("⛔ Certaines variables sont mal saisies ou manquantes. Vérifie les sélections.")
+        st.stop()
 
 # Prédiction
 prediction = model.predict(X_input_final)[0]
@@ -157,21 +164,15 @@ st.markdown(f"💶 Prix total estimé : **{prediction * surface:.0f} €**")
 st.markdown(f"📉 Intervalle de confiance : **[{prediction - MAE:.2f} ; {prediction + MAE:.2f}] €/m²**")
 
 
+# L'explication reste affichée tant que le bien ne change pas (le bouton d'affinage relance la page)
+cle_explication = (typedebien, X_input_final.to_numpy(dtype="float64").tobytes())
 if st.button("📊 Interprétation SHAP du modèle"):
-    explainer = shap.TreeExplainer(model)
-    shap_values = explainer.shap_values(X_input_final)
-    shap_input = shap.Explanation(
-        values=shap_values[0],
-        base_values=explainer.expected_value,
-        data=X_input_final.iloc[0],
-        feature_names=X_input_final.columns
-    )
-    shap_df = pd.DataFrame({
-        "Feature": shap_input.feature_names,
-        "Contribution": shap_input.values,
-        "Value": shap_input.data
-    })
-    shap_df = shap_df.reindex(shap_df.Contribution.abs().sort_values(ascending=False).index)
+    st.session_state["explication_demandee"] = cle_explication
+
+if st.session_state.get("explication_demandee") == cle_explication:
+    explications_budgetees = charger_explications_budgetees()
+    explication = explications_budgetees.expliquer(cle_explication, explicateur, X_input_final, BUDGET_MS)
+    shap_df, base_value = tableau_contributions(X_input_final, explication["valeurs"], explication["base"])
     top_features = shap_df.head(10)
 
     colors = top_features["Contribution"].apply(lambda x: "crimson" if x > 0 else "royalblue")
@@ -187,10 +188,20 @@ if st.button("📊 Interprétation SHAP du modèle"):
     fig.update_layout(title="🔍 Explication SHAP dynamique", yaxis=dict(autorange="reversed"), height=500, width=1000)
     st.plotly_chart(fig)
 
-    base_value = explainer.expected_value
-    if isinstance(base_value, np.ndarray):
-        base_value = base_value.item()
-    st.info(f"Base value SHAP (moyenne modèle) : `{base_value:.2f} €/m²`")
+    st.info(f"Base value SHAP (moyenne modèle) : `{base_value:.2f} €/m²` — calcul "
+            f"{'natif ' + explicateur.moteur if explicateur.natif else 'shap'}")
+    if explication["exacte"]:
+        st.success(f"✅ Valeurs SHAP exactes ({explication['duree_ms']:.0f} ms)")
+    elif explication["erreur"]:
+        st.warning("⚡ Explication approchée (attribution de Saabas le long des chemins de décision).")
+        st.error(f"⛔ Valeurs SHAP exactes indisponibles : {explication['erreur']}")
+    else:
+        st.warning(f"⚡ Explication approchée (attribution de Saabas le long des chemins de décision), affichée pour "
+                   f"rester sous {BUDGET_MS} ms. Les valeurs SHAP exactes sont calculées en arrière-plan.")
+        if explications_budgetees.exacte_disponible(cle_explication):
+            st.button("✅ Valeurs exactes prêtes : les afficher")
+        else:
+            st.button("🔄 Vérifier si les valeurs exactes sont prêtes")
 
     st.markdown("#### 💬 Interprétation automatique (top 5 variables)")
     for i, row in top_features.head(5).iterrows():
@@ -245,10 +256,10 @@ if mode_simulation == "🗂️ Choisir un bien existant":
     lat_sel = bien_selectionne["latitude"].values[0]
     lon_sel = bien_selectionne["longitude"].values[0]
 elif mode_simulation == "🛠️ Entrer mes propres caractéristiques":
-    commune_cible = st.selectbox("📍 Sélectionne une commune", df_map["commune"].dropna().sort_values().unique())
     df_map = df_map[df_map["commune"] == commune_cible].reset_index(drop=True)
-    lat_sel = df_map["latitude"].mean()
-    lon_sel = df_map["longitude"].mean()
+    contexte_sel = magasin_contexte.contexte_iris(code_iris)
+    lat_sel = contexte_sel["mapCoordonneesLatitude"]
+    lon_sel = contexte_sel["mapCoordonneesLongitude"]
     surface = df_map["surface"].mean()
 
 afficher_heatmap = st.toggle("Afficher la heatmap des prix au m²", value=True)
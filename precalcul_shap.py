@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from chargement_donnees import empreinte_fichier
+from explication import Explicateur
+from optimisation_optuna import DOSSIER_MODELES, PREFIXES, charger_jeu
+
+# === Valeurs SHAP de tous les biens de référence (matrices float32 projetées en mémoire) ===
+DOSSIER_SHAP = "data/shap"
+TAILLE_BLOC = 256
+NB_LIGNES_INTERACTIONS = 100  # les interactions (n × p × p) sont agrégées sur un échantillon
+GRAINE = 0
+
+
+def chemins(type_bien, famille, dossier=DOSSIER_SHAP):
+    base = os.path.join(dossier, f"shap_{type_bien}_{famille}")
+    return {"meta": base + ".json", "valeurs": base + ".f32", "X": base + "_X.f32",
+            "interactions": base + "_interactions.npy"}
+
+
+def chemin_modele(type_bien, famille, dossier=DOSSIER_MODELES):
+    return os.path.join(dossier, f"{PREFIXES[famille]}_{type_bien}.pkl")
+
+
+# === Calcul par blocs dans des processus de travail ===
+_EXPLICATION = {}
+
+
+def _initialiser(chemin_pkl, chemin_X, chemin_valeurs, forme):
+    """Modèle et explicateur construits une fois par worker ; entrée et sortie ouvertes en projection mémoire"""
+    _EXPLICATION["explicateur"] = Explicateur(joblib.load(chemin_pkl))
+    _EXPLICATION["X"] = np.memmap(chemin_X, dtype="float32", mode="r", shape=forme)
+    _EXPLICATION["valeurs"] = np.memmap(chemin_valeurs, dtype="float32", mode="r+", shape=forme)
+
+
+def _expliquer_bloc(debut, fin):
+    """Écrit directement les valeurs du bloc dans la matrice de sortie (rien n'est renvoyé au parent)"""
+    valeurs, _ = _EXPLICATION["explicateur"].expliquer(np.asarray(_EXPLICATION["X"][debut:fin]))
+    _EXPLICATION["valeurs"][debut:fin] = valeurs
+    _EXPLICATION["valeurs"].flush()
+    return fin - debut
+
+
+def _interactions_bloc(lignes):
+    """Somme des |interactions| (p × p) d'un groupe de lignes : seul ce cumul revient au parent"""
+    interactions = _EXPLICATION["explicateur"].interactions(np.asarray(_EXPLICATION["X"][lignes]))
+    return np.abs(interactions).sum(axis=0, dtype="float64")
+
+
+def precalculer(type_bien, famille, n_workers=None, taille_bloc=TAILLE_BLOC, dossier=DOSSIER_SHAP,
+                nb_interactions=NB_LIGNES_INTERACTIONS):
+    """Valeurs SHAP (n × p) de tout le jeu de référence, agrégats d'interactions et métadonnées"""
+    debut = time.perf_counter()
+    os.makedirs(dossier, exist_ok=True)
+    fichiers, chemin_pkl = chemins(type_bien, famille, dossier), chemin_modele(type_bien, famille)
+    X, _ = charger_jeu(type_bien)
+    forme = X.shape
+
+    entree = np.memmap(fichiers["X"], dtype="float32", mode="w+", shape=forme)
+    entree[:] = X.to_numpy(dtype="float32")
+    entree.flush()
+    np.memmap(fichiers["valeurs"], dtype="float32", mode="w+", shape=forme).flush()
+
+    blocs = [(i, min(i + taille_bloc, forme[0])) for i in range(0, forme[0], taille_bloc)]
+    # Interactions : moyenne des |valeurs| par paire de variables, sur un échantillon réparti entre les workers
+    echantillon = np.sort(np.random.default_rng(GRAINE).choice(forme[0], min(nb_interactions, forme[0]),
+                                                                replace=False))
+    groupes = np.array_split(echantillon, max(1, len(echantillon) // 10))
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_initialiser,
+                             initargs=(chemin_pkl, fichiers["X"], fichiers["valeurs"], forme)) as pool:
+        nb_lignes = sum(pool.map(_expliquer_bloc, *zip(*blocs)))
+        interactions = sum(pool.map(_interactions_bloc, groupes)) if len(echantillon) else None
+    if interactions is not None:
+        np.save(fichiers["interactions"], (interactions / len(echantillon)).astype("float32"))
+    elif os.path.exists(fichiers["interactions"]):
+        os.remove(fichiers["interactions"])
+    explicateur = Explicateur(joblib.load(chemin_pkl))
+    _, base = explicateur.expliquer(np.asarray(entree[:1]))
+
+    meta = {"type_bien": type_bien, "famille": famille, "modele": chemin_pkl,
+            "empreinte_modele": empreinte_fichier(chemin_pkl), "forme": list(forme),
+            "variables": list(X.columns), "valeur_base": float(base[0]), "moteur": explicateur.moteur,
+            "nb_lignes_interactions": len(echantillon), "duree_s": time.perf_counter() - debut}
+    with open(fichiers["meta"], "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta, nb_lignes
+
+
+# === Lecture et synthèses globales ===
+class MagasinShap:
+    """Matrices SHAP ouvertes en lecture seule : les synthèses ne chargent que les colonnes utilisées"""
+
+    def __init__(self, meta, valeurs, X, interactions):
+        self.meta, self.valeurs, self.X, self.interactions = meta, valeurs, X, interactions
+        self.variables = meta["variables"]
+        self.position = {nom: i for i, nom in enumerate(self.variables)}
+
+    @classmethod
+    def charger(cls, type_bien, famille, dossier=DOSSIER_SHAP):
+        fichiers = chemins(type_bien, famille, dossier)
+        if not os.path.exists(fichiers["meta"]):
+            return None
+        with open(fichiers["meta"], encoding="utf-8") as f:
+            meta = json.load(f)
+        forme = tuple(meta["forme"])
+        interactions = np.load(fichiers["interactions"], mmap_mode="r") if os.path.exists(
+            fichiers["interactions"]) else None
+        return cls(meta, np.memmap(fichiers["valeurs"], dtype="float32", mode="r", shape=forme),
+                   np.memmap(fichiers["X"], dtype="float32", mode="r", shape=forme), interactions)
+
+    def a_jour(self):
+        """Faux si le modèle a été réentraîné depuis le précalcul"""
+        return os.path.exists(self.meta["modele"]) and empreinte_fichier(self.meta["modele"]) == \
+            self.meta["empreinte_modele"]
+
+    def importance(self, nb=None):
+        """Moyenne des |SHAP| par variable, décroissante"""
+        moyenne = np.abs(self.valeurs).mean(axis=0, dtype="float64")
+        serie = pd.Series(moyenne, index=self.variables, name="shap_abs_moyen").sort_values(ascending=False)
+        return serie.head(nb) if nb else serie
+
+    def dependance(self, variable, couleur=None):
+        """Valeur (encodée) de la variable et sa contribution, pour chaque bien"""
+        i = self.position[variable]
+        donnees = {variable: self.X[:, i], "shap": self.valeurs[:, i]}
+        if couleur:
+            donnees[couleur] = self.X[:, self.position[couleur]]
+        return pd.DataFrame(donnees)
+
+    def interactions_principales(self, nb=10):
+        """Paires de variables les plus en interaction (hors diagonale)"""
+        if self.interactions is None:
+            return None
+        matrice = np.array(self.interactions)
+        i, j = np.triu_indices(len(self.variables), k=1)
+        paires = pd.DataFrame({"variable_1": np.array(self.variables)[i], "variable_2": np.array(self.variables)[j],
+                               "interaction": 2 * matrice[i, j]})
+        return paires.nlargest(nb, "interaction").reset_index(drop=True)
+
+    def explication(self, ligne):
+        return pd.Series(np.asarray(self.valeurs[ligne]), index=self.variables)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Précalcul des valeurs SHAP des biens de référence")
+    parser.add_argument("--types", nargs="+", default=["appart", "maison"])
+    parser.add_argument("--familles", nargs="+", default=list(PREFIXES), choices=list(PREFIXES))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--interactions", type=int, default=NB_LIGNES_INTERACTIONS,
+                        help="taille de l'échantillon pour les agrégats d'interactions (0 : aucun)")
+    args = parser.parse_args()
+
+    for type_bien in args.types:
+        for famille in args.familles:
+            if not os.path.exists(chemin_modele(type_bien, famille)):
+                continue
+            meta, nb_lignes = precalculer(type_bien, famille, args.workers, nb_interactions=args.interactions)
+            print(f"✅ {type_bien} / {famille} : {nb_lignes} biens × {len(meta['variables'])} variables "
+                  f"en {meta['duree_s']:.1f} s → {chemins(type_bien, famille)['valeurs']}")
+            magasin = MagasinShap.charger(type_bien, famille)
+            debut = time.perf_counter()
+            magasin.importance()
+            magasin.dependance(magasin.variables[0])
+            magasin.interactions_principales()
+            print(f"   synthèses globales : {(time.perf_counter() - debut) * 1000:.1f} ms")
@@ -0,0 +1,276 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ingestion_dvf import CHEMIN_AGREGATS
+from prevision_prophet import (DOSSIER_PREVISIONS, HORIZON_MOIS, CLES_SERIE, _ajuster_une_serie,
+                               ajuster_series, charger_agregats, decouper_series)
+
+# === Fichiers produits ===
+NOM_PREVISIONS_BASELINE = "previsions_baseline.csv"
+NOM_POLITIQUE = "politique.csv"
+NOM_MAPE_PROPHET = "mape_prophet.csv"
+VERSION_HOLDOUT = 2  # change de fenêtre d'évaluation → scores Prophet en cache recalculés
+
+SAISON = 12
+# Grille (alpha, beta, gamma) de Holt-Winters, évaluée pour toutes les séries à la fois
+GRILLE_HOLT_WINTERS = [(a, b, g) for a in (0.2, 0.5, 0.8) for b in (0.05, 0.2) for g in (0.1, 0.3)]
+METHODE_DEFAUT = "naif_saisonnier"  # séries sans historique avant leur fenêtre d'évaluation
+
+
+def matrice_series(agregats):
+    """Toutes les séries dans une matrice (n_series × n_mois), NaN pour les mois sans transaction"""
+    series = decouper_series(agregats)
+    mois = sorted({m for s in series.values() for m in s["mois"]})
+    position = {m: i for i, m in enumerate(mois)}
+    Y = np.full((len(series), len(mois)), np.nan)
+    for i, s in enumerate(series.values()):
+        Y[i, [position[m] for m in s["mois"]]] = s["y"]
+    return list(series), mois, Y, series
+
+
+def combler(Y):
+    """Report de la dernière valeur connue (puis de la première pour le début de série), ligne par ligne"""
+    Y = Y.copy()
+    for sens in (1, -1):
+        Z = Y[:, ::sens]
+        connu = ~np.isnan(Z)
+        idx = np.where(connu, np.arange(Z.shape[1]), 0)
+        np.maximum.accumulate(idx, axis=1, out=idx)
+        Z[:] = np.where(connu, Z, Z[np.arange(Z.shape[0])[:, None], idx])
+    return Y
+
+
+def dernier_observe(Y):
+    """Indice de colonne du dernier mois observé de chaque série"""
+    return Y.shape[1] - 1 - np.argmax(~np.isnan(Y[:, ::-1]), axis=1)
+
+
+def aligner_a_droite(Y):
+    """Décale chaque série pour que son dernier mois observé occupe la dernière colonne (NaN devant)"""
+    T = Y.shape[1]
+    fin = dernier_observe(Y)
+    colonnes = np.arange(T) - (T - 1 - fin)[:, None]
+    return np.where(colonnes >= 0, Y[np.arange(Y.shape[0])[:, None], np.maximum(colonnes, 0)], np.nan)
+
+
+def fenetre_test(mois, horizon=HORIZON_MOIS):
+    """Les `horizon` mois calendaires qui se terminent au dernier mois observé de la série"""
+    fin = pd.Period(mois[-1], "M")
+    return set(pd.period_range(fin - horizon + 1, fin, freq="M").strftime("%Y-%m"))
+
+
+def prevoir_naif_saisonnier(Y, horizon, saison=SAISON):
+    """Répète la valeur observée à la même période l'année précédente"""
+    T = Y.shape[1]
+    colonnes = T - saison + np.arange(horizon) % saison
+    return Y[:, colonnes]
+
+
+def prevoir_derive(Y, horizon):
+    """Prolonge la pente moyenne entre première et dernière observation"""
+    T = Y.shape[1]
+    pente = (Y[:, -1] - Y[:, 0]) / max(T - 1, 1)
+    return Y[:, -1:] + pente[:, None] * np.arange(1, horizon + 1)
+
+
+def lisser_holt_winters(Y, alpha, beta, gamma, saison=SAISON):
+    """Lissage additif de Holt-Winters vectorisé sur les séries (boucle sur le temps uniquement)
+
+    alpha, beta, gamma peuvent être des scalaires ou des vecteurs (un paramètre par série).
+    Renvoie niveau, tendance, saisonnalité finales et la somme des erreurs à un pas.
+    """
+    n, T = Y.shape
+    alpha, beta, gamma = (np.broadcast_to(np.asarray(p, dtype="float64"), (n,)) for p in (alpha, beta, gamma))
+    niveau = Y[:, :saison].mean(axis=1)
+    tendance = (Y[:, saison:2 * saison].mean(axis=1) - niveau) / saison
+    saisons = Y[:, :saison] - niveau[:, None]
+    sse = np.zeros(n)
+    for t in range(saison, T):
+        s = saisons[:, t % saison]
+        erreur = Y[:, t] - (niveau + tendance + s)
+        sse += erreur ** 2
+        ancien_niveau = niveau
+        niveau = alpha * (Y[:, t] - s) + (1 - alpha) * (niveau + tendance)
+        tendance = beta * (niveau - ancien_niveau) + (1 - beta) * tendance
+        saisons[:, t % saison] = gamma * (Y[:, t] - niveau) + (1 - gamma) * s
+    return niveau, tendance, saisons, sse
+
+
+def prevoir_holt_winters(Y, horizon, saison=SAISON):
+    """Holt-Winters additif, paramètres choisis par série sur la grille (erreur à un pas minimale)"""
+    n, T = Y.shape
+    sse_grille = np.stack([lisser_holt_winters(Y, a, b, g, saison)[3] for a, b, g in GRILLE_HOLT_WINTERS])
+    meilleurs = np.array(GRILLE_HOLT_WINTERS)[sse_grille.argmin(axis=0)]
+    niveau, tendance, saisons, _ = lisser_holt_winters(Y, meilleurs[:, 0], meilleurs[:, 1], meilleurs[:, 2], saison)
+    pas = np.arange(1, horizon + 1)
+    indices_saison = (T + pas - 1) % saison
+    return niveau[:, None] + tendance[:, None] * pas + saisons[:, indices_saison]
+
+
+METHODES = {
+    "naif_saisonnier": prevoir_naif_saisonnier,
+    "derive": prevoir_derive,
+    "holt_winters": prevoir_holt_winters,
+}
+
+
+def mape(Y_reel_log, Y_prev_log):
+    """MAPE (%) par série, calculé sur l'échelle €/m² (les séries sont en logarithme)"""
+    reel, prev = np.exp(Y_reel_log), np.exp(Y_prev_log)
+    erreurs = np.abs(prev - reel) / reel
+    nb = (~np.isnan(erreurs)).sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        return np.where(nb > 0, np.nansum(erreurs, axis=1) / nb, np.nan) * 100
+
+
+def evaluer_baselines(Y, horizon=HORIZON_MOIS):
+    """MAPE de chaque méthode sur la fenêtre de test propre à chaque série (ajustement sur ce qui précède)
+
+    Une série arrêtée avant la fin du calendrier est évaluée sur ses derniers mois observés, pas sur des
+    mois vides ; NaN si elle n'a aucun historique avant cette fenêtre.
+    """
+    Y = aligner_a_droite(Y)
+    apprentissage = combler(Y[:, :-horizon])
+    test = Y[:, -horizon:]
+    return pd.DataFrame({nom: mape(test, f(apprentissage, horizon)) for nom, f in METHODES.items()})
+
+
+def prevoir_baselines(Y, methodes, horizon=HORIZON_MOIS):
+    """Prévisions de toutes les séries, chacune avec la méthode qui lui a été attribuée
+
+    Chaque prévision part du dernier mois observé de sa série (colonnes alignées à droite, comme
+    `evaluer_baselines`) : le pas h correspond au h-ième mois qui suit ce dernier mois.
+    """
+    Y = combler(aligner_a_droite(Y))
+    previsions = np.empty((Y.shape[0], horizon))
+    for nom, f in METHODES.items():
+        masque = np.asarray(methodes) == nom
+        if masque.any():
+            previsions[masque] = f(Y[masque], horizon)
+    return previsions
+
+
+def _mape_prophet_holdout(nom, mois, y, horizon):
+    """Même fenêtre de test que les baselines (`fenetre_test`), prévue depuis le dernier mois d'apprentissage"""
+    test = np.isin(mois, sorted(fenetre_test(mois, horizon)))
+    if (~test).sum() < 2:
+        return nom, np.nan
+    mois_app = [m for m, t in zip(mois, test) if not t]
+    ecart = (pd.Period(mois[-1], "M") - pd.Period(mois_app[-1], "M")).n
+    _, _, prevision, _ = _ajuster_une_serie(nom, mois_app, y[~test], ecart)
+    prevu = prevision.set_index("ds").loc[np.asarray(mois)[test], "yhat"].to_numpy()
+    reel = np.exp(y[test])
+    return nom, float(np.mean(np.abs(prevu - reel) / reel) * 100)
+
+
+def scores_prophet(series, horizon=HORIZON_MOIS, n_workers=None, dossier=DOSSIER_PREVISIONS):
+    """MAPE Prophet sur holdout, mis en cache par empreinte : seules les séries nouvelles ou modifiées sont évaluées"""
+    chemin = os.path.join(dossier, NOM_MAPE_PROPHET)
+    cache = pd.read_csv(chemin, sep=";") if os.path.exists(chemin) else pd.DataFrame(columns=["serie", "empreinte", "mape_prophet", "version"])
+    if "version" not in cache or (cache["version"] != VERSION_HOLDOUT).any():
+        cache = cache.iloc[0:0]
+    connues = dict(zip(cache["serie"], cache["empreinte"]))
+    a_evaluer = [nom for nom, s in series.items() if connues.get(nom) != s["empreinte"]]
+
+    nouveaux = []
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(_mape_prophet_holdout, nom, series[nom]["mois"], series[nom]["y"], horizon)
+                   for nom in a_evaluer]
+        for future in futures:
+            nom, score = future.result()
+            nouveaux.append({"serie": nom, "empreinte": series[nom]["empreinte"], "mape_prophet": score,
+                             "version": VERSION_HOLDOUT})
+
+    cache = pd.concat([cache[~cache["serie"].isin(a_evaluer)], pd.DataFrame(nouveaux)], ignore_index=True)
+    os.makedirs(dossier, exist_ok=True)
+    cache.to_csv(chemin, sep=";", index=False)
+    return cache.set_index("serie")["mape_prophet"]
+
+
+def choisir_modeles(mape_baselines, mape_prophet=None, marge=0.0):
+    """Politique : meilleure baseline par série, Prophet seulement s'il la bat d'au moins `marge` points de MAPE
+
+    Les séries sans aucun score (`evaluable` faux) reçoivent `METHODE_DEFAUT` au lieu d'interrompre le
+    rafraîchissement.
+    """
+    politique = pd.DataFrame(index=mape_baselines.index)
+    politique["evaluable"] = mape_baselines.notna().any(axis=1)
+    politique["baseline"] = METHODE_DEFAUT
+    politique.loc[politique["evaluable"], "baseline"] = mape_baselines[politique["evaluable"]].idxmin(axis=1)
+    politique["mape_baseline"] = mape_baselines.min(axis=1)
+    if mape_prophet is None:
+        politique["mape_prophet"] = np.nan
+    else:
+        politique["mape_prophet"] = mape_prophet.reindex(politique.index)
+    politique["modele"] = np.where(politique["mape_prophet"] < politique["mape_baseline"] - marge,
+                                   "prophet", politique["baseline"])
+    return politique
+
+
+def rafraichir(agregats, horizon=HORIZON_MOIS, n_workers=None, avec_prophet=True, dossier=DOSSIER_PREVISIONS):
+    """Rafraîchissement France entière : baselines vectorisées partout, Prophet là où il est meilleur"""
+    temps = {}
+    debut = time.perf_counter()
+    noms, _, Y, series = matrice_series(agregats)
+    mape_baselines = evaluer_baselines(Y, horizon)
+    mape_baselines.index = noms
+    temps["baselines_evaluation_s"] = time.perf_counter() - debut
+
+    mape_prophet = None
+    if avec_prophet:
+        debut_prophet = time.perf_counter()
+        mape_prophet = scores_prophet(series, horizon, n_workers, dossier)
+        temps["prophet_evaluation_s"] = time.perf_counter() - debut_prophet
+    politique = choisir_modeles(mape_baselines, mape_prophet)
+
+    debut_prev = time.perf_counter()
+    previsions = prevoir_baselines(Y, politique["baseline"].to_numpy(), horizon)
+    temps["baselines_prevision_s"] = time.perf_counter() - debut_prev
+
+    # Mois prévus propres à chaque série : les `horizon` mois qui suivent son dernier mois observé
+    futurs = {nom: pd.period_range(pd.Period(series[nom]["mois"][-1], "M") + 1, periods=horizon, freq="M")
+              .strftime("%Y-%m") for nom in noms}
+    df_prev = pd.DataFrame({
+        "serie": np.repeat(noms, horizon),
+        "ds": np.concatenate([futurs[nom] for nom in noms]),
+        "yhat": np.exp(previsions).ravel(),
+    })
+    for i, col in enumerate(CLES_SERIE):
+        df_prev[col] = df_prev["serie"].map({nom: s["cle"][i] for nom, s in series.items()})
+    df_prev["methode"] = df_prev["serie"].map(politique["baseline"])
+
+    os.makedirs(dossier, exist_ok=True)
+    df_prev.to_csv(os.path.join(dossier, NOM_PREVISIONS_BASELINE), sep=";", index=False)
+    politique.rename_axis("serie").to_csv(os.path.join(dossier, NOM_POLITIQUE), sep=";")
+
+    retenues = politique.index[politique["modele"] == "prophet"].tolist()
+    if avec_prophet and retenues:
+        debut_fit = time.perf_counter()
+        ajuster_series(agregats, n_workers=n_workers, dossier=dossier, horizon=horizon, series_retenues=retenues)
+        temps["prophet_ajustement_s"] = time.perf_counter() - debut_fit
+
+    temps["total_s"] = time.perf_counter() - debut
+    return politique, temps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prévisions baselines vectorisées + choix automatique de Prophet")
+    parser.add_argument("--agregats", default=CHEMIN_AGREGATS,
+                        help="agrégats mensuels (ou indices hédoniques : dvf/agregats_indices.csv)")
+    parser.add_argument("--dossier", default=DOSSIER_PREVISIONS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sans-prophet", action="store_true", help="baselines seules (rafraîchissement en secondes)")
+    args = parser.parse_args()
+
+    politique, temps = rafraichir(charger_agregats(args.agregats), n_workers=args.workers,
+                                  avec_prophet=not args.sans_prophet, dossier=args.dossier)
+    print(politique["modele"].value_counts().to_string())
+    if not politique["evaluable"].all():
+        print(f"⚠️ {(~politique['evaluable']).sum()} séries sans historique avant leur fenêtre de test "
+              f"→ {METHODE_DEFAUT}")
+    print(" | ".join(f"{k} : {v:.2f}" for k, v in temps.items()))
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ingestion_dvf import CHEMIN_AGREGATS
+
+# === Emplacement des prévisions persistées ===
+DOSSIER_PREVISIONS = "models/prophet"
+NOM_MANIFESTE = "manifeste.json"
+NOM_PREVISIONS = "previsions.csv"
+
+# === Paramètres des séries ===
+CLES_SERIE = ["code_departement", "statut_uu", "type_bien"]
+COLONNE_CIBLE = "log_prix_m2_moyen"
+HORIZON_MOIS = 6
+MIN_POINTS = 24
+
+
+def charger_agregats(chemin=CHEMIN_AGREGATS):
+    """Charge les agrégats mensuels DVF (codes géographiques conservés en texte)"""
+    return pd.read_csv(chemin, sep=";", dtype={"code_departement": str, "code_region": str})
+
+
+def nom_serie(cle):
+    """Identifiant de fichier d'une série (département, statut, type de bien)"""
+    return "_".join(str(c).replace(" ", "-").replace("/", "-") for c in cle)
+
+
+def empreinte_serie(mois, valeurs):
+    """Empreinte SHA-256 des données d'entrée d'une série"""
+    h = hashlib.sha256()
+    h.update("|".join(map(str, mois)).encode("utf-8"))
+    h.update(np.asarray(valeurs, dtype="float64").tobytes())
+    return h.hexdigest()
+
+
+def decouper_series(agregats, colonne=COLONNE_CIBLE, min_points=MIN_POINTS):
+    """Découpe les agrégats en séries mensuelles triées, avec leur empreinte"""
+    series = {}
+    for cle, groupe in agregats.groupby(CLES_SERIE, sort=True):
+        groupe = groupe.dropna(subset=[colonne]).sort_values("mois")
+        if len(groupe) < min_points:
+            continue
+        mois = groupe["mois"].astype(str).tolist()
+        valeurs = groupe[colonne].to_numpy(dtype="float64")
+        series[nom_serie(cle)] = {
+            "cle": list(cle),
+            "mois": mois,
+            "y": valeurs,
+            "empreinte": empreinte_serie(mois, valeurs),
+        }
+    return series
+
+
+def _ajuster_une_serie(nom, mois, y, horizon):
+    """Ajuste un modèle Prophet sur une série (exécuté dans un processus de travail)"""
+    from prophet import Prophet
+    from prophet.serialize import model_to_json
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+
+    debut = time.perf_counter()
+    df = pd.DataFrame({"ds": pd.to_datetime(mois, format="%Y-%m"), "y": y})
+    modele = Prophet(yearly_seasonality=True, weekly_seasonality=False, daily_seasonality=False)
+    modele.fit(df)
+
+    futur = modele.make_future_dataframe(periods=horizon, freq="MS")
+    prevision = modele.predict(futur)[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+    # Retour à l'échelle €/m² (la cible est en logarithme)
+    for col in ["yhat", "yhat_lower", "yhat_upper"]:
+        prevision[col] = np.exp(prevision[col])
+    prevision["ds"] = prevision["ds"].dt.strftime("%Y-%m")
+    prevision["historique"] = prevision["ds"].isin(mois)
+
+    return nom, model_to_json(modele), prevision, time.perf_counter() - debut
+
+
+def charger_manifeste(dossier=DOSSIER_PREVISIONS):
+    chemin = os.path.join(dossier, NOM_MANIFESTE)
+    if not os.path.exists(chemin):
+        return {}
+    with open(chemin, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def sauver_manifeste(manifeste, dossier=DOSSIER_PREVISIONS):
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, NOM_MANIFESTE)
+    with open(chemin + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifeste, f, ensure_ascii=False, indent=1)
+    os.replace(chemin + ".tmp", chemin)
+
+
+def marquer_perimees(noms, dossier=DOSSIER_PREVISIONS):
+    """Marque des séries comme périmées : elles seront réajustées au prochain passage"""
+    manifeste = charger_manifeste(dossier)
+    marquees = [nom for nom in noms if nom in manifeste]
+    for nom in marquees:
+        manifeste[nom]["perime"] = True
+    if marquees:
+        sauver_manifeste(manifeste, dossier)
+    return marquees
+
+
+def series_a_reajuster(series, manifeste, forcer=False):
+    """Séries nouvelles, modifiées ou marquées périmées depuis le dernier ajustement"""
+    if forcer:
+        return list(series)
+    return [
+        nom for nom, s in series.items()
+        if nom not in manifeste
+        or manifeste[nom].get("empreinte") != s["empreinte"]
+        or manifeste[nom].get("perime", False)
+    ]
+
+
+def ajuster_series(agregats, n_workers=None, forcer=False, dossier=DOSSIER_PREVISIONS, horizon=HORIZON_MOIS,
+                   series_retenues=None):
+    """Ajuste (en parallèle) les séries dont les données ont changé et persiste modèles + prévisions"""
+    series = decouper_series(agregats)
+    if series_retenues is not None:
+        retenues = set(series_retenues)
+        series = {nom: s for nom, s in series.items() if nom in retenues}
+    manifeste = charger_manifeste(dossier)
+    a_ajuster = series_a_reajuster(series, manifeste, forcer)
+
+    os.makedirs(dossier, exist_ok=True)
+    debut = time.perf_counter()
+    nouvelles_previsions = []
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [
+            pool.submit(_ajuster_une_serie, nom, series[nom]["mois"], series[nom]["y"], horizon)
+            for nom in a_ajuster
+        ]
+        for future in futures:
+            nom, modele_json, prevision, duree = future.result()
+            with open(os.path.join(dossier, f"{nom}.json"), "w", encoding="utf-8") as f:
+                f.write(modele_json)
+            cle = series[nom]["cle"]
+            prevision["serie"] = nom
+            for col, val in zip(CLES_SERIE, cle):
+                prevision[col] = val
+            nouvelles_previsions.append(prevision)
+            manifeste[nom] = {
+                "cle": cle,
+                "empreinte": series[nom]["empreinte"],
+                "date_ajustement": datetime.now().isoformat(timespec="seconds"),
+                "duree_s": round(duree, 3),
+                "perime": False,
+            }
+
+    duree_totale = time.perf_counter() - debut
+
+    # Remplacement des prévisions des seules séries réajustées
+    chemin_prev = os.path.join(dossier, NOM_PREVISIONS)
+    if os.path.exists(chemin_prev):
+        anciennes = pd.read_csv(chemin_prev, sep=";", dtype={"code_departement": str})
+        anciennes = anciennes[~anciennes["serie"].isin(a_ajuster)]
+        nouvelles_previsions.insert(0, anciennes)
+    if nouvelles_previsions:
+        pd.concat(nouvelles_previsions, ignore_index=True).to_csv(chemin_prev, sep=";", index=False)
+
+    sauver_manifeste(manifeste, dossier)
+    return {
+        "nb_series": len(series),
+        "nb_ajustees": len(a_ajuster),
+        "nb_inchangees": len(series) - len(a_ajuster),
+        "duree_s": duree_totale,
+    }
+
+
+def charger_previsions(dossier=DOSSIER_PREVISIONS):
+    """Prévisions persistées de toutes les séries (historique ajusté + horizon)"""
+    chemin = os.path.join(dossier, NOM_PREVISIONS)
+    if not os.path.exists(chemin):
+        return None
+    return pd.read_csv(chemin, sep=";", dtype={"code_departement": str})
+
+
+def mesurer_temps(agregats, liste_workers=None, dossier="models/prophet_benchmark"):
+    """Temps d'ajustement complet à 1 worker puis N workers (ajustement forcé)"""
+    if liste_workers is None:
+        liste_workers = [1, os.cpu_count() or 1]
+    resultats = []
+    for n in liste_workers:
+        stats = ajuster_series(agregats, n_workers=n, forcer=True, dossier=dossier)
+        resultats.append({"workers": n, "nb_series": stats["nb_ajustees"], "duree_s": round(stats["duree_s"], 2)})
+    df = pd.DataFrame(resultats)
+    df["acceleration"] = (df["duree_s"].iloc[0] / df["duree_s"]).round(2)
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ajustement Prophet par département × statut urbain × type de bien")
+    parser.add_argument("--agregats", default=CHEMIN_AGREGATS,
+                        help="agrégats mensuels (ou indices hédoniques : dvf/agregats_indices.csv)")
+    parser.add_argument("--dossier", default=DOSSIER_PREVISIONS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--forcer", action="store_true", help="réajuster toutes les séries")
+    parser.add_argument("--benchmark", action="store_true", help="comparer 1 worker et N workers")
+    args = parser.parse_args()
+
+    agregats = charger_agregats(args.agregats)
+    if args.benchmark:
+        print(mesurer_temps(agregats).to_string(index=False))
+    else:
+        stats = ajuster_series(agregats, n_workers=args.workers, forcer=args.forcer, dossier=args.dossier)
+        print(f"✅ {stats['nb_ajustees']} séries ajustées, {stats['nb_inchangees']} inchangées "
+              f"({stats['duree_s']:.1f} s)")
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from chargement_donnees import CHEMIN_ANNONCES, ENCODAGE, ORDRE_DPE, SEP, empreinte_fichier, lire_annonces, optimiser_types
+from statistiques_flux import CorrelationIncrementale, HistogrammeFixe, MomentsCourants, SketchKLL, TauxManquants
+
+# === Artefact de profilage (résumés pré-calculés pour la page d'exploration) ===
+CHEMIN_PROFIL = "data/profil_eda.json"
+PRIX_M2_MIN, PRIX_M2_MAX = 500, 8000
+NB_CLASSES_HISTO = 50
+NB_POINTS_KDE = 200
+SEUIL_NA = 5
+MAX_FLIERS = 200
+DECIMALES = 4
+# Au-delà de cette taille, le profil est calculé en flux (une passe par blocs, mémoire bornée)
+SEUIL_FLUX_OCTETS = 500 * 1024 ** 2
+TAILLE_BLOC_FLUX = 100_000
+
+
+def _arrondir(valeurs):
+    return np.round(np.asarray(valeurs, dtype="float64"), DECIMALES).tolist()
+
+
+def resume_boite(valeurs, whis=1.5, rng=None):
+    """Statistiques d'une boîte à moustaches (format attendu par matplotlib `Axes.bxp`)"""
+    valeurs = np.sort(np.asarray(valeurs, dtype="float64"))
+    q1, med, q3 = np.percentile(valeurs, [25, 50, 75])
+    ecart = q3 - q1
+    dans = valeurs[(valeurs >= q1 - whis * ecart) & (valeurs <= q3 + whis * ecart)]
+    fliers = valeurs[(valeurs < dans.min()) | (valeurs > dans.max())]
+    if len(fliers) > MAX_FLIERS:
+        fliers = (rng or np.random.default_rng(0)).choice(fliers, MAX_FLIERS, replace=False)
+    return {"q1": q1, "med": med, "q3": q3, "whislo": dans.min(), "whishi": dans.max(),
+            "mean": valeurs.mean(), "n": int(len(valeurs)), "fliers": _arrondir(fliers)}
+
+
+def courbe_kde(valeurs, nb_points=NB_POINTS_KDE):
+    """Densité par noyau gaussien (largeur de Scott, comme seaborn) évaluée sur une grille"""
+    from scipy.stats import gaussian_kde
+
+    grille = np.linspace(valeurs.min(), valeurs.max(), nb_points)
+    return grille, gaussian_kde(valeurs, bw_method="scott")(grille)
+
+
+def calculer_profil(df):
+    """Tous les résumés affichés par la page d'exploration, calculés une fois"""
+    apercu = df.head()
+    if "prix_m2_vente" in df.columns:
+        df = df[df["prix_m2_vente"].between(PRIX_M2_MIN, PRIX_M2_MAX)]
+    profil = {"apercu": json.loads(apercu.to_json(orient="split", date_format="iso"))}
+
+    na = (df.isna().mean() * 100).sort_values(ascending=False)
+    na = na[na > SEUIL_NA]
+    profil["na"] = {"colonnes": na.index.tolist(), "taux": _arrondir(na.values)}
+
+    if "prix_m2_vente" in df.columns:
+        prix = df["prix_m2_vente"].to_numpy(dtype="float64")
+        log_prix = np.log10(prix)
+        comptes, bornes = np.histogram(log_prix, bins=NB_CLASSES_HISTO)
+        grille, densite = courbe_kde(log_prix)
+        # Densité remise à l'échelle des effectifs, comme la KDE superposée par seaborn
+        effectifs_kde = densite * len(log_prix) * (bornes[1] - bornes[0])
+        profil["histogramme"] = {"comptes": comptes.tolist(), "bornes": _arrondir(bornes),
+                                 "kde_x": _arrondir(grille), "kde_y": _arrondir(effectifs_kde),
+                                 "mediane": float(np.median(prix))}
+
+        if "dpeL" in df.columns:
+            dpe = df["dpeL"].astype(str)
+            rng = np.random.default_rng(0)
+            profil["boites_dpe"] = {
+                classe: {k: (float(v) if k != "fliers" else v) for k, v in resume_boite(prix[dpe == classe], rng=rng).items()}
+                for classe in ORDRE_DPE if (dpe == classe).any()
+            }
+
+    numeriques = df.select_dtypes(include="number").dropna(axis=1)
+    correlation = numeriques.astype("float64").corr()
+    profil["correlation"] = {"colonnes": correlation.columns.tolist(),
+                             "valeurs": np.round(correlation.to_numpy(), 3).tolist()}
+    return profil
+
+
+def calculer_profil_flux(chemin, taille_bloc=TAILLE_BLOC_FLUX):
+    """Même profil que `calculer_profil`, en une passe sur le CSV lu par blocs
+
+    Quantiles et boîtes par DPE : sketches KLL ; distribution : histogramme à bornes fixes
+    (KDE lissée depuis l'histogramme) ; taux de NA et corrélations : cumuls fusionnables.
+    """
+    bornes = np.linspace(np.log10(PRIX_M2_MIN), np.log10(PRIX_M2_MAX), NB_CLASSES_HISTO + 1)
+    histogramme, moments = HistogrammeFixe(bornes), MomentsCourants()
+    sketch_prix, sketches_dpe = SketchKLL(), {}
+    manquants, correlation, apercu = TauxManquants(), None, None
+
+    for bloc in pd.read_csv(chemin, sep=SEP, encoding=ENCODAGE, chunksize=taille_bloc):
+        bloc = optimiser_types(bloc)
+        if apercu is None:
+            apercu = bloc.head()
+            correlation = CorrelationIncrementale(bloc.select_dtypes(include="number").columns)
+        if "prix_m2_vente" in bloc.columns:
+            bloc = bloc[bloc["prix_m2_vente"].between(PRIX_M2_MIN, PRIX_M2_MAX)]
+        manquants.ajouter(bloc)
+        correlation.ajouter(bloc)
+        if "prix_m2_vente" in bloc.columns:
+            prix = bloc["prix_m2_vente"].to_numpy(dtype="float64")
+            histogramme.ajouter(np.log10(prix))
+            moments.ajouter(np.log10(prix))
+            sketch_prix.ajouter(prix)
+            if "dpeL" in bloc.columns:
+                dpe = bloc["dpeL"].astype(str).to_numpy()
+                for classe in ORDRE_DPE:
+                    masque = dpe == classe
+                    if masque.any():
+                        sketches_dpe.setdefault(classe, SketchKLL()).ajouter(prix[masque])
+
+    profil = {"apercu": json.loads(apercu.to_json(orient="split", date_format="iso"))}
+    na = manquants.resultat()
+    na = na[na > SEUIL_NA]
+    profil["na"] = {"colonnes": na.index.tolist(), "taux": _arrondir(na.values)}
+
+    if sketch_prix.n:
+        # KDE gaussienne (largeur de Scott) approchée par les centres de classes pondérés
+        centres = (bornes[:-1] + bornes[1:]) / 2
+        largeur = moments.ecart_type * moments.n ** (-1 / 5)
+        grille = np.linspace(moments.minimum, moments.maximum, NB_POINTS_KDE)
+        noyaux = np.exp(-0.5 * ((grille[:, None] - centres[None, :]) / largeur) ** 2) / (largeur * np.sqrt(2 * np.pi))
+        effectifs_kde = noyaux @ histogramme.comptes * (bornes[1] - bornes[0])
+        profil["histogramme"] = {"comptes": histogramme.comptes.tolist(), "bornes": _arrondir(bornes),
+                                 "kde_x": _arrondir(grille), "kde_y": _arrondir(effectifs_kde),
+                                 "mediane": float(sketch_prix.quantiles([0.5])[0])}
+        if sketches_dpe:
+            rng = np.random.default_rng(0)
+            profil["boites_dpe"] = {
+                classe: {k: (float(v) if k != "fliers" else _arrondir(v))
+                         for k, v in sketches_dpe[classe].resume_boite(max_fliers=MAX_FLIERS, rng=rng).items()}
+                for classe in sketches_dpe
+            }
+
+    matrice = correlation.resultat()
+    profil["correlation"] = {"colonnes": matrice.columns.tolist(), "valeurs": np.round(matrice.to_numpy(), 3).tolist()}
+    return profil
+
+
+def generer_profil(chemin_donnees=CHEMIN_ANNONCES, chemin_profil=CHEMIN_PROFIL, forcer=False, flux=None):
+    """Régénère l'artefact uniquement si l'empreinte des données a changé
+
+    `flux=None` : calcul exact en mémoire pour les petits fichiers, en flux au-delà de SEUIL_FLUX_OCTETS.
+    """
+    empreinte = empreinte_fichier(chemin_donnees)
+    if not forcer and os.path.exists(chemin_profil):
+        with open(chemin_profil, "r", encoding="utf-8") as f:
+            existant = json.load(f)
+        if existant.get("empreinte") == empreinte:
+            return existant, False
+
+    if flux is None:
+        flux = os.path.getsize(chemin_donnees) > SEUIL_FLUX_OCTETS
+    debut = time.perf_counter()
+    if flux:
+        profil = calculer_profil_flux(chemin_donnees)
+    else:
+        df, _ = lire_annonces(chemin_donnees)
+        profil = calculer_profil(df)
+    profil["empreinte"] = empreinte
+    profil["mode"] = "flux" if flux else "exact"
+    profil["duree_calcul_s"] = round(time.perf_counter() - debut, 3)
+    with open(chemin_profil, "w", encoding="utf-8") as f:
+        json.dump(profil, f, ensure_ascii=False, separators=(",", ":"))
+    return profil, True
+
+
+def charger_profil(chemin_profil=CHEMIN_PROFIL):
+    with open(chemin_profil, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profilage hors ligne du jeu d'annonces enrichi")
+    parser.add_argument("--forcer", action="store_true")
+    parser.add_argument("--flux", action="store_true", help="calcul en une passe par blocs (gros fichiers)")
+    args = parser.parse_args()
+
+    profil, regenere = generer_profil(forcer=args.forcer, flux=args.flux or None)
+    if regenere:
+        print(f"✅ Profil régénéré ({profil['mode']}) en {profil['duree_calcul_s']:.2f} s → {CHEMIN_PROFIL} "
+              f"({os.path.getsize(CHEMIN_PROFIL) / 1024:.0f} Ko)")
+    else:
+        print(f"✅ Profil à jour (empreinte inchangée) : {CHEMIN_PROFIL}")
@@ -0,0 +1,108 @@
+import os
+import copy
+import time
+import shutil
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from optimisation_optuna import DOSSIER_MODELES, GRAINE, PREFIXES, charger_jeu, construire_modele
+
+# === Rafraîchissement incrémental (les nouvelles annonces seules, sans réapprendre l'historique) ===
+NB_ARBRES_AJOUTES = 50
+PART_CONTROLE = 0.2
+TOLERANCE = 0.01  # dégradation RMSE acceptée sur le jeu de contrôle
+
+
+def _matrice(modele, X):
+    """Noms de colonnes conservés uniquement si le modèle a été entraîné avec"""
+    return X if hasattr(modele, "feature_names_in_") else np.asarray(X, dtype="float32")
+
+
+def rmse(modele, X, y):
+    return float(np.sqrt(np.mean((modele.predict(_matrice(modele, X)) - y) ** 2)))
+
+
+def prolonger(modele, X, y, nb_arbres=NB_ARBRES_AJOUTES):
+    """Nouveau modèle = arbres existants + `nb_arbres` arbres appris sur (X, y) uniquement"""
+    nom = type(modele).__name__
+    if nom == "LGBMRegressor":
+        suite = type(modele)(**{**modele.get_params(), "n_estimators": nb_arbres, "verbose": -1})
+        return suite.fit(_matrice(modele, X), y, init_model=modele.booster_)
+    if nom == "XGBRegressor":
+        suite = type(modele)(**{**modele.get_params(), "n_estimators": nb_arbres})
+        return suite.fit(_matrice(modele, X), y, xgb_model=modele.get_booster())
+    if hasattr(modele, "warm_start") and hasattr(modele, "estimators_"):
+        suite = copy.deepcopy(modele)
+        suite.set_params(warm_start=True, n_estimators=len(modele.estimators_) + nb_arbres)
+        return suite.fit(_matrice(modele, X), y)
+    raise TypeError(f"Rafraîchissement incrémental non pris en charge pour {nom}")
+
+
+def rafraichir(chemin_modele, X, y, nb_arbres=NB_ARBRES_AJOUTES, part_controle=PART_CONTROLE,
+               tolerance=TOLERANCE, ecrire=True):
+    """Prolonge le modèle sur le nouveau lot ; le remplace seulement s'il passe le contrôle
+
+    Une part du lot est mise de côté : ni l'ancien ni le nouveau modèle ne l'ont vue, l'écart de RMSE
+    entre les deux mesure donc l'apport des nouvelles annonces.
+    """
+    actuel = joblib.load(chemin_modele)
+    X_app, X_ctrl, y_app, y_ctrl = train_test_split(X, y, test_size=part_controle, random_state=GRAINE)
+    debut = time.perf_counter()
+    nouveau = prolonger(actuel, X_app, y_app, nb_arbres)
+    duree = time.perf_counter() - debut
+
+    rmse_actuel, rmse_nouveau = rmse(actuel, X_ctrl, y_ctrl), rmse(nouveau, X_ctrl, y_ctrl)
+    accepte = rmse_nouveau <= rmse_actuel * (1 + tolerance)
+    if accepte and ecrire:
+        # Version précédente conservée ; écriture atomique pour les sessions qui rechargent le modèle
+        shutil.copy2(chemin_modele, chemin_modele.replace(".pkl", ".precedent.pkl"))
+        temporaire = f"{chemin_modele}.{os.getpid()}.tmp"
+        joblib.dump(nouveau, temporaire)
+        os.replace(temporaire, chemin_modele)
+    return {"modele": chemin_modele, "nb_lignes": len(y_app), "nb_controle": len(y_ctrl), "duree_s": duree,
+            "rmse_actuel": rmse_actuel, "rmse_nouveau": rmse_nouveau, "accepte": bool(accepte)}
+
+
+def mesurer_echelle(type_bien, famille, tailles=(100, 300, 1000), nb_arbres=NB_ARBRES_AJOUTES, params=None):
+    """Durée du rafraîchissement selon la taille du lot, comparée à un réentraînement complet"""
+    X, y = charger_jeu(type_bien)
+    historique, lots = np.arange(len(y) - max(tailles)), np.arange(len(y) - max(tailles), len(y))
+    params = params or {"n_estimators": 200}
+    modele = construire_modele(famille, params, n_jobs=-1).fit(X.iloc[historique], y[historique])
+    lignes = []
+    for taille in tailles:
+        lot = lots[:taille]
+        debut = time.perf_counter()
+        prolonger(modele, X.iloc[lot], y[lot], nb_arbres)
+        duree_incrementale = time.perf_counter() - debut
+        tout = np.concatenate([historique, lot])
+        debut = time.perf_counter()
+        construire_modele(famille, params, n_jobs=-1).fit(X.iloc[tout], y[tout])
+        lignes.append((taille, duree_incrementale, time.perf_counter() - debut))
+    return pd.DataFrame(lignes, columns=["taille_lot", "incremental_s", "complet_s"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rafraîchissement incrémental d'un modèle sur de nouvelles annonces")
+    parser.add_argument("type_bien", choices=["appart", "maison"])
+    parser.add_argument("--famille", choices=list(PREFIXES), default="xgboost")
+    parser.add_argument("--annonces", help="nouvelles annonces encodées (sep=';', colonnes du modèle)")
+    parser.add_argument("--cibles", help="prix au m² des nouvelles annonces (une colonne)")
+    parser.add_argument("--arbres", type=int, default=NB_ARBRES_AJOUTES)
+    parser.add_argument("--echelle", action="store_true", help="mesurer la durée selon la taille du lot")
+    args = parser.parse_args()
+
+    if args.echelle:
+        print(mesurer_echelle(args.type_bien, args.famille, nb_arbres=args.arbres).round(3).to_string(index=False))
+    else:
+        X = pd.read_csv(args.annonces, sep=";").astype("float32")
+        y = pd.read_csv(args.cibles).iloc[:, 0].to_numpy(dtype="float64")
+        chemin = os.path.join(DOSSIER_MODELES, f"{PREFIXES[args.famille]}_{args.type_bien}.pkl")
+        rapport = rafraichir(chemin, X, y, args.arbres)
+        etat = "✅ Modèle remplacé" if rapport["accepte"] else "⛔ Modèle conservé"
+        print(f"{etat} ({chemin}) : RMSE contrôle {rapport['rmse_actuel']:.2f} → {rapport['rmse_nouveau']:.2f} € "
+              f"— {rapport['nb_lignes']} annonces en {rapport['duree_s']:.2f} s")
@@ -0,0 +1,127 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+from sklearn.model_selection import train_test_split
+
+from chargement_donnees import empreinte_fichier
+from optimisation_optuna import FICHIERS_CIBLE, GRAINE, charger_jeu
+from precalcul_shap import chemin_modele
+from transformation_annonces import FICHIERS_REFERENCE
+
+# === Rapports Shapash (un par modèle × type de bien), régénérés seulement si modèle ou données changent ===
+DOSSIER_RAPPORTS = "reports"
+NOM_MANIFESTE = "manifeste.json"
+CHEMIN_INFO_PROJET = os.path.join(DOSSIER_RAPPORTS, "info_projet.yml")
+FAMILLES_RAPPORTS = ["randomforest", "extratrees", "lightgbm", "xgboost"]
+TYPES_BIEN = {"appart": "Appartements", "maison": "Maisons"}
+PART_TEST = 0.2
+NIVEAU_GZIP = 9
+
+
+def nom_rapport(famille, type_bien):
+    return f"rapport_shapash_{famille}_{type_bien}.html"
+
+
+def chemin_rapport(famille, type_bien, dossier=DOSSIER_RAPPORTS):
+    return os.path.join(dossier, nom_rapport(famille, type_bien) + ".gz")
+
+
+def empreintes(famille, type_bien):
+    """Empreintes du modèle et des données (jeu encodé + cible) dont dépend le rapport"""
+    donnees = "".join(empreinte_fichier(c) for c in (FICHIERS_REFERENCE[type_bien][1], FICHIERS_CIBLE[type_bien]))
+    return {"modele": empreinte_fichier(chemin_modele(type_bien, famille)), "donnees": donnees}
+
+
+def lire_manifeste(dossier=DOSSIER_RAPPORTS):
+    chemin = os.path.join(dossier, NOM_MANIFESTE)
+    if not os.path.exists(chemin):
+        return {}
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _generer(famille, type_bien, dossier):
+    """Un rapport (exécuté dans un worker) : HTML Shapash dans un répertoire de travail isolé, puis gzip"""
+    from shapash import SmartExplainer
+
+    debut = time.perf_counter()
+    X, y = charger_jeu(type_bien)
+    X_app, X_test, y_app, y_test = train_test_split(X, y, test_size=PART_TEST, random_state=GRAINE)
+    modele = joblib.load(chemin_modele(type_bien, famille))
+    xpl = SmartExplainer(model=modele)
+    xpl.compile(x=X_test, y_target=y_test)
+
+    with tempfile.TemporaryDirectory() as travail:
+        html = os.path.join(travail, nom_rapport(famille, type_bien))
+        xpl.generate_report(output_file=html, project_info_file=CHEMIN_INFO_PROJET, x_train=X_app, y_train=y_app,
+                            y_test=y_test, title_story=f"{famille} – {TYPES_BIEN[type_bien]}",
+                            metrics=[{"name": "MAE", "path": "sklearn.metrics.mean_absolute_error"},
+                                     {"name": "R²", "path": "sklearn.metrics.r2_score"}],
+                            working_dir=travail)
+        # Écriture atomique du rapport compressé
+        temporaire = chemin_rapport(famille, type_bien, dossier) + f".{os.getpid()}.tmp"
+        with open(html, "rb") as source, gzip.open(temporaire, "wb", compresslevel=NIVEAU_GZIP) as cible:
+            shutil.copyfileobj(source, cible)
+        taille_html = os.path.getsize(html)
+    os.replace(temporaire, chemin_rapport(famille, type_bien, dossier))
+    return famille, type_bien, taille_html, time.perf_counter() - debut
+
+
+def construire_rapports(familles=FAMILLES_RAPPORTS, types_bien=TYPES_BIEN, n_workers=None, forcer=False,
+                        dossier=DOSSIER_RAPPORTS):
+    """Tous les rapports dont le modèle existe ; ceux dont les empreintes n'ont pas bougé sont conservés"""
+    debut = time.perf_counter()
+    os.makedirs(dossier, exist_ok=True)
+    manifeste = lire_manifeste(dossier)
+    a_generer, inchanges, absents, attendues = [], [], [], {}
+    for type_bien in types_bien:
+        for famille in familles:
+            if not os.path.exists(chemin_modele(type_bien, famille)):
+                absents.append(nom_rapport(famille, type_bien))
+                continue
+            nom = nom_rapport(famille, type_bien)
+            attendues[nom] = empreintes(famille, type_bien)
+            if not forcer and manifeste.get(nom) == attendues[nom] and os.path.exists(
+                    chemin_rapport(famille, type_bien, dossier)):
+                inchanges.append(nom)
+            else:
+                a_generer.append((famille, type_bien))
+
+    generes = []
+    if a_generer:
+        with ProcessPoolExecutor(max_workers=n_workers or min(len(a_generer), os.cpu_count())) as pool:
+            futures = [pool.submit(_generer, famille, type_bien, dossier) for famille, type_bien in a_generer]
+            for future in futures:
+                famille, type_bien, taille_html, duree = future.result()
+                nom = nom_rapport(famille, type_bien)
+                manifeste[nom] = attendues[nom]
+                generes.append({"rapport": nom, "taille_html_ko": taille_html / 1024, "duree_s": duree,
+                                "taille_gz_ko": os.path.getsize(chemin_rapport(famille, type_bien, dossier)) / 1024})
+                # Manifeste mis à jour rapport par rapport : une interruption ne fait pas tout refaire
+                with open(os.path.join(dossier, NOM_MANIFESTE), "w", encoding="utf-8") as f:
+                    json.dump(manifeste, f, indent=2)
+    return {"generes": generes, "inchanges": inchanges, "absents": absents,
+            "duree_s": time.perf_counter() - debut}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génération parallèle et incrémentale des rapports Shapash")
+    parser.add_argument("--familles", nargs="+", default=FAMILLES_RAPPORTS, choices=FAMILLES_RAPPORTS)
+    parser.add_argument("--types", nargs="+", default=list(TYPES_BIEN), choices=list(TYPES_BIEN))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--forcer", action="store_true", help="régénérer même si rien n'a changé")
+    args = parser.parse_args()
+
+    bilan = construire_rapports(args.familles, args.types, args.workers, args.forcer)
+    for rapport in bilan["generes"]:
+        print(f"✅ {rapport['rapport']} : {rapport['taille_html_ko']:.0f} Ko → {rapport['taille_gz_ko']:.0f} Ko "
+              f"(gzip) en {rapport['duree_s']:.1f} s")
+    print(f"✅ {len(bilan['generes'])} rapports générés, {len(bilan['inchanges'])} inchangés, "
+          f"{len(bilan['absents'])} sans modèle ({bilan['duree_s']:.1f} s)")
@@ -0,0 +1,124 @@
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from cube_dvf import CubeDVF, TOUS, PARENT_GEO
+from ingestion_dvf import DOSSIER_DVF
+from prevision_prophet import HORIZON_MOIS
+from prevision_baseline import prevoir_holt_winters
+
+# === Résultat ===
+CHEMIN_RECONCILIEES = os.path.join(DOSSIER_DVF, "previsions_reconciliees.csv")
+ORDRE_NIVEAUX = ["france", "region", "departement", "commune"]
+
+
+def hierarchie_depuis_cube(cube, type_bien=TOUS):
+    """Nœuds de la hiérarchie (agrégats d'abord, communes ensuite) et séries mensuelles additives
+
+    Le prix moyen n'est pas additif : on réconcilie le volume (nb de transactions) et la masse
+    Σ prix/m² = nb × prix moyen, le prix cohérent étant ensuite masse / volume.
+    """
+    cellules = cube.cellules[(cube.cellules["niveau_temps"] == "mois") & (cube.cellules["statut_uu"] == TOUS)
+                             & (cube.cellules["type_bien"] == type_bien)].copy()
+    cellules["masse"] = cellules["nb_transactions"] * cellules["prix_m2_moyen"]
+    cellules["ordre"] = cellules["niveau_geo"].map({n: i for i, n in enumerate(ORDRE_NIVEAUX)})
+
+    noeuds = cellules.drop_duplicates(["niveau_geo", "geo"]).sort_values(["ordre", "geo"])[
+        ["niveau_geo", "geo", "geo_parent"]].reset_index(drop=True)
+    cles = pd.MultiIndex.from_frame(noeuds[["niveau_geo", "geo"]])
+    volume = cellules.pivot_table(index=["niveau_geo", "geo"], columns="temps", values="nb_transactions",
+                                  aggfunc="sum", fill_value=0).reindex(cles, fill_value=0)
+    masse = cellules.pivot_table(index=["niveau_geo", "geo"], columns="temps", values="masse",
+                                 aggfunc="sum", fill_value=0).reindex(cles, fill_value=0)
+    return noeuds, volume, masse
+
+
+def matrice_sommation(noeuds):
+    """Matrice de sommation creuse S (n_noeuds × n_communes) : S[i, j] = 1 si la commune j est sous le nœud i"""
+    est_feuille = (noeuds["niveau_geo"] == "commune").to_numpy()
+    position = {(n, g): i for i, (n, g) in enumerate(zip(noeuds["niveau_geo"], noeuds["geo"]))}
+    feuilles = np.flatnonzero(est_feuille)
+    parents = noeuds["geo_parent"].to_numpy()
+    colonne = {i: j for j, i in enumerate(feuilles)}
+
+    lignes, colonnes = [], []
+    for i in feuilles:
+        # Remontée commune → département → région → France
+        noeud, niveau = i, "commune"
+        while noeud is not None:
+            lignes.append(noeud)
+            colonnes.append(colonne[i])
+            parent_niveau = PARENT_GEO[niveau]
+            parent = parents[noeud]
+            noeud = position.get((parent_niveau, parent)) if parent_niveau else None
+            niveau = parent_niveau
+    S = sparse.csr_matrix((np.ones(len(lignes)), (lignes, colonnes)), shape=(len(noeuds), len(feuilles)))
+    return S, est_feuille
+
+
+def reconcilier(Y_base, S, est_feuille, variances=None):
+    """Réconciliation WLS en une passe pour toutes les séries et tous les horizons
+
+    Forme par contraintes : Ỹ = Ŷ − W Cᵀ (C W Cᵀ)⁻¹ C Ŷ avec C = [I_agrégats, −S_agrégats] et
+    W = diag(variances). Le système à résoudre n'a que la taille du nombre d'agrégats
+    (France + régions + départements), même avec des dizaines de milliers de communes.
+    Par défaut, variances structurelles : nombre de communes sous chaque nœud.
+    """
+    if variances is None:
+        variances = np.asarray(S.sum(axis=1)).ravel()
+    agregats = np.flatnonzero(~est_feuille)
+    n_agregats = len(agregats)
+
+    # C réordonnée dans l'ordre des nœuds (agrégats puis communes)
+    C = sparse.hstack([sparse.identity(n_agregats, format="csr"), -S[agregats]], format="csr")
+    W = sparse.diags(np.concatenate([variances[agregats], variances[est_feuille]]))
+    ordre = np.concatenate([agregats, np.flatnonzero(est_feuille)])
+
+    Y = np.asarray(Y_base, dtype="float64")[ordre]
+    systeme = splu((C @ W @ C.T).tocsc())
+    correction = W @ (C.T @ systeme.solve(C @ Y))
+    Y_rec = np.empty_like(Y)
+    Y_rec[ordre] = Y - correction
+    return Y_rec
+
+
+def previsions_reconciliees(cube, type_bien=TOUS, horizon=HORIZON_MOIS):
+    """Prévisions Holt-Winters de volume et masse à chaque nœud, puis réconciliation commune → département → région"""
+    noeuds, volume, masse = hierarchie_depuis_cube(cube, type_bien)
+    S, est_feuille = matrice_sommation(noeuds)
+
+    volume_base = np.maximum(prevoir_holt_winters(volume.to_numpy(dtype="float64"), horizon), 0)
+    masse_base = np.maximum(prevoir_holt_winters(masse.to_numpy(dtype="float64"), horizon), 0)
+    # Volume et masse réconciliés ensemble (même projection, deux jeux de colonnes)
+    reconcilie = reconcilier(np.hstack([volume_base, masse_base]), S, est_feuille)
+    volume_rec, masse_rec = reconcilie[:, :horizon], reconcilie[:, horizon:]
+
+    futurs = pd.period_range(pd.Period(volume.columns[-1], "M") + 1, periods=horizon, freq="M").strftime("%Y-%m")
+    resultat = []
+    for k, ds in enumerate(futurs):
+        resultat.append(pd.DataFrame({
+            "niveau_geo": noeuds["niveau_geo"], "geo": noeuds["geo"], "ds": ds, "type_bien": type_bien,
+            "nb_base": volume_base[:, k], "prix_m2_base": masse_base[:, k] / np.maximum(volume_base[:, k], 1e-9),
+            "nb_reconcilie": volume_rec[:, k],
+            "prix_m2_reconcilie": masse_rec[:, k] / np.maximum(volume_rec[:, k], 1e-9),
+        }))
+    return pd.concat(resultat, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Réconciliation hiérarchique des prévisions DVF")
+    parser.add_argument("--horizon", type=int, default=HORIZON_MOIS)
+    args = parser.parse_args()
+
+    cube = CubeDVF.charger()
+    debut = time.perf_counter()
+    resultat = pd.concat([previsions_reconciliees(cube, t, args.horizon) for t in [TOUS, "Appartement", "Maison"]],
+                         ignore_index=True)
+    resultat.to_csv(CHEMIN_RECONCILIEES, sep=";", index=False)
+    print(f"✅ {resultat[['niveau_geo', 'geo']].drop_duplicates().shape[0]} séries réconciliées "
+          f"en {time.perf_counter() - debut:.2f} s → {CHEMIN_RECONCILIEES}")
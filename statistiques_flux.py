@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+# === Statistiques en une passe, à mémoire bornée et fusionnables (traitement par blocs) ===
+K_SKETCH = 200
+FACTEUR_CAPACITE = 2 / 3
+
+
+class SketchKLL:
+    """Sketch de quantiles KLL : quelques milliers de valeurs retenues quel que soit le volume lu
+
+    Chaque niveau h contient des valeurs de poids 2^h. Un niveau plein est trié puis compacté :
+    une valeur sur deux (décalage aléatoire) monte au niveau suivant. Deux sketches se fusionnent
+    en concaténant leurs niveaux, ce qui permet de paralléliser ou de cumuler des fichiers.
+    """
+
+    def __init__(self, k=K_SKETCH, graine=0):
+        self.k = k
+        self.niveaux = [np.zeros(0)]
+        self.n = 0
+        self.minimum, self.maximum = np.inf, -np.inf
+        self.rng = np.random.default_rng(graine)
+
+    def _capacite(self, h):
+        profondeur = len(self.niveaux) - h - 1
+        return max(2, int(np.ceil(self.k * FACTEUR_CAPACITE ** profondeur)))
+
+    def _compacter(self):
+        h = 0
+        while h < len(self.niveaux):
+            if len(self.niveaux[h]) >= self._capacite(h):
+                if h + 1 == len(self.niveaux):
+                    self.niveaux.append(np.zeros(0))
+                valeurs = np.sort(self.niveaux[h])
+                # Nombre impair : la dernière valeur reste sur place pour conserver le poids total
+                reste = valeurs[-1:] if len(valeurs) % 2 else valeurs[:0]
+                paires = valeurs[:len(valeurs) - len(reste)]
+                decalage = self.rng.integers(2)
+                self.niveaux[h + 1] = np.concatenate([self.niveaux[h + 1], paires[decalage::2]])
+                self.niveaux[h] = reste
+                h = 0
+            else:
+                h += 1
+
+    def ajouter(self, valeurs):
+        valeurs = np.asarray(valeurs, dtype="float64")
+        valeurs = valeurs[~np.isnan(valeurs)]
+        if not len(valeurs):
+            return
+        self.n += len(valeurs)
+        self.minimum = min(self.minimum, valeurs.min())
+        self.maximum = max(self.maximum, valeurs.max())
+        self.niveaux[0] = np.concatenate([self.niveaux[0], valeurs])
+        self._compacter()
+
+    def fusionner(self, autre):
+        for h, valeurs in enumerate(autre.niveaux):
+            if h == len(self.niveaux):
+                self.niveaux.append(np.zeros(0))
+            self.niveaux[h] = np.concatenate([self.niveaux[h], valeurs])
+        self.n += autre.n
+        self.minimum, self.maximum = min(self.minimum, autre.minimum), max(self.maximum, autre.maximum)
+        self._compacter()
+        return self
+
+    def valeurs_ponderees(self):
+        valeurs = np.concatenate(self.niveaux)
+        poids = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.niveaux)])
+        ordre = np.argsort(valeurs, kind="stable")
+        return valeurs[ordre], poids[ordre]
+
+    def quantiles(self, qs):
+        valeurs, poids = self.valeurs_ponderees()
+        cumul = np.cumsum(poids)
+        rangs = np.asarray(qs, dtype="float64") * cumul[-1]
+        resultat = valeurs[np.minimum(np.searchsorted(cumul, rangs, side="left"), len(valeurs) - 1)]
+        # Les extrêmes sont suivis exactement
+        return np.where(np.asarray(qs) <= 0, self.minimum, np.where(np.asarray(qs) >= 1, self.maximum, resultat))
+
+    def resume_boite(self, whis=1.5, max_fliers=200, rng=None):
+        """Boîte à moustaches approchée (format `Axes.bxp`) ; valeurs isolées tirées des valeurs retenues"""
+        q1, med, q3 = self.quantiles([0.25, 0.5, 0.75])
+        ecart = q3 - q1
+        valeurs, poids = self.valeurs_ponderees()
+        bas, haut = q1 - whis * ecart, q3 + whis * ecart
+        # q1 et q3 sont des valeurs retenues : les deux sélections ne sont jamais vides
+        whislo = self.minimum if self.minimum >= bas else valeurs[valeurs >= bas].min()
+        whishi = self.maximum if self.maximum <= haut else valeurs[valeurs <= haut].max()
+        fliers = valeurs[(valeurs < whislo) | (valeurs > whishi)]
+        if len(fliers) > max_fliers:
+            fliers = (rng or np.random.default_rng(0)).choice(fliers, max_fliers, replace=False)
+        moyenne = float((valeurs * poids).sum() / poids.sum())
+        return {"q1": q1, "med": med, "q3": q3, "whislo": whislo, "whishi": whishi,
+                "mean": moyenne, "n": int(self.n), "fliers": fliers}
+
+
+class HistogrammeFixe:
+    """Histogramme à bornes fixes : additif, donc fusionnable bloc à bloc ou entre fichiers"""
+
+    def __init__(self, bornes):
+        self.bornes = np.asarray(bornes, dtype="float64")
+        self.comptes = np.zeros(len(self.bornes) - 1, dtype="int64")
+
+    def ajouter(self, valeurs):
+        valeurs = np.asarray(valeurs, dtype="float64")
+        self.comptes += np.histogram(valeurs[~np.isnan(valeurs)], bins=self.bornes)[0]
+
+    def fusionner(self, autre):
+        self.comptes += autre.comptes
+        return self
+
+
+class MomentsCourants:
+    """Effectif, moyenne, variance, min et max cumulés (formules de fusion de Chan, numériquement stables)"""
+
+    def __init__(self):
+        self.n, self.moyenne, self.m2 = 0, 0.0, 0.0
+        self.minimum, self.maximum = np.inf, -np.inf
+
+    def _fusion(self, n, moyenne, m2, minimum, maximum):
+        if not n:
+            return
+        total = self.n + n
+        delta = moyenne - self.moyenne
+        self.moyenne += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+        self.minimum, self.maximum = min(self.minimum, minimum), max(self.maximum, maximum)
+
+    def ajouter(self, valeurs):
+        valeurs = np.asarray(valeurs, dtype="float64")
+        valeurs = valeurs[~np.isnan(valeurs)]
+        if len(valeurs):
+            moyenne = valeurs.mean()
+            self._fusion(len(valeurs), moyenne, ((valeurs - moyenne) ** 2).sum(), valeurs.min(), valeurs.max())
+
+    def fusionner(self, autre):
+        self._fusion(autre.n, autre.moyenne, autre.m2, autre.minimum, autre.maximum)
+        return self
+
+    @property
+    def ecart_type(self):
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+
+class CorrelationIncrementale:
+    """Matrice de corrélation cumulée bloc par bloc (co-moments centrés fusionnés)
+
+    Comme `df.select_dtypes("number").dropna(axis=1).corr()`, les colonnes ayant au moins une
+    valeur manquante sont exclues du résultat final.
+    """
+
+    def __init__(self, colonnes):
+        self.colonnes = list(colonnes)
+        p = len(self.colonnes)
+        self.n = 0
+        self.moyenne = np.zeros(p)
+        self.comoment = np.zeros((p, p))
+        self.avec_na = np.zeros(p, dtype=bool)
+
+    def ajouter(self, bloc):
+        X = bloc.reindex(columns=self.colonnes).apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+        if not len(X):
+            return
+        manquants = np.isnan(X)
+        self.avec_na |= manquants.any(axis=0)
+        X = np.where(manquants, 0.0, X)
+        moyenne = X.mean(axis=0)
+        centre = X - moyenne
+        self._fusion(len(X), moyenne, centre.T @ centre)
+
+    def _fusion(self, n, moyenne, comoment):
+        total = self.n + n
+        delta = moyenne - self.moyenne
+        self.comoment += comoment + np.outer(delta, delta) * self.n * n / total
+        self.moyenne += delta * n / total
+        self.n = total
+
+    def fusionner(self, autre):
+        self.avec_na |= autre.avec_na
+        if autre.n:
+            self._fusion(autre.n, autre.moyenne, autre.comoment)
+        return self
+
+    def resultat(self):
+        garde = ~self.avec_na
+        comoment = self.comoment[np.ix_(garde, garde)]
+        ecarts = np.sqrt(np.diag(comoment))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            correlation = comoment / np.outer(ecarts, ecarts)
+        colonnes = [c for c, g in zip(self.colonnes, garde) if g]
+        return pd.DataFrame(np.clip(correlation, -1, 1), index=colonnes, columns=colonnes)
+
+
+class TauxManquants:
+    def __init__(self):
+        self.n = 0
+        self.manquants = pd.Series(dtype="int64")
+
+    def ajouter(self, bloc):
+        self.n += len(bloc)
+        self.manquants = self.manquants.add(bloc.isna().sum(), fill_value=0).astype("int64")
+
+    def fusionner(self, autre):
+        self.n += autre.n
+        self.manquants = self.manquants.add(autre.manquants, fill_value=0).astype("int64")
+        return self
+
+    def resultat(self):
+        return (self.manquants / max(self.n, 1) * 100).sort_values(ascending=False)
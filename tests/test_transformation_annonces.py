@@ -0,0 +1,58 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from transformation_annonces import (  # noqa: E402
+    FICHIERS_REFERENCE, TransformateurAnnonces, calibrer, lire_reference, verifier_parite,
+)
+
+# === Parité du transformateur sur des annonces non vues au calibrage ===
+PART_CALIBRAGE = 0.8
+TOLERANCE = 1e-4
+
+
+def _decouper(brut, encode, graine=0):
+    """Paires (brute, encodée) séparées en calibrage / contrôle"""
+    ordre = np.random.default_rng(graine).permutation(len(brut))
+    k = int(PART_CALIBRAGE * len(brut))
+    return [(brut.iloc[i].reset_index(drop=True), encode.iloc[i].reset_index(drop=True)) for i in (ordre[:k], ordre[k:])]
+
+
+@pytest.fixture(scope="module", params=list(FICHIERS_REFERENCE))
+def reference(request):
+    # Les chemins des fichiers de référence et des encodages sont relatifs à la racine du dépôt
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(RACINE)
+        yield request.param, lire_reference(request.param)
+
+
+def test_parite_sur_annonces_tenues_a_l_ecart(reference):
+    """Calibré sur 80 % des paires, le transformateur reproduit exactement les 20 % restants"""
+    _, (brut, encode) = reference
+    (brut_cal, encode_cal), (brut_ctl, encode_ctl) = _decouper(brut, encode)
+    parite = verifier_parite(calibrer(brut_cal, encode_cal), brut_ctl, encode_ctl, tolerance=TOLERANCE)
+    assert parite["part_cellules_identiques"] == 1.0, parite
+    assert parite["ecart_max_renseigne"] <= TOLERANCE, parite
+
+
+def test_encodage_servi_conforme(reference):
+    """Le fichier models/encodage_<type>.json utilisé par le simulateur reproduit les annonces de contrôle"""
+    type_bien, (brut, encode) = reference
+    _, (brut_ctl, encode_ctl) = _decouper(brut, encode)
+    transformateur = TransformateurAnnonces.charger(type_bien, os.path.join(RACINE, "models"))
+    parite = verifier_parite(transformateur, brut_ctl, encode_ctl, tolerance=TOLERANCE)
+    assert parite["part_cellules_identiques"] == 1.0, parite
+
+
+def test_transformer_ligne_identique_au_lot(reference):
+    """Le chemin unitaire du simulateur donne le même vecteur que la transformation par lot"""
+    type_bien, (brut, _) = reference
+    transformateur = TransformateurAnnonces.charger(type_bien, os.path.join(RACINE, "models"))
+    lot = brut.sample(200, random_state=0).reset_index(drop=True)
+    lignes = np.vstack([transformateur.transformer_ligne(annonce) for annonce in lot.to_dict("records")])
+    np.testing.assert_allclose(lignes, transformateur.transformer(lot), atol=1e-6)
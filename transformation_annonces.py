@@ -0,0 +1,322 @@
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# === Fichiers de référence (annonces brutes / encodées du jeu de test) ===
+DOSSIER_ENCODAGES = "models"
+FICHIERS_REFERENCE = {
+    "appart": ("data/X_test_appart_raw.csv", "data/annonces_ventes_68_appartements_X_test.csv"),
+    "maison": ("data/X_test_maison_raw.csv", "data/annonces_ventes_68_maisons_X_test.csv"),
+}
+ENCODAGE_REFERENCE = "ISO-8859-1"
+COLONNES_HORS_MODELE = ["date", "typedebien_lite"]
+
+# === Encodages du pipeline d'entraînement ===
+ORDRE_DPE_MODELE = ["A", "B", "C", "D", "E", "F", "G"]
+# Ordre des codes produit à l'entraînement (libellés de tranches tels qu'exportés par Excel)
+ORDRE_NB_ETAGES = ["11+", "inconnu/0", "01-févr", "03-avr", "05-juil", "08-oct"]
+GES_INCONNUE = "inconnue"
+DIRECTIONS_EXPOSITION = ["autre", "est", "nord", "sud"]
+# Tranches d'année de construction, codées dans l'ordre alphabétique de leurs libellés
+BORNES_ANNEE = [-np.inf, 1950, 1970, 2000, np.inf]
+CODES_CLASSE_ANNEE = [3, 0, 1, 2]  # <1950, 1950-1969, 1970-1999, 2000+
+CODE_ANNEE_OBSERVEE, CODE_ANNEE_IMPUTEE = 2, 1
+COLONNES_DERIVEES_ANNEE = ["classe_annee", "source_imputation"]
+ANNEE_REFERENCE = 2024  # sans effet après centrage-réduction, seul le signe compte
+# Colonnes codées par LabelEncoder : la table valeur → code est apprise sur les paires brut / encodé
+COLONNES_CODES = ["ges_class", "chauffage_energie", "chauffage_systeme", "chauffage_mode",
+                  "categorie_annonceur", "CODE_IRIS", "TYP_IRIS_y"]
+
+# === Variables dérivées ===
+SURF_PAR_PIECE_MIN, SURF_PAR_PIECE_MAX = 6, 60
+
+
+def _variantes(valeur):
+    """Libellé tel quel et tel qu'il apparaît lorsqu'un fichier UTF-8 est lu en Latin-1 (« Ã\x89lectrique »)"""
+    variantes = {valeur}
+    try:
+        variantes.add(valeur.encode("utf-8").decode("latin1"))
+        variantes.add(valeur.encode("latin1").decode("utf-8"))
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        pass
+    return variantes
+
+
+def _cles(serie):
+    """Valeurs sous forme de chaînes (clés JSON), les codes numériques sans décimale parasite ; None si absente"""
+    if pd.api.types.is_numeric_dtype(serie):
+        valeurs = serie.to_numpy(dtype="float64", na_value=np.nan)
+        manquant = np.isnan(valeurs)
+        return np.where(manquant, None, np.where(manquant, 0, valeurs).astype("int64").astype(str).astype(object))
+    return serie.to_numpy(dtype=object, na_value=None)
+
+
+class TableCodes:
+    """Table valeur → code : seules les valeurs distinctes du lot sont recherchées, puis diffusées par leur code"""
+
+    def __init__(self, table):
+        cles, codes = [], []
+        for valeur, code in table.items():
+            for variante in _variantes(str(valeur)):
+                cles.append(variante)
+                codes.append(code)
+        self.index = pd.Index(cles, dtype=object)
+        self.codes = np.append(np.asarray(codes, dtype="float64"), np.nan)  # position -1 → NaN
+        self.dictionnaire = dict(zip(cles, map(float, codes)))  # recherche unitaire (formulaire)
+
+    def appliquer(self, serie):
+        positions, uniques = pd.factorize(serie)  # -1 pour les valeurs manquantes
+        codes_uniques = self.codes[self.index.get_indexer(_cles(pd.Series(uniques)))]
+        return np.append(codes_uniques, np.nan)[positions]
+
+
+TABLES_FIXES = {
+    "dpeL": TableCodes({c: i for i, c in enumerate(ORDRE_DPE_MODELE)}),
+    "nb_etages": TableCodes({c: i for i, c in enumerate(ORDRE_NB_ETAGES)}),
+    "ges_class_encoded": TableCodes({**{c: i for i, c in enumerate(ORDRE_DPE_MODELE)}, GES_INCONNUE: -1}),
+}
+SOURCES = {"ges_class_encoded": "ges_class"}
+TABLE_EXPOSITION = TableCodes({d: i for i, d in enumerate(DIRECTIONS_EXPOSITION)})
+
+
+class TransformateurAnnonces:
+    """Annonce(s) brute(s) → espace des variables du modèle, en une passe vectorisée quel que soit le lot
+
+    Paramètres appris à l'entraînement : tables des LabelEncoder (`codes`), moyennes / écarts-types
+    du StandardScaler et valeurs d'imputation (exprimées avant centrage-réduction).
+    """
+
+    def __init__(self, colonnes, codes, moyennes, ecarts, imputations):
+        self.colonnes = list(colonnes)
+        self.position = {c: j for j, c in enumerate(self.colonnes)}
+        self.codes = codes
+        self.tables = {**TABLES_FIXES, **{col: TableCodes(table) for col, table in codes.items()}}
+        self.moyennes = np.array([moyennes.get(c, 0.0) for c in self.colonnes], dtype="float64")
+        self.ecarts = np.array([ecarts.get(c, 1.0) for c in self.colonnes], dtype="float64")
+        self.imputations = np.array([imputations.get(c, 0.0) for c in self.colonnes], dtype="float64")
+
+    def encoder_brut(self, brut):
+        """Étape 1 : annonces brutes → variables numériques avant centrage-réduction (NaN si absente)"""
+        X = np.full((len(brut), len(self.colonnes)), np.nan, order="F")  # écritures colonne par colonne contiguës
+        numeriques = []
+        for col, j in self.position.items():
+            source = SOURCES.get(col, col)
+            if source not in brut.columns:
+                continue
+            if col in self.tables:
+                X[:, j] = self.tables[col].appliquer(brut[source])
+            elif pd.api.types.is_numeric_dtype(brut[source]):
+                numeriques.append(col)
+        # Toutes les colonnes numériques converties en un seul bloc
+        if numeriques:
+            X[:, [self.position[c] for c in numeriques]] = brut[numeriques].to_numpy(dtype="float64", na_value=np.nan)
+
+        if "exposition" in brut.columns:
+            direction = TABLE_EXPOSITION.appliquer(brut["exposition"].str.lower())
+            for k, nom in enumerate(DIRECTIONS_EXPOSITION):
+                if f"exposition_{nom}" in self.position:
+                    X[:, self.position[f"exposition_{nom}"]] = direction == k
+
+        if "date" in brut.columns:
+            annee = pd.to_numeric(brut["date"].astype(str).str[:4], errors="coerce").to_numpy(dtype="float64")
+            for col, valeur in (("annee", annee), ("anciennete_annonce", ANNEE_REFERENCE - annee)):
+                if col in self.position:
+                    X[:, self.position[col]] = valeur
+
+        if "surface" in brut.columns and "nb_pieces" in brut.columns:
+            surface = pd.to_numeric(brut["surface"], errors="coerce").to_numpy(dtype="float64")
+            pieces = pd.to_numeric(brut["nb_pieces"], errors="coerce").to_numpy(dtype="float64")
+            with np.errstate(divide="ignore", invalid="ignore"):
+                surf_par_piece = np.where(pieces > 0, surface / pieces, np.nan)
+            if "surf_par_piece" in self.position:
+                X[:, self.position["surf_par_piece"]] = surf_par_piece
+            if "surface_anormale" in self.position:
+                X[:, self.position["surface_anormale"]] = ~((surf_par_piece >= SURF_PAR_PIECE_MIN)
+                                                            & (surf_par_piece <= SURF_PAR_PIECE_MAX))
+        return X
+
+    def imputer(self, X):
+        """Valeurs manquantes remplacées ; tranche et origine de l'année de construction déduites après imputation"""
+        if "annee_construction" in self.position:
+            j = self.position["annee_construction"]
+            observee = ~np.isnan(X[:, j])
+            X[:, j] = np.where(observee, X[:, j], self.imputations[j])
+            if "classe_annee" in self.position:
+                tranche = np.clip(np.searchsorted(BORNES_ANNEE, X[:, j], side="right") - 1, 0, len(CODES_CLASSE_ANNEE) - 1)
+                X[:, self.position["classe_annee"]] = np.take(CODES_CLASSE_ANNEE, tranche)
+            if "source_imputation" in self.position:
+                X[:, self.position["source_imputation"]] = np.where(observee, CODE_ANNEE_OBSERVEE, CODE_ANNEE_IMPUTEE)
+        return np.where(np.isnan(X), self.imputations, X)
+
+    def transformer(self, brut):
+        """Matrice float32 (n × variables du modèle), dans l'ordre de `self.colonnes`"""
+        X = self.imputer(self.encoder_brut(brut))
+        return ((X - self.moyennes) / self.ecarts).astype("float32")
+
+    def transformer_df(self, brut):
+        return pd.DataFrame(self.transformer(brut), columns=self.colonnes, index=brut.index)
+
+    def transformer_ligne(self, annonce, sortie=None, ordre=None):
+        """Une annonce (dict de valeurs brutes) → vecteur float32, sans DataFrame intermédiaire
+
+        `sortie` : vecteur préalloué à remplir ; `ordre` : positions des variables du modèle
+        (`feature_names_in_`) dans `self.colonnes`. Mêmes règles que `transformer`.
+        """
+        x = np.full(len(self.colonnes), np.nan)
+        for col, j in self.position.items():
+            valeur = annonce.get(SOURCES.get(col, col))
+            if valeur is None or (isinstance(valeur, float) and np.isnan(valeur)):
+                continue
+            if col in self.tables:
+                cle = str(int(valeur)) if isinstance(valeur, (int, float, np.number)) and not isinstance(valeur, bool) else str(valeur)
+                x[j] = self.tables[col].dictionnaire.get(cle, np.nan)
+            elif isinstance(valeur, (bool, int, float, np.number)):
+                x[j] = float(valeur)
+
+        direction = TABLE_EXPOSITION.dictionnaire.get(str(annonce.get("exposition", "")).lower())
+        for k, nom in enumerate(DIRECTIONS_EXPOSITION):
+            if f"exposition_{nom}" in self.position:
+                x[self.position[f"exposition_{nom}"]] = float(direction == k)
+        if annonce.get("date") and str(annonce["date"])[:4].isdigit():
+            annee = float(str(annonce["date"])[:4])
+            for col, valeur in (("annee", annee), ("anciennete_annonce", ANNEE_REFERENCE - annee)):
+                if col in self.position:
+                    x[self.position[col]] = valeur
+        surface, pieces = annonce.get("surface"), annonce.get("nb_pieces")
+        if surface is not None and pieces:
+            for col, valeur in (("surf_par_piece", surface / pieces),
+                                ("surface_anormale", not SURF_PAR_PIECE_MIN <= surface / pieces <= SURF_PAR_PIECE_MAX)):
+                if col in self.position:
+                    x[self.position[col]] = float(valeur)
+
+        x = (self.imputer(x[None, :])[0] - self.moyennes) / self.ecarts
+        if sortie is None:
+            sortie = np.empty(len(self.colonnes) if ordre is None else len(ordre), dtype="float32")
+        sortie[:] = x if ordre is None else x[ordre]
+        return sortie
+
+    def modalite_connue(self, col, valeur):
+        """Vrai si `transformer_ligne` sait coder cette valeur brute (sinon elle serait imputée en silence)"""
+        if col == "exposition":
+            return str(valeur).lower() in TABLE_EXPOSITION.dictionnaire
+        return col not in self.tables or str(valeur) in self.tables[col].dictionnaire
+
+    def ordre(self, noms_variables):
+        """Positions des variables attendues par un modèle (`feature_names_in_`) dans `self.colonnes`"""
+        return np.array([self.position[str(nom)] for nom in noms_variables])
+
+    def sauver(self, chemin):
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump({"colonnes": self.colonnes, "codes": self.codes,
+                       "moyennes": dict(zip(self.colonnes, self.moyennes)), "ecarts": dict(zip(self.colonnes, self.ecarts)),
+                       "imputations": dict(zip(self.colonnes, self.imputations))},
+                      f, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def charger(cls, type_bien, dossier=DOSSIER_ENCODAGES):
+        with open(os.path.join(dossier, f"encodage_{type_bien}.json"), "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+def lire_reference(type_bien):
+    chemin_brut, chemin_encode = FICHIERS_REFERENCE[type_bien]
+    brut = pd.read_csv(chemin_brut, sep=";", encoding=ENCODAGE_REFERENCE, index_col=0)
+    encode = pd.read_csv(chemin_encode, sep=";", encoding=ENCODAGE_REFERENCE)
+    return brut.reset_index(drop=True), encode
+
+
+def _ajuster(x, y):
+    """Pente et ordonnée de y = (x − moyenne) / écart, sur les lignes où les deux sont renseignées"""
+    observe = ~np.isnan(x) & ~np.isnan(y)
+    if observe.sum() >= 2 and x[observe].std() > 0:
+        pente, ordonnee = np.polyfit(x[observe], y[observe], 1)
+        if np.isclose(pente, 1) and np.isclose(ordonnee, 0):
+            return 1.0, 0.0
+        return pente, ordonnee
+    # Colonne constante : le StandardScaler la ramène à 0 (écart-type remplacé par 1)
+    return 1.0, (y[observe] - x[observe]).mean() if observe.any() else 0.0
+
+
+def calibrer(brut, encode):
+    """Retrouve les paramètres du pipeline d'entraînement à partir de paires (annonce brute, annonce encodée)"""
+    colonnes = [c for c in encode.columns if c not in COLONNES_HORS_MODELE]
+    codes = {}
+    for col in COLONNES_CODES:
+        if col in brut.columns and col in encode.columns:
+            paires = pd.DataFrame({"brut": _cles(brut[col]), "code": encode[col]}).dropna()
+            codes[col] = paires.groupby("brut")["code"].agg(lambda s: s.mode().iloc[0]).astype(float).to_dict()
+    non_reduites = set(codes) | set(COLONNES_DERIVEES_ANNEE)
+
+    X = TransformateurAnnonces(colonnes, codes, {}, {}, {}).encoder_brut(brut)
+    Y = encode[colonnes].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+    moyennes, ecarts, imputations = {}, {}, {}
+    for j, col in enumerate(colonnes):
+        if col in COLONNES_DERIVEES_ANNEE:
+            continue
+        pente, ordonnee = (1.0, 0.0) if col in non_reduites else _ajuster(X[:, j], Y[:, j])
+        ecarts[col], moyennes[col] = 1 / pente, -ordonnee / pente
+        # Valeurs imputées à l'entraînement, ramenées avant centrage-réduction
+        imputees = (Y[np.isnan(X[:, j]), j] - ordonnee) / pente
+        reference = pd.Series(imputees if len(imputees) else X[:, j]).dropna()
+        if reference.empty:
+            imputations[col] = 0.0
+        elif col in non_reduites:
+            imputations[col] = float(reference.round().mode().iloc[0])
+        else:
+            imputations[col] = float(reference.median())
+    return TransformateurAnnonces(colonnes, codes, moyennes, ecarts, imputations)
+
+
+def verifier_parite(transformateur, brut, encode, tolerance=1e-4):
+    """Écart aux fichiers encodés, sur les cellules dont la valeur brute est renseignée (les autres ont été
+    imputées par un modèle à l'entraînement et ne peuvent être reproduites exactement)"""
+    renseigne = ~np.isnan(transformateur.encoder_brut(brut))
+    if "annee_construction" in transformateur.position:
+        annee_observee = renseigne[:, transformateur.position["annee_construction"]]
+        for col in COLONNES_DERIVEES_ANNEE:
+            if col in transformateur.position:
+                renseigne[:, transformateur.position[col]] = annee_observee
+    attendu = encode[transformateur.colonnes].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+    ecart = np.abs(transformateur.transformer(brut).astype("float64") - attendu)
+    par_colonne = pd.Series(np.where(renseigne, ecart, 0).max(axis=0), index=transformateur.colonnes)
+    return {
+        "ecart_max_renseigne": float(ecart[renseigne].max()),
+        "part_cellules_identiques": float((ecart[renseigne] <= tolerance).mean()),
+        "part_cellules_identiques_toutes": float((ecart <= tolerance).mean()),
+        "pire_colonne": par_colonne.idxmax(),
+    }
+
+
+def mesurer_debit(transformateur, brut, tailles=(1, 100, 10_000, 100_000), repetitions=5):
+    """Lignes transformées par seconde selon la taille du lot"""
+    resultats = {}
+    for taille in tailles:
+        lot = brut.sample(taille, replace=True, random_state=0).reset_index(drop=True)
+        debut = time.perf_counter()
+        for _ in range(repetitions):
+            transformateur.transformer(lot)
+        duree = (time.perf_counter() - debut) / repetitions
+        resultats[taille] = {"duree_ms": duree * 1000, "lignes_par_s": taille / duree}
+    return resultats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrage du transformateur brut → variables du modèle")
+    parser.add_argument("--types", nargs="+", default=list(FICHIERS_REFERENCE))
+    args = parser.parse_args()
+
+    for type_bien in args.types:
+        brut, encode = lire_reference(type_bien)
+        transformateur = calibrer(brut, encode)
+        chemin = os.path.join(DOSSIER_ENCODAGES, f"encodage_{type_bien}.json")
+        transformateur.sauver(chemin)
+        parite = verifier_parite(transformateur, brut, encode)
+        print(f"✅ {type_bien} → {chemin} : {parite['part_cellules_identiques']:.2%} des cellules renseignées identiques "
+              f"(écart max {parite['ecart_max_renseigne']:.2e}, {parite['pire_colonne']}), "
+              f"{parite['part_cellules_identiques_toutes']:.2%} en comptant les valeurs imputées")
+        for taille, mesure in mesurer_debit(transformateur, brut).items():
+            print(f"   lot de {taille:>7,} : {mesure['duree_ms']:8.2f} ms ({mesure['lignes_par_s']:,.0f} lignes/s)")
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import GroupKFold, KFold
+
+from transformation_annonces import ENCODAGE_REFERENCE, FICHIERS_REFERENCE
+from optimisation_optuna import DOSSIER_MODELES, GRAINE, MODELES_RETENUS, NB_PLIS, charger_jeu, construire_modele
+
+# === Hyperparamètres de référence (page Évaluation), remplacés par ceux d'Optuna s'ils existent ===
+PARAMS_EVALUATION = {
+    "extratrees": {"n_estimators": 350, "max_depth": 25, "min_samples_split": 3, "max_features": "sqrt",
+                   "bootstrap": True},
+    "xgboost": {"n_estimators": 200, "learning_rate": 0.05, "max_depth": 6, "subsample": 0.9,
+                "colsample_bytree": 0.7},
+}
+COLONNES_GROUPES = {"commune": "commune", "iris": "CODE_IRIS"}
+
+
+def params_retenus(type_bien, famille, dossier=DOSSIER_MODELES):
+    chemin = os.path.join(dossier, f"optuna_{type_bien}.json")
+    if os.path.exists(chemin):
+        with open(chemin, encoding="utf-8") as f:
+            rapport = json.load(f)
+        if rapport["famille"] == famille:
+            return rapport["params"]
+    return PARAMS_EVALUATION.get(famille, {})
+
+
+def groupes_spatiaux(type_bien, niveau="commune"):
+    """Groupe de chaque ligne du jeu encodé (les fichiers brut et encodé sont alignés ligne à ligne)"""
+    brut = pd.read_csv(FICHIERS_REFERENCE[type_bien][0], sep=";", encoding=ENCODAGE_REFERENCE, index_col=0,
+                       usecols=lambda c: c in ("Unnamed: 0", COLONNES_GROUPES[niveau]))
+    return brut.iloc[:, -1].astype(str).to_numpy()
+
+
+# === Matrice d'entraînement en mémoire partagée ===
+class MatricePartagee:
+    """Tableaux copiés une seule fois dans des segments partagés ; les workers les lisent sans copie"""
+
+    def __init__(self, **tableaux):
+        self.segments, self.descripteurs = [], {}
+        for nom, tableau in tableaux.items():
+            tableau = np.ascontiguousarray(tableau)
+            segment = shared_memory.SharedMemory(create=True, size=max(tableau.nbytes, 1))
+            np.ndarray(tableau.shape, tableau.dtype, buffer=segment.buf)[...] = tableau
+            self.segments.append(segment)
+            self.descripteurs[nom] = (segment.name, tableau.shape, tableau.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+
+
+_PARTAGE = {}
+
+
+def _attacher(descripteurs):
+    """Initialisation d'un worker : vues numpy sur les segments (le segment est gardé ouvert)"""
+    for nom, (segment, forme, dtype) in descripteurs.items():
+        shm = shared_memory.SharedMemory(name=segment)
+        _PARTAGE[nom] = (shm, np.ndarray(forme, np.dtype(dtype), buffer=shm.buf))
+
+
+def _evaluer_pli(famille, params, pli, apprentissage, validation):
+    X, y = _PARTAGE["X"][1], _PARTAGE["y"][1]
+    modele = construire_modele(famille, params)
+    debut = time.perf_counter()
+    modele.fit(X[apprentissage], y[apprentissage])
+    duree_fit = time.perf_counter() - debut
+    debut = time.perf_counter()
+    prediction = modele.predict(X[validation])
+    duree_predict = time.perf_counter() - debut
+    residus = prediction - y[validation]
+    return {"pli": pli, "nb_apprentissage": len(apprentissage), "nb_validation": len(validation),
+            "rmse": float(np.sqrt(np.mean(residus ** 2))), "mae": float(np.mean(np.abs(residus))),
+            "r2": float(1 - np.sum(residus ** 2) / np.sum((y[validation] - y[validation].mean()) ** 2)),
+            "duree_fit_s": duree_fit, "duree_predict_s": duree_predict, "pid": os.getpid()}
+
+
+def decouper(nb_lignes, nb_plis=NB_PLIS, groupes=None, graine=GRAINE):
+    """Plis aléatoires, ou groupés (une commune entière est soit en apprentissage, soit en validation)"""
+    if groupes is None:
+        return list(KFold(nb_plis, shuffle=True, random_state=graine).split(np.arange(nb_lignes)))
+    return list(GroupKFold(nb_plis, shuffle=True, random_state=graine).split(np.arange(nb_lignes), groups=groupes))
+
+
+def valider(X, y, famille, params, nb_plis=NB_PLIS, groupes=None, n_workers=None):
+    """Plis ajustés en parallèle ; seuls les indices transitent vers les workers"""
+    debut = time.perf_counter()
+    plis = decouper(len(y), nb_plis, groupes)
+    with MatricePartagee(X=np.asarray(X, dtype="float32"), y=np.asarray(y, dtype="float64")) as partage:
+        with ProcessPoolExecutor(max_workers=n_workers or min(nb_plis, os.cpu_count()), initializer=_attacher,
+                                 initargs=(partage.descripteurs,)) as pool:
+            futures = [pool.submit(_evaluer_pli, famille, params, pli, apprentissage, validation)
+                       for pli, (apprentissage, validation) in enumerate(plis)]
+            resultats = pd.DataFrame([future.result() for future in futures])
+    return resultats, time.perf_counter() - debut
+
+
+def synthese(resultats):
+    return {"rmse_cv": resultats["rmse"].mean(), "rmse_ecart_type": resultats["rmse"].std(),
+            "mae_cv": resultats["mae"].mean(), "r2_cv": resultats["r2"].mean(),
+            "duree_fit_s": resultats["duree_fit_s"].sum()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validation croisée parallèle (données en mémoire partagée)")
+    parser.add_argument("--types", nargs="+", default=list(MODELES_RETENUS), choices=list(MODELES_RETENUS))
+    parser.add_argument("--famille", default=None, help="par défaut : modèle retenu pour chaque type")
+    parser.add_argument("--plis", type=int, default=NB_PLIS)
+    parser.add_argument("--groupes", choices=["aleatoire"] + list(COLONNES_GROUPES), default="aleatoire")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    for type_bien in args.types:
+        famille = args.famille or MODELES_RETENUS[type_bien]
+        X, y = charger_jeu(type_bien)
+        groupes = None if args.groupes == "aleatoire" else groupes_spatiaux(type_bien, args.groupes)
+        resultats, duree = valider(X, y, famille, params_retenus(type_bien, famille), args.plis, groupes,
+                                   args.workers)
+        s = synthese(resultats)
+        print(f"✅ {type_bien} / {famille} ({args.groupes}) : RMSE CV {s['rmse_cv']:.2f} € ± {s['rmse_ecart_type']:.2f}"
+              f", R² CV {s['r2_cv']:.3f} — {duree:.1f} s réels pour {s['duree_fit_s']:.1f} s d'ajustement cumulé")
+        print(resultats[["pli", "nb_validation", "rmse", "mae", "r2", "duree_fit_s"]].round(3).to_string(index=False))